@@ -2,23 +2,37 @@ import streamlit as st
 from pathlib import Path
 import sys
 import random
-from thefuzz import fuzz
 import time
 
 # Zorg dat Python de src map ziet
 sys.path.append(str(Path(__file__).parent))
 
-from src.parser import parse_file
+from src.answer_match import check_answer
+from src.compiled_deck import open_compiled
+from src.corpus import ALL_DECKS, load_corpus
+from src.dedup import link_duplicates
+from src.deck_watcher import apply_diff, get_watcher
+from src.distractors import OPTIONS, DistractorIndex
+from src.search_index import get_index
 from src.llm_engine import LLMEngine
+from src.metrics import finish_run, start_run, timer
+from src.question_prefetch import get_prefetcher
 from src.learning_tracker import (
-    record_answer, record_session, select_weighted_drill,
+    record_event, record_session, select_weighted_drill,
     get_drill_difficulty, get_category_stats, get_file_stats,
     get_progress_data, get_weak_categories, get_drill_stats_for_file,
-    check_achievements, get_achievements, get_stats, ACHIEVEMENTS
+    get_achievements, get_stats, count_due_today, set_user, get_user, get_store, ACHIEVEMENTS
 )
+from src.user_shards import ShardBusyError
 
 st.set_page_config(page_title="JomCollege", layout="wide", page_icon="🎓")
 
+# Instrumentatie per rerun. Een rerun die met st.rerun() is afgebroken wordt hier
+# alsnog afgesloten (duur tot de laatste meting).
+if st.session_state.get('metrics_run') is not None:
+    st.session_state.last_rerun = finish_run(st.session_state.metrics_run, interrupted=True)
+st.session_state.metrics_run = start_run()
+
 # Styling
 st.markdown("""
 <style>
@@ -29,16 +43,16 @@ st.markdown("""
 
 st.title("🎓 JomCollege")
 
-# Caching
-@st.cache_data(show_spinner=False)
+# Caching: gecompileerd deck via mmap (overleeft herstarts, ziet gewijzigde bestanden);
+# drills worden pas gelezen als ze nodig zijn, dus wisselen kost niets extra bij grote decks
 def load_data_cached(file_path):
-    return parse_file(file_path)
+    return open_compiled(file_path).as_deck()
 
 # Init State
 defaults = {
-    'current_file': None, 'data': None, 'llm_engine': LLMEngine(),
+    'current_file': None, 'loaded_selection': None, 'data': None, 'watch_version': 0, 'llm_engine': LLMEngine(question_variants=3),
     'score': 0, 'total': 0, 'current_drill': None, 'feedback': None,
-    'show_mc': False, 'mc_options': [], 'auto_next': False,
+    'show_mc': False, 'mc_options': [], 'distractors': None, 'auto_next': False,
     'ai_question': None, 'chat_history': [],
     'system_level': "structure", # VERANDERD: Van bloom naar system_level
     'selected_category': None, 'context_buffer': "",
@@ -50,15 +64,27 @@ for k, v in defaults.items():
 
 # Sidebar
 with st.sidebar:
+    # Eigen voortgang per gebruiker (leeg = gedeelde standaard opslag)
+    user = st.text_input("👤 Gebruiker:", key="user", placeholder="Naam (optioneel)")
+    set_user(user.strip() or None)
+    try:
+        get_store()  # Shard nu openen: een bezette shard geeft hier een nette melding
+    except ShardBusyError:
+        st.error("Deze gebruiker is al geopend in een ander proces. Sluit dat eerst of kies een andere naam.")
+        st.stop()
+
     st.header("📂 Input")
     data_dir = Path("data")
     if not data_dir.exists(): st.stop()
-    files = sorted([f.name for f in data_dir.glob("*.txt")])
+    # Houdt data/ in de gaten: bewerkte decks worden per sectie opnieuw geparsed
+    watcher = get_watcher(data_dir)
+    files = [ALL_DECKS] + sorted([f.name for f in data_dir.glob("*.txt")])
     selected_file = st.selectbox("File:", files, index=None)
     st.divider()
     mode = st.radio("Mode:", ["🎯 Drill (Feiten)", "🧠 System (Logica)"])
 
-    if selected_file and selected_file != st.session_state.current_file:
+    if selected_file and selected_file != st.session_state.loaded_selection:
+        st.session_state.loaded_selection = selected_file
         st.session_state.current_file = selected_file
         # Laad score voor dit bestand (of start op 0)
         if selected_file in st.session_state.scores:
@@ -70,19 +96,59 @@ with st.sidebar:
             st.session_state.scores[selected_file] = {"score": 0, "total": 0}
         st.session_state.ai_question = None
         st.session_state.chat_history = []
+        st.session_state.watch_version = watcher.version
         try:
-            st.session_state.data = load_data_cached(data_dir / selected_file)
+            with timer("app.load_deck"):
+                if selected_file == ALL_DECKS:
+                    # Alle decks samen: parallel geladen, drills dragen hun eigen bestand mee
+                    corpus = load_corpus(data_dir)
+                    # Dubbele drills over decks heen linken (slaat over als er niets veranderd is)
+                    link_duplicates(corpus.drills)
+                    st.session_state.data = corpus.as_deck()
+                else:
+                    st.session_state.data = load_data_cached(data_dir / selected_file)
         except Exception as e: st.error(e)
 
+    # Zoeken door alle decks: resultaten tonen of 'alles over X' oefenen
+    query = st.text_input("🔎 Zoeken:", key="search_query", placeholder="bijv. oerknal").strip()
+    if query:
+        library = get_index(data_dir)
+        hits = library.search(query, limit=8)
+        if hits:
+            for hit in hits:
+                label = hit['drill']['question'] if 'drill' in hit else f"Context: {hit['category']}"
+                st.caption(f"• {label[:60]} ({hit['file']} / {hit['category']})")
+            if st.button("🎯 Oefen alles hierover", use_container_width=True):
+                name = f"🔎 {query}"
+                st.session_state.current_file = name
+                scores = st.session_state.scores.setdefault(name, {"score": 0, "total": 0})
+                st.session_state.score = scores["score"]
+                st.session_state.total = scores["total"]
+                st.session_state.data = library.deck_for(query, name)
+                st.session_state.watch_version = watcher.version
+                st.session_state.current_drill = None
+                st.session_state.ai_question = None
+                st.session_state.chat_history = []
+                st.rerun()
+        else:
+            st.caption("Geen resultaten.")
+
     # Statistieken sectie
     st.divider()
     st.header("📊 Statistieken")
 
-    if selected_file:
-        file_stats = get_file_stats(selected_file)
-        if file_stats["total"] > 0:
-            st.metric("Totaal dit bestand", f"{file_stats['percentage']}%",
-                     delta=f"{file_stats['correct']}/{file_stats['total']}")
+    current_file = st.session_state.current_file
+    if current_file:
+        # Alleen echte bestanden hebben bestandsstatistieken (niet 'Alle decks' of een zoekopdracht)
+        stats_file = current_file if (data_dir / current_file).is_file() else None
+        if stats_file:
+            file_stats = get_file_stats(stats_file)
+            if file_stats["total"] > 0:
+                st.metric("Totaal dit bestand", f"{file_stats['percentage']}%",
+                         delta=f"{file_stats['correct']}/{file_stats['total']}")
+        due_today = count_due_today(stats_file)
+        if due_today:
+            st.caption(f"📅 Vandaag te herhalen: {due_today}")
 
     # Zwakke punten
     weak = get_weak_categories(3)
@@ -124,6 +190,27 @@ with st.sidebar:
         if streak > 0 or best > 0:
             st.caption(f"🔥 Streak: {streak} | Best: {best}")
 
+    # Debug: timings van de vorige rerun (tracker I/O, parsing, LLM, wachttijd)
+    st.divider()
+    if st.checkbox("🐞 Debug timings", key="debug_timings"):
+        last = st.session_state.get('last_rerun')
+        if last:
+            st.caption(f"Vorige rerun: {last['wall_ms']:.1f} ms")
+            st.dataframe(
+                [{"timer": name, "calls": t["calls"], "totaal ms": round(t["total_ms"], 2),
+                  "max ms": round(t["max_ms"], 2)} for name, t in last["timers"].items()],
+                hide_index=True, use_container_width=True
+            )
+            for name, value in last["counters"].items():
+                st.caption(f"{name}: {value}")
+        else:
+            st.caption("Nog geen afgeronde rerun.")
+        # LLM cache: hoeveel generaties uit de cache kwamen en hoeveel wachttijd dat scheelde
+        llm_stats = st.session_state.llm_engine.cache.stats()
+        st.caption(f"LLM cache: {llm_stats['hits']:.0f} hits / {llm_stats['misses']:.0f} misses "
+                   f"({llm_stats['hit_rate']:.0%}), {llm_stats['saved_seconds']:.1f} s bespaard, "
+                   f"{llm_stats['entries']} entries")
+
 # Helper: update score en sla op
 def update_score(correct: bool):
     st.session_state.total += 1
@@ -136,6 +223,25 @@ def update_score(correct: bool):
             "total": st.session_state.total
         }
 
+# Decks die sinds het laden bewerkt zijn: alleen de gewijzigde drills bijwerken
+if st.session_state.data:
+    version, diffs = watcher.changes_since(st.session_state.watch_version)
+    st.session_state.watch_version = version
+    current = st.session_state.current_file
+    single = (data_dir / current).is_file()
+    if diffs is None and single:
+        # Te ver achter voor de watcher geschiedenis: opnieuw laden
+        st.session_state.data = load_data_cached(data_dir / current)
+    for diff in diffs or []:
+        if diff.file == current:
+            st.session_state.data = watcher.deck(diff.file) or st.session_state.data
+        elif not single:
+            apply_diff(st.session_state.data, diff, include_added=current == ALL_DECKS)
+            st.session_state.distractors = None  # Antwoorden gewijzigd: index opnieuw opbouwen
+        drill = st.session_state.current_drill
+        if drill is not None:
+            st.session_state.current_drill = diff.updated(drill, drill.get('file', current))
+
 # Main Interface
 if st.session_state.data:
     data = st.session_state.data
@@ -159,11 +265,13 @@ if st.session_state.data:
 
         if not st.session_state.current_drill: next_drill()
         drill = st.session_state.current_drill
+        # Bij 'Alle decks' hoort elke drill bij zijn eigen bestand
+        drill_file = drill.get('file', st.session_state.current_file)
 
         col_q, col_act = st.columns([3, 1])
         with col_q:
             # Moeilijkheidsgraad indicator
-            difficulty, pct = get_drill_difficulty(st.session_state.current_file, drill['question'])
+            difficulty, pct = get_drill_difficulty(drill_file, drill['question'])
             diff_colors = {"Nieuw": "🆕", "Makkelijk": "🟢", "Medium": "🟡", "Moeilijk": "🔴"}
             diff_icon = diff_colors.get(difficulty, "")
             pct_str = f" ({pct:.0f}%)" if pct >= 0 else ""
@@ -176,15 +284,13 @@ if st.session_state.data:
                     if cols[i%2].button(opt, use_container_width=True):
                         is_correct = opt == drill['answer']
                         update_score(is_correct)
-                        # Track voor spaced repetition
-                        record_answer(
-                            st.session_state.current_file,
+                        # Track voor spaced repetition + achievements (één transactie)
+                        new_achs = record_event(
+                            drill_file,
                             drill['question'],
                             drill.get('category', 'Algemeen'),
                             is_correct
                         )
-                        # Check achievements
-                        new_achs = check_achievements(is_correct)
                         if new_achs:
                             st.session_state.new_achievement = new_achs[0]
                         if is_correct:
@@ -203,21 +309,19 @@ if st.session_state.data:
                     skip_clicked = btn_col2.form_submit_button("🤷 Weet ik niet")
 
                     if check_clicked:
-                        sim = fuzz.ratio(inp.lower(), drill['answer'].lower())
-                        is_correct = sim > 85
+                        verdict = check_answer(inp, drill['answer'])
+                        is_correct = verdict.correct
                         update_score(is_correct)
-                        record_answer(
-                            st.session_state.current_file,
+                        new_achs = record_event(
+                            drill_file,
                             drill['question'],
                             drill.get('category', 'Algemeen'),
                             is_correct
                         )
-                        # Check achievements
-                        new_achs = check_achievements(is_correct)
                         if new_achs:
                             st.session_state.new_achievement = new_achs[0]
                         if is_correct:
-                            st.session_state.feedback = ("success", f"Correct ({sim}%)")
+                            st.session_state.feedback = ("success", f"Correct ({verdict.score}%)")
                         else:
                             st.session_state.feedback = ("error", f"Fout. Antwoord: {drill['answer']}")
                         st.session_state.auto_next = True
@@ -225,14 +329,13 @@ if st.session_state.data:
 
                     if skip_clicked:
                         update_score(False)
-                        record_answer(
-                            st.session_state.current_file,
+                        # Ook bij skip: telt als fout (en voor achievements)
+                        new_achs = record_event(
+                            drill_file,
                             drill['question'],
                             drill.get('category', 'Algemeen'),
                             False
                         )
-                        # Check achievements (ook bij skip)
-                        new_achs = check_achievements(False)
                         if new_achs:
                             st.session_state.new_achievement = new_achs[0]
                         st.session_state.feedback = ("error", f"Antwoord: {drill['answer']}")
@@ -240,8 +343,19 @@ if st.session_state.data:
                         st.rerun()
 
         with col_act:
+            st.checkbox("🤖 AI aanvulling", key="mc_use_ai",
+                        help="Vul MC opties aan met de LLM als het deck er te weinig heeft")
             if st.button("MC Opties"):
-                opts = st.session_state.llm_engine.generate_multiple_choice_distractors(drill['question'], drill['answer'])
+                # Foute opties uit de andere antwoorden van het deck (direct, zonder LLM)
+                index = st.session_state.distractors
+                if index is None or index.drills is not data['drills']:
+                    index = st.session_state.distractors = DistractorIndex(data['drills'])
+                opts = index.pick(drill)
+                if len(opts) < OPTIONS and st.session_state.get('mc_use_ai'):
+                    # Optioneel: aanvullen met de LLM als het deck te weinig opties heeft
+                    extra = st.session_state.llm_engine.generate_multiple_choice_distractors(
+                        drill['question'], drill['answer'], OPTIONS - len(opts))
+                    opts += [o for o in extra if o not in opts and o != drill['answer']]
                 opts.append(drill['answer']); random.shuffle(opts)
                 st.session_state.mc_options = opts; st.session_state.show_mc = True; st.rerun()
             if st.button("Next"): next_drill(); st.rerun()
@@ -271,7 +385,8 @@ if st.session_state.data:
                 # Langer wachten bij fout antwoord zodat je het kunt lezen
                 # Extra tijd als achievement unlocked
                 wait_time = 0.8 if k == "success" else 2.5
-                time.sleep(wait_time)
+                with timer("app.auto_next_sleep"):
+                    time.sleep(wait_time)
                 st.session_state.auto_next = False
                 next_drill()
                 st.rerun()
@@ -344,6 +459,9 @@ if st.session_state.data:
 
     # --- SYSTEM MODE ---
     else:
+        # Volgende vragen worden op de achtergrond al gegenereerd (per module en diepte)
+        prefetcher = get_prefetcher(get_user(), st.session_state.llm_engine)
+
         c_p, c_c = st.columns([1, 2])
         with c_p:
             st.markdown("#### Instellingen")
@@ -363,7 +481,7 @@ if st.session_state.data:
                 ctx = data['context'][cat]
                 st.session_state.context_buffer = ctx
                 with st.spinner("Vraag genereren..."):
-                    q = st.session_state.llm_engine.generate_question(ctx, lvl)
+                    q = prefetcher.next_question(cat, ctx, lvl)
                     st.session_state.ai_question = q
                     st.session_state.chat_history = []
                     st.rerun()
@@ -371,6 +489,9 @@ if st.session_state.data:
         with c_c:
             if st.session_state.ai_question:
                 st.info(f"**Vraag:** {st.session_state.ai_question}")
+                # Terwijl de gebruiker nadenkt: volgende vraag alvast genereren
+                prefetcher.prefetch(st.session_state.selected_category, st.session_state.context_buffer,
+                                    st.session_state.system_level)
                 for m in st.session_state.chat_history:
                     st.chat_message(m['role']).write(m['content'])
                 
@@ -420,7 +541,8 @@ if st.session_state.data:
                         ctx = data['context'][st.session_state.selected_category]
                         st.session_state.context_buffer = ctx
                         with st.spinner("Nieuwe vraag..."):
-                            q = st.session_state.llm_engine.generate_question(ctx, st.session_state.system_level)
+                            q = prefetcher.next_question(st.session_state.selected_category, ctx,
+                                                         st.session_state.system_level)
                             st.session_state.ai_question = q
                             st.session_state.chat_history = []
                         st.rerun()
@@ -431,9 +553,13 @@ if st.session_state.data:
                         ctx = data['context'][st.session_state.selected_category]
                         st.session_state.context_buffer = ctx
                         with st.spinner("Nieuwe vraag..."):
-                            q = st.session_state.llm_engine.generate_question(ctx, st.session_state.system_level)
+                            q = prefetcher.next_question(st.session_state.selected_category, ctx,
+                                                         st.session_state.system_level)
                             st.session_state.ai_question = q
                             st.session_state.chat_history = []
                         st.rerun()
 else:
-    st.info("Selecteer bestand.")
\ No newline at end of file
+    st.info("Selecteer bestand.")
+
+# Normaal einde van de rerun
+st.session_state.last_rerun = finish_run(st.session_state.metrics_run)
@@ -0,0 +1,401 @@
+"""
+Benchmark suite: parser, tracker opslag, drill selectie, progressie, zoeken en antwoordcontrole.
+
+Elke (operatie, grootte) draait in een eigen subprocess, zodat piek RSS per
+operatie gemeten wordt. Per meting: wandkloktijd, allocaties (tracemalloc,
+aparte run) en piek RSS. Resultaten gaan als JSON naar benchmarks/results/.
+
+Gebruik (vanuit de hoofdmap):
+    python -m benchmarks.run                          # 1k, 10k, 100k, 1M
+    python -m benchmarks.run --sizes 1000 10000 --ops parse_file
+    python -m benchmarks.run --compare oud.json nieuw.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+DECK_NAME = "bench.txt"
+
+
+# --- Operaties ---------------------------------------------------------------------
+# Elke operatie: setup(werkmap, grootte) -> state, run(state), en het aantal herhalingen.
+
+def _use_tracker(workdir: Path):
+    """Richt de learning tracker (en de drill links) op de database in de werkmap."""
+    import src.drill_links as drill_links
+    import src.learning_tracker as lt
+    drill_links.LINKS_FILE = workdir / "drill_links.sqlite"
+    drill_links._links = None
+    lt.DATA_FILE = workdir / "user_data.json"
+    lt.DB_FILE = workdir / "user_data.sqlite"
+    lt.LOG_DIR = workdir / "answer_log"
+    lt.USERS_DIR = workdir / "users"
+    lt.FLUSH_INTERVAL = 0
+    return lt
+
+
+def _close_tracker() -> None:
+    """Flush en sluit alle open stores, zodat de volgende setup weer koud start."""
+    lt = sys.modules.get("src.learning_tracker")
+    if lt is not None and lt._registry is not None:
+        lt._registry.close_all()
+        lt._registry = None
+    drill_links = sys.modules.get("src.drill_links")
+    if drill_links is not None and drill_links._links is not None:
+        drill_links._links.close()
+        drill_links._links = None
+
+
+def _setup_parse(workdir: Path, size: int):
+    return workdir / DECK_NAME
+
+
+def _run_parse(path):
+    from src.parser import parse_file
+    parse_file(path)
+
+
+def _setup_load_deck(workdir: Path, size: int):
+    import src.parser as parser
+    parser.PARSE_CACHE_FILE = workdir / "parse_cache.sqlite"
+    parser._cache = None
+    # Net geschreven bestanden worden als 'racy' altijd op inhoud gecontroleerd; echte decks niet
+    deck = workdir / DECK_NAME
+    past = time.time() - 3600
+    os.utime(deck, (past, past))
+    parser.load_deck(deck)  # Cache op schijf vullen
+    parser._cache = None  # Geheugen leeg: meet een herstart met warme schijfcache
+    return parser, workdir / DECK_NAME
+
+
+def _run_load_deck(state):
+    parser, path = state
+    parser.load_deck(path)
+
+
+def _setup_search(workdir: Path, size: int):
+    from src.search_index import SearchIndex
+    from src.parser import parse_file
+    index = SearchIndex()
+    index.update_deck(DECK_NAME, parse_file(workdir / DECK_NAME))
+    # Zeldzame term, veelvoorkomende termen en een prefix
+    queries = ["Kepler begrip 4321", "eenheden hoofdstuk", "synthetisch", "oerknal"]
+    return index, iter(queries * _repeats("search_query", size))
+
+
+def _run_search(state):
+    index, queries = state
+    index.search(next(queries))
+
+
+def _setup_open_compiled(workdir: Path, size: int):
+    import src.compiled_deck as compiled
+    compiled.COMPILED_DIR = workdir / "compiled"
+    deck = workdir / DECK_NAME
+    past = time.time() - 3600
+    os.utime(deck, (past, past))
+    compiled.compile_deck(deck)
+    return compiled, deck, size
+
+
+def _run_open_compiled(state):
+    compiled, path, size = state
+    compiled._open.clear()  # Geen hergebruik: meet openen + één drill lezen (deck wisselen)
+    compiled.open_compiled(path).drills[size // 2]
+
+
+def _setup_load(workdir: Path, size: int):
+    return _use_tracker(workdir)
+
+
+def _run_load(lt):
+    lt.load_data()  # Koude start: database openen, indexen bouwen, snapshot
+
+
+def _setup_save(workdir: Path, size: int):
+    lt = _use_tracker(workdir)
+    return lt, lt.load_data()
+
+
+def _run_save(state):
+    lt, data = state
+    lt.save_data(data)
+    lt.flush()
+
+
+def _setup_select(workdir: Path, size: int):
+    from src.parser import parse_file
+    lt = _use_tracker(workdir)
+    lt.get_store()
+    return lt, parse_file(workdir / DECK_NAME)["drills"]
+
+
+def _run_select(state):
+    lt, drills = state
+    lt.select_weighted_drill(drills, DECK_NAME)
+
+
+def _setup_progress(workdir: Path, size: int):
+    lt = _use_tracker(workdir)
+    lt.get_store()
+    return lt
+
+
+def _run_progress(lt):
+    lt.get_progress_data(30)
+
+
+def _setup_record(workdir: Path, size: int):
+    from benchmarks.synthetic import category, question
+    lt = _use_tracker(workdir)
+    lt.get_store()
+    rng = random.Random(0)
+    picks = iter([rng.randrange(size) for _ in range(_repeats("record_event", size) * 2)])
+    return lt, picks, question, category
+
+
+def _run_record(state):
+    lt, picks, question, category = state
+    i = next(picks)
+    lt.record_event(DECK_NAME, question(i), category(i), i % 3 != 0)
+
+
+def _setup_answer(workdir: Path, size: int):
+    from benchmarks.synthetic import answer_pairs
+    from src.answer_match import check_answer
+    return check_answer, iter(answer_pairs(_repeats("answer_check", size) * 2))
+
+
+def _run_answer(state):
+    check_answer, pairs = state
+    given, truth = next(pairs)
+    check_answer(given, truth)  # Zelfde check als app.py
+
+
+OPERATIONS: Dict[str, Dict] = {
+    "parse_file": {"setup": _setup_parse, "run": _run_parse, "calls": lambda n: 1},
+    "load_deck": {"setup": _setup_load_deck, "run": _run_load_deck, "calls": lambda n: 1},
+    "open_compiled": {"setup": _setup_open_compiled, "run": _run_open_compiled, "calls": lambda n: 100},
+    "load_data": {"setup": _setup_load, "run": _run_load, "calls": lambda n: 1},
+    "save_data": {"setup": _setup_save, "run": _run_save, "calls": lambda n: 1},
+    "select_weighted_drill": {"setup": _setup_select, "run": _run_select,
+                              "calls": lambda n: max(3, min(1000, 1_000_000 // n))},
+    "get_progress_data": {"setup": _setup_progress, "run": _run_progress, "calls": lambda n: 100},
+    "record_event": {"setup": _setup_record, "run": _run_record, "calls": lambda n: min(n, 10_000)},
+    "search_query": {"setup": _setup_search, "run": _run_search, "calls": lambda n: 100},
+    "answer_check": {"setup": _setup_answer, "run": _run_answer, "calls": lambda n: n},
+}
+
+
+def _repeats(op: str, size: int) -> int:
+    return OPERATIONS[op]["calls"](size)
+
+
+# --- Meten (in het subprocess) -------------------------------------------------------
+
+def _rss_peak() -> Optional[int]:
+    """Piek RSS van dit proces in bytes (ru_maxrss is KB op Linux, bytes op macOS)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _timed(run: Callable, state, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        run(state)
+    return time.perf_counter() - start
+
+
+def measure(op: str, size: int, workdir: Path) -> Dict:
+    """Meet één operatie: eerst tijd (zonder tracemalloc), dan allocaties."""
+    spec = OPERATIONS[op]
+    calls = _repeats(op, size)
+    try:
+        state = spec["setup"](workdir, size)
+    except ImportError as e:
+        return {"op": op, "size": size, "skipped": f"ontbrekende dependency: {e.name}"}
+    rss_setup = _rss_peak()
+
+    wall = _timed(spec["run"], state, calls)
+    rss_peak = _rss_peak()
+
+    # Tweede run voor allocaties: tracemalloc vertraagt te veel voor de tijdmeting
+    _close_tracker()
+    state = spec["setup"](workdir, size)
+    tracemalloc.start()
+    _timed(spec["run"], state, calls)
+    alloc_net, alloc_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "op": op,
+        "size": size,
+        "calls": calls,
+        "wall_s": wall,
+        "per_call_s": wall / calls,
+        "alloc_peak_bytes": alloc_peak,
+        "alloc_net_bytes": alloc_net,
+        "rss_setup_bytes": rss_setup,
+        "rss_peak_bytes": rss_peak,
+    }
+
+
+def prepare(size: int, workdir: Path) -> None:
+    """Maak het deck en een tracker database met `size` drills en `size` antwoorden."""
+    from benchmarks.synthetic import history, write_deck
+
+    write_deck(workdir / DECK_NAME, size)
+    lt = _use_tracker(workdir)
+    data, events = history(DECK_NAME, size, size)
+    lt.save_data(data)
+    store = lt.get_store()
+    store.log.extend(events)
+    lt.flush()
+
+
+def _worker(args) -> None:
+    workdir = Path(args.workdir)
+    if args.worker == "prepare":
+        prepare(args.size, workdir)
+        return
+    # Elke meting werkt op een eigen kopie, zodat schrijvende operaties elkaar niet beïnvloeden
+    scratch = Path(tempfile.mkdtemp(dir=workdir.parent))
+    try:
+        for item in workdir.iterdir():
+            copy = shutil.copytree if item.is_dir() else shutil.copy2
+            copy(item, scratch / item.name)
+        print(json.dumps(measure(args.worker, args.size, scratch)))
+    finally:
+        _close_tracker()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+# --- Aansturing -----------------------------------------------------------------------
+
+def _subprocess(*extra: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-m", "benchmarks.run", *extra],
+                          cwd=ROOT, capture_output=True, text=True)
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(sizes: List[int], ops: List[str], output: Optional[Path] = None) -> Path:
+    commit = _git_commit()
+    results = []
+    root = Path(tempfile.mkdtemp(prefix="bench-"))
+    try:
+        for size in sizes:
+            workdir = root / f"n{size}"
+            workdir.mkdir()
+            print(f"[{size}] voorbereiden...", flush=True)
+            done = _subprocess("--worker", "prepare", "--size", str(size), "--workdir", str(workdir))
+            if done.returncode != 0:
+                raise RuntimeError(done.stderr)
+            for op in ops:
+                done = _subprocess("--worker", op, "--size", str(size), "--workdir", str(workdir))
+                if done.returncode != 0:
+                    result = {"op": op, "size": size, "error": done.stderr.strip().splitlines()[-1]}
+                else:
+                    result = json.loads(done.stdout.strip().splitlines()[-1])
+                results.append(result)
+                print("  " + _format(result), flush=True)
+            shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+        },
+        "results": results,
+    }
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{stamp}-{commit or 'nogit'}.json"
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return output
+
+
+def _format(result: Dict) -> str:
+    label = f"{result['op']:<22} n={result['size']:<8}"
+    if "skipped" in result or "error" in result:
+        return f"{label} {result.get('skipped') or 'FOUT: ' + result['error']}"
+    rss = result["rss_peak_bytes"]
+    return (f"{label} {result['per_call_s'] * 1000:>10.3f} ms/call  "
+            f"alloc {result['alloc_peak_bytes'] / 1e6:>8.1f} MB  "
+            f"rss {rss / 1e6 if rss else float('nan'):>8.1f} MB")
+
+
+def compare(old_path: Path, new_path: Path) -> None:
+    """Toon per (operatie, grootte) de verhouding nieuw/oud van tijd en allocaties."""
+    def index(path):
+        report = json.loads(Path(path).read_text(encoding="utf-8"))
+        return report["meta"], {(r["op"], r["size"]): r for r in report["results"] if "wall_s" in r}
+
+    old_meta, old = index(old_path)
+    new_meta, new = index(new_path)
+    print(f"oud: {old_meta['commit']} ({old_meta['timestamp']})  nieuw: {new_meta['commit']} ({new_meta['timestamp']})")
+    print(f"{'operatie':<22} {'n':>8} {'tijd':>8} {'alloc':>8}")
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        time_ratio = b["per_call_s"] / a["per_call_s"] if a["per_call_s"] else float("nan")
+        alloc_ratio = b["alloc_peak_bytes"] / a["alloc_peak_bytes"] if a["alloc_peak_bytes"] else float("nan")
+        print(f"{key[0]:<22} {key[1]:>8} {time_ratio:>7.2f}x {alloc_ratio:>7.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--ops", nargs="+", choices=list(OPERATIONS), default=list(OPERATIONS))
+    parser.add_argument("--output", type=Path, help="JSON bestand (standaard benchmarks/results/)")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("OUD", "NIEUW"))
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        _worker(args)
+    elif args.compare:
+        compare(*args.compare)
+    else:
+        path = run_suite(args.sizes, args.ops, args.output)
+        print(f"\nResultaten: {path}")
+
+
+if __name__ == "__main__":
+    main()
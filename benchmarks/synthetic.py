@@ -0,0 +1,103 @@
+"""
+Synthetische decks en antwoordhistories voor de benchmarks.
+Deterministisch (vaste seed), zodat resultaten tussen commits vergelijkbaar zijn.
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+DRILLS_PER_CATEGORY = 50
+SEED = 1234
+
+
+def question(i: int) -> str:
+    return f"Hoeveel eenheden hoort bij begrip nummer {i} uit dit synthetische hoofdstuk?"
+
+
+def answer(i: int) -> str:
+    # Mix van getallen (met komma/punt) en tekst, zoals in de echte decks
+    if i % 3 == 0:
+        return f"{i % 997},{i % 10}"
+    if i % 3 == 1:
+        return f"{(i * 7) % 100000}"
+    return f"Begrip {i} van Kepler"
+
+
+def category(i: int) -> str:
+    return f"Hoofdstuk {i // DRILLS_PER_CATEGORY}"
+
+
+def write_deck(path: Path, n_drills: int) -> Path:
+    """Schrijf een deck in het parser formaat: headers, context, drills, ruis."""
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n_drills):
+            if i % DRILLS_PER_CATEGORY == 0:
+                f.write(f"\n## {category(i)}\n\n")
+                f.write(f"Dit hoofdstuk gaat over onderwerp {i // DRILLS_PER_CATEGORY} en de samenhang.\n")
+                f.write("De oerknal vond ongeveer 13,8 miljard jaar geleden plaats.\n")
+                f.write("# notitie voor de auteur\n---\n")
+            if i % 10 == 9:
+                f.write(f"- {question(i)} - {answer(i)}\n")
+            else:
+                f.write(f"- {question(i)}: {answer(i)}\n")
+    return path
+
+
+def answer_pairs(n: int) -> List[Tuple[str, str]]:
+    """(invoer, antwoord) paren: deels exact, deels met typefouten, deels fout."""
+    rng = np.random.default_rng(SEED)
+    pairs = []
+    for i in range(n):
+        truth = answer(i)
+        kind = rng.integers(0, 3)
+        if kind == 0:
+            given = truth
+        elif kind == 1:
+            given = truth[:-1] + "x" if len(truth) > 1 else truth
+        else:
+            given = answer(i + 1)
+        pairs.append((given, truth))
+    return pairs
+
+
+def history(deck_name: str, n_drills: int, n_answers: int, days: int = 365) -> Tuple[Dict, List[Dict]]:
+    """
+    Trackerdata (save_data formaat) en antwoord-events voor een deck.
+    Antwoorden vallen willekeurig over de laatste `days` dagen.
+    """
+    from src.learning_tracker import _add_to_rollups, _empty_data, get_drill_id
+
+    rng = np.random.default_rng(SEED)
+    drill_of = rng.integers(0, n_drills, n_answers)
+    correct = rng.random(n_answers) < 0.7
+    end = datetime.now().replace(microsecond=0)
+    offsets = np.sort(rng.random(n_answers))[::-1] * days * 86400
+
+    data = _empty_data()
+    events = []
+    for drill, ok, offset in zip(drill_of.tolist(), correct.tolist(), offsets.tolist()):
+        moment = end - timedelta(seconds=offset)
+        key = get_drill_id(deck_name, question(drill))
+        state = data["drills"].get(key)
+        if state is None:
+            state = data["drills"][key] = {
+                "correct": 0, "incorrect": 0, "ease_factor": 2.5, "interval": 1,
+                "category": category(drill), "file": deck_name, "label": question(drill)[:50],
+            }
+        state["correct" if ok else "incorrect"] += 1
+        state["last_seen"] = moment.isoformat()
+        state["interval"] = min(365, state["interval"] * 2) if ok else 1
+        state["due"] = (moment + timedelta(days=state["interval"])).isoformat()
+
+        counts = data["categories"].setdefault(category(drill), {"correct": 0, "incorrect": 0})
+        counts["correct" if ok else "incorrect"] += 1
+        _add_to_rollups(data["rollups"], moment.strftime("%Y-%m-%d"), deck_name, category(drill), ok)
+        events.append({"date": moment.isoformat(), "correct": ok, "file": deck_name,
+                       "category": category(drill), "drill_id": key})
+
+    data["stats"]["total_correct"] = int(correct.sum())
+    data["stats"]["total_incorrect"] = int(n_answers - correct.sum())
+    return data, events
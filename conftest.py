@@ -0,0 +1 @@
+# Hoofdmap op sys.path, zodat de tests `from src.x import ...` kunnen gebruiken
@@ -0,0 +1,188 @@
+"""
+Achievements: declaratieve regels en een event-gedreven rule engine.
+Regels abonneren zich op de counters waar ze van afhangen; al behaalde
+regels doen niet meer mee, en drempelregels kosten O(1) per event.
+Een nieuwe achievement = een entry in ACHIEVEMENTS plus één regel in RULES.
+"""
+
+import bisect
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Mapping, Set, Tuple
+
+ACHIEVEMENTS = {
+    "first_blood": {
+        "icon": "🏆",
+        "name": "First Blood",
+        "desc": "Je eerste vraag goed beantwoord"
+    },
+    "on_fire": {
+        "icon": "🔥",
+        "name": "On Fire",
+        "desc": "10 vragen op rij goed"
+    },
+    "unstoppable": {
+        "icon": "⚡",
+        "name": "Unstoppable",
+        "desc": "25 vragen op rij goed"
+    },
+    "big_brain": {
+        "icon": "🧠",
+        "name": "Big Brain",
+        "desc": "100 vragen goed in één sessie"
+    },
+    "masochist": {
+        "icon": "💀",
+        "name": "Masochist",
+        "desc": "50 keer fout in één sessie"
+    },
+    "night_owl": {
+        "icon": "🦉",
+        "name": "Nachtbraker",
+        "desc": "Oefenen na middernacht"
+    },
+    "early_bird": {
+        "icon": "☀️",
+        "name": "Vroege Vogel",
+        "desc": "Oefenen voor 7:00"
+    },
+    "centurion": {
+        "icon": "💯",
+        "name": "Centurion",
+        "desc": "100 vragen totaal goed"
+    },
+    "scholar": {
+        "icon": "📚",
+        "name": "Scholar",
+        "desc": "500 vragen totaal goed"
+    },
+    "master": {
+        "icon": "🎓",
+        "name": "Master",
+        "desc": "1000 vragen totaal goed"
+    },
+    "streak_week": {
+        "icon": "📅",
+        "name": "Streaker",
+        "desc": "7 dagen op rij geoefend"
+    },
+    "perfectionist": {
+        "icon": "🎯",
+        "name": "Perfectionist",
+        "desc": "20 vragen op rij goed"
+    },
+    "comeback": {
+        "icon": "💪",
+        "name": "Comeback Kid",
+        "desc": "Na 5 fouten, 5 goed op rij"
+    },
+}
+
+
+@dataclass(frozen=True)
+class Threshold:
+    """Unlock zodra counter >= value."""
+    achievement_id: str
+    counter: str
+    value: int
+
+
+@dataclass(frozen=True)
+class Condition:
+    """Unlock zodra check(counters) waar is; alleen geëvalueerd als een van de counters wijzigt."""
+    achievement_id: str
+    counters: Tuple[str, ...]
+    check: Callable[[Mapping], bool]
+
+
+RULES = [
+    Threshold("first_blood", "total_correct", 1),
+    # Streaks
+    Threshold("on_fire", "current_streak", 10),
+    Threshold("perfectionist", "current_streak", 20),
+    Threshold("unstoppable", "current_streak", 25),
+    # Sessie
+    Threshold("big_brain", "session_correct", 100),
+    Threshold("masochist", "session_incorrect", 50),
+    # Totaal
+    Threshold("centurion", "total_correct", 100),
+    Threshold("scholar", "total_correct", 500),
+    Threshold("master", "total_correct", 1000),
+    # Dagen op rij
+    Threshold("streak_week", "days_streak", 7),
+    # Tijd van de dag
+    Condition("night_owl", ("hour",), lambda c: 0 <= c["hour"] < 5),
+    Condition("early_bird", ("hour",), lambda c: 5 <= c["hour"] < 7),
+    # Comeback kid: na 5 fouten, nu 5 goed op rij
+    Condition("comeback", ("current_streak", "session_incorrect"),
+              lambda c: c["current_streak"] >= 5 and c["session_incorrect"] >= 5),
+]
+
+
+class AchievementEngine:
+    """
+    Evalueert alleen de regels die nog open staan en geraakt worden door een event.
+
+    Drempelregels staan per counter gesorteerd op drempel; alleen de laagste
+    openstaande drempel hoeft gecontroleerd te worden.
+    """
+
+    def __init__(self, rules: Iterable, unlocked: Iterable[str] = ()):
+        done = set(unlocked)
+        rules = list(rules)
+        self._order = {rule.achievement_id: i for i, rule in enumerate(rules)}
+        self._thresholds: Dict[str, List[Tuple[int, str]]] = {}
+        self._conditions: Dict[str, List[Condition]] = {}
+        for rule in rules:
+            if rule.achievement_id in done:
+                continue
+            if isinstance(rule, Threshold):
+                bisect.insort(self._thresholds.setdefault(rule.counter, []),
+                              (rule.value, rule.achievement_id))
+            else:
+                for counter in rule.counters:
+                    self._conditions.setdefault(counter, []).append(rule)
+
+    def evaluate(self, counters: Mapping, changed: Iterable[str]) -> List[str]:
+        """
+        Verwerk een event: `changed` zijn de counters die door het event zijn gewijzigd.
+        Returns: nieuw behaalde achievement IDs (die daarna niet meer geëvalueerd worden).
+        """
+        unlocked: List[str] = []
+        for counter in changed:
+            pending = self._thresholds.get(counter)
+            while pending and pending[0][0] <= counters[counter]:
+                unlocked.append(pending.pop(0)[1])
+
+            for rule in self._conditions.get(counter, ()):
+                if (rule.achievement_id not in unlocked and all(c in counters for c in rule.counters)
+                        and rule.check(counters)):
+                    unlocked.append(rule.achievement_id)
+
+        unlocked.sort(key=self._order.get)  # Volgorde van RULES
+        for aid in unlocked:
+            self._discard(aid)
+        return unlocked
+
+    def catch_up(self, counters: Mapping) -> List[str]:
+        """
+        Eenmalig bij laden: evalueer alle openstaande regels waarvan de counters bekend
+        zijn, zodat een nieuwe regel waarvan de drempel al gehaald is niet op de
+        volgende wijziging van zijn counter hoeft te wachten.
+        Returns: nieuw behaalde achievement IDs.
+        """
+        subscribed = set(self._thresholds) | set(self._conditions)
+        return self.evaluate(counters, sorted(c for c in subscribed if c in counters))
+
+    def _discard(self, achievement_id: str) -> None:
+        """Haal een behaalde regel uit alle abonnementen."""
+        for counter, pending in self._thresholds.items():
+            self._thresholds[counter] = [p for p in pending if p[1] != achievement_id]
+        for counter, rules in self._conditions.items():
+            self._conditions[counter] = [r for r in rules if r.achievement_id != achievement_id]
+
+    @property
+    def pending(self) -> Set[str]:
+        """Achievement IDs die nog behaald kunnen worden."""
+        ids = {aid for pending in self._thresholds.values() for _, aid in pending}
+        ids |= {r.achievement_id for rules in self._conditions.values() for r in rules}
+        return ids
@@ -0,0 +1,212 @@
+"""
+Antwoordcontrole: vergelijkt een ingetypt antwoord met het antwoord van een drill.
+
+Elk antwoord wordt één keer voorbewerkt (en per uniek antwoord gecachet) tot
+vormen: genormaliseerde tekst (kleine letters, zonder accenten, leestekens en
+lidwoord vooraan), getallen met hun tolerantie en alternatieven ('Parijs/Paris',
+'a; b', tekst tussen haakjes mag weg). Een controle is daarna een opzoeking plus
+hoogstens een begrensde edit distance, alleen op de woorden: getallen moeten
+kloppen ('13,8' == '13.8', maar 1947 != 1948).
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from src.metrics import timed
+from src.search_index import fold
+
+# Toegestane typefouten: één per 7 tekens (zoals de oude fuzz.ratio > 85), korte woorden exact
+CHARS_PER_EDIT = 7
+ARTICLES = {"de", "het", "een", "the", "a", "an"}
+CACHE_SIZE = 1 << 16
+
+# Min-teken alleen vooraan een woord: '-273' is negatief, '2-8-5' zijn drie getallen
+_NUMBER = re.compile(r"(?<![\w.,])[-−]?\d+(?:[.,]\d+)*|\d+(?:[.,]\d+)*")
+_NOISE = re.compile(r"[^0-9a-z]+")
+_ALTERNATIVES = re.compile(r"\s*[;/]\s*")
+_PARENTHESES = re.compile(r"\s*\([^)]*\)")
+_LIST_SEPARATOR = re.compile(r"\s*,\s*|\s+(?:en|and|&)\s+")
+
+
+class Verdict(NamedTuple):
+    correct: bool
+    score: int  # 100 = exact, lager = met typefouten geaccepteerd (of fout)
+    expected: str  # de vorm waarmee vergeleken is
+
+
+class AnswerForm(NamedTuple):
+    text: str  # originele vorm (voor de feedback)
+    words: str  # genormaliseerde woorden zonder getallen
+    numbers: Tuple[Tuple[float, float], ...]  # (waarde, tolerantie)
+    unordered: bool  # opsomming: volgorde maakt niet uit
+
+
+def parse_number(raw: str) -> Tuple[float, float]:
+    """
+    Getal zoals in de decks geschreven (Nederlands): '9,5' en '13.8' zijn decimaal,
+    '300.000' is driehonderdduizend. Tolerantie = een halve eenheid van het laatste cijfer.
+    """
+    sign = -1.0 if raw[0] in "-−" else 1.0
+    raw = raw.lstrip("-−")
+    if "." in raw and "," in raw:
+        decimal = "," if raw.rfind(",") > raw.rfind(".") else "."
+    elif raw.count(",") == 1:
+        decimal = ","
+    elif raw.count(".") == 1 and not re.fullmatch(r"[1-9]\d{0,2}\.\d{3}", raw):
+        decimal = "."
+    else:
+        decimal = None  # alleen duizendtallen (of geen scheidingsteken)
+    if decimal is None:
+        return sign * float(re.sub(r"[.,]", "", raw)), 0.5
+    whole, _, fraction = raw.rpartition(decimal)
+    value = float(f"{re.sub(r'[.,]', '', whole)}.{fraction}")
+    return sign * value, 0.5 * 10 ** -len(fraction)
+
+
+def number_readings(raw: str) -> Set[float]:
+    """Mogelijke waarden van een ingetypt getal: ook Engels ('300,000', '1,5' blijft 1.5)."""
+    value = parse_number(raw)[0]
+    sign = -1.0 if value < 0 else 1.0
+    readings = {value}
+    digits = raw.lstrip("-−")
+    if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", digits):
+        readings.add(sign * float(re.sub(r"[.,]", "", digits)))
+    if digits.count(".") == 1 and "," not in digits:
+        readings.add(sign * float(digits))
+    return readings
+
+
+def normalize_words(text: str) -> str:
+    """Kleine letters, zonder accenten, leestekens en lidwoord vooraan."""
+    words = _NOISE.sub(" ", fold(text)).split()
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    return " ".join(words)
+
+
+def _unordered_key(text: str) -> str:
+    items = (normalize_words(item) for item in _LIST_SEPARATOR.split(fold(text)))
+    return " ".join(sorted(item for item in items if item))
+
+
+def max_edits(words: str) -> int:
+    return len(words) // CHARS_PER_EDIT
+
+
+def edit_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """Levenshtein afstand als die hoogstens `limit` is, anders None (stopt vroeg)."""
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if a == b:
+        return 0
+    # Gemeenschappelijk begin en eind tellen niet mee (bij een typefout blijft er weinig over)
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < len(a) - start and end < len(b) - start and a[-1 - end] == b[-1 - end]:
+        end += 1
+    a, b = a[start:len(a) - end], b[start:len(b) - end]
+    if not a or not b:
+        return len(a) + len(b)
+    # Alleen de band |i - j| <= limit van de DP-matrix is relevant; de rest is 'te ver'
+    too_far = limit + 1
+    previous = [i if i <= limit else too_far for i in range(len(a) + 1)]
+    for j in range(1, len(b) + 1):
+        cb = b[j - 1]
+        low, high = max(1, j - limit), min(len(a), j + limit)
+        current = [too_far] * (len(a) + 1)
+        if j <= limit:
+            current[0] = j
+        for i in range(low, high + 1):
+            cost = previous[i - 1] + (a[i - 1] != cb)
+            if previous[i] + 1 < cost:
+                cost = previous[i] + 1
+            if current[i - 1] + 1 < cost:
+                cost = current[i - 1] + 1
+            current[i] = cost
+        if min(current[low - 1:high + 1]) > limit:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+def _alternatives(answer: str) -> List[str]:
+    """Het antwoord zelf plus de varianten die ook goed zijn."""
+    forms = [answer]
+    parts = [p for p in _ALTERNATIVES.split(answer) if p.strip()]
+    # 'km/s' en '1/2' zijn geen alternatieven: alleen splitsen als elk deel langer is dan één teken
+    if len(parts) > 1 and all(len(normalize_words(p)) > 1 for p in parts):
+        forms.extend(parts)
+    forms.extend(_PARENTHESES.sub("", form) for form in list(forms) if "(" in form)
+    return list(dict.fromkeys(f.strip() for f in forms if f.strip()))
+
+
+class CompiledAnswer:
+    """Alle vormen van één antwoord, klaar om snel te vergelijken."""
+
+    __slots__ = ("answer", "forms", "exact")
+
+    def __init__(self, answer: str):
+        self.answer = answer
+        self.forms: List[AnswerForm] = []
+        # Vormen zonder getallen: genormaliseerde tekst -> vorm (goed zonder verdere moeite)
+        self.exact: Dict[str, AnswerForm] = {}
+        for text in _alternatives(answer):
+            numbers = tuple(parse_number(raw) for raw in _NUMBER.findall(text))
+            rest = _NUMBER.sub(" ", text)
+            unordered = not numbers and len(_LIST_SEPARATOR.split(text)) > 1 and "," in text
+            words = _unordered_key(rest) if unordered else normalize_words(rest)
+            form = AnswerForm(text, words, numbers, unordered)
+            self.forms.append(form)
+            if not numbers:
+                self.exact.setdefault(words, form)
+        if not self.forms:
+            # Leeg antwoord: alleen leeg invullen is goed (zoals vroeger fuzz.ratio('', '') == 100)
+            self.exact[""] = AnswerForm(answer, "", (), False)
+
+    def match(self, given: str) -> Verdict:
+        raw_numbers = _NUMBER.findall(given)
+        words = normalize_words(given)
+        form = self.exact.get(words)
+        if form is not None:
+            return Verdict(True, 100, form.text)
+
+        rest = normalize_words(_NUMBER.sub(" ", given))
+        readings = [number_readings(raw) for raw in raw_numbers]
+        best = Verdict(False, 0, self.answer)
+        for form in self.forms:
+            if form.numbers:
+                if len(readings) != len(form.numbers) or not all(
+                        any(abs(r - value) <= tolerance + 1e-9 * abs(value) for r in options)
+                        for options, (value, tolerance) in zip(readings, form.numbers)):
+                    continue
+                # Een eenheid mag weg of erbij ('13,8' en '13,8 miljard'), andere woorden niet
+                if (not rest and len(form.words.split()) <= 1) or (not form.words and len(rest.split()) <= 1):
+                    return Verdict(True, 100, form.text)
+                target, candidate = form.words, rest
+            else:
+                target = form.words
+                candidate = _unordered_key(given) if form.unordered else words
+            if candidate == target:
+                return Verdict(True, 100, form.text)
+            distance = edit_distance(candidate, target, max_edits(target))
+            if distance is not None:
+                score = round(100 * (1 - distance / max(len(target), 1)))
+                if score > best.score:
+                    best = Verdict(True, score, form.text)
+        return best
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def compile_answer(answer: str) -> CompiledAnswer:
+    """Voorbewerkt antwoord (gecachet per uniek antwoord)."""
+    return CompiledAnswer(answer)
+
+
+@timed("answers.check")
+def check_answer(given: str, answer: str) -> Verdict:
+    """Is `given` goed voor een drill met antwoord `answer`?"""
+    return compile_answer(answer).match(given)
+
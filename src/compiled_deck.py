@@ -0,0 +1,302 @@
+"""
+Gecompileerde decks: een parse_file resultaat als compact binair bestand
+(stringtabel, drills array met categoriebereiken, contextblobs en de drill ID's
+van de learning tracker). open_compiled() laadt het met mmap en leest drills
+pas als ze gebruikt worden: deck wisselen in de app kost zo vrijwel niets,
+hoe groot het deck ook is. Verouderde bestanden worden vanzelf opnieuw gecompileerd.
+
+Indeling (little-endian, alle verwijzingen naar strings zijn indexen in de stringtabel):
+    header       zie HEADER (+ offsets van de secties)
+    strings      (aantal + 1) x u32 offsets in de blob, daarna de UTF-8 blob
+    drills       per drill: vraag, antwoord, categorie (3 x u32)
+    categories   per categorie: naam, start, aantal (3 x u32) in `order`
+    order        drill indexen gegroepeerd per categorie (u32)
+    context      per blok: categorie, tekst (2 x u32), in parse_file volgorde
+    ids          per drill de 8 byte drill_hash (zelfde ID als de tracker)
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from collections.abc import Mapping, Sequence
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.metrics import count, timed
+from src.parser import PARSER_VERSION, RACY_SECONDS, _digest, get_cache, parse_text
+
+COMPILED_DIR = Path(__file__).parent.parent / "compiled"
+SUFFIX = ".jcd"
+MAGIC = b"JCDK"
+FORMAT_VERSION = 1
+
+# magic, formaat, parser versie, drills, categorieën, contextblokken, strings,
+# bron grootte, bron mtime_ns, gecompileerd op, bron digest (16 bytes),
+# offsets: strings, blob, drills, categories, order, context, ids
+HEADER = struct.Struct("<4sHHIIIIQqd16s7Q")
+_PAIR = struct.Struct("<II")
+_TRIPLE = struct.Struct("<III")
+
+
+def _u32(values) -> bytes:
+    """Little-endian u32 array als bytes."""
+    packed = array("I", values)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def encode_deck(name: str, result: Dict[str, Any], source: Tuple[int, int, str] = (0, 0, "")) -> bytes:
+    """
+    Zet een parse_file resultaat om naar het binaire formaat.
+    `source` = (grootte, mtime_ns, digest) van het tekstbestand, voor de versheidscheck.
+    """
+    # Stringtabel: elke unieke string één keer (dict houdt de invoegvolgorde aan)
+    strings: Dict[str, int] = {}
+    intern = strings.setdefault
+    drills = result["drills"]
+    categories: Dict[str, List[int]] = {}
+    records = array("I")
+    ids = bytearray()
+    prefix = f"{name}\x1f"
+    for i, drill in enumerate(drills):
+        question = drill["question"]
+        records.extend((intern(question, len(strings)), intern(drill["answer"], len(strings)),
+                        intern(drill["category"], len(strings))))
+        categories.setdefault(drill["category"], []).append(i)
+        # Zelfde hash als drill_state.drill_hash, maar als ruwe bytes
+        ids += hashlib.blake2b((prefix + question).encode("utf-8"), digest_size=8).digest()
+
+    category_records, order = [], []
+    for category, members in categories.items():
+        category_records.extend((intern(category, len(strings)), len(order), len(members)))
+        order.extend(members)
+    context_records = []
+    for category, text in result["context"].items():
+        context_records.extend((intern(category, len(strings)), intern(text, len(strings))))
+
+    encoded = [text.encode("utf-8") for text in strings]
+    blob = b"".join(encoded)
+    if len(blob) >= 1 << 32:
+        raise ValueError(f"Deck te groot voor het binaire formaat: {name}")
+    offsets = list(accumulate((len(e) for e in encoded), initial=0))
+
+    sections = [_u32(offsets), blob, _u32(records), _u32(category_records), _u32(order),
+                _u32(context_records), bytes(ids)]
+    positions, position = [], HEADER.size
+    for section in sections:
+        positions.append(position)
+        position += len(section)
+
+    size, mtime_ns, digest = source
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, PARSER_VERSION, len(drills), len(categories),
+        len(result["context"]), len(strings), size, mtime_ns, time.time(),
+        bytes.fromhex(digest) if digest else bytes(16), *positions,
+    )
+    return header + b"".join(sections)
+
+
+class CompiledDrills(Sequence):
+    """Drills van een gecompileerd deck; elke drill wordt pas bij opvragen gedecodeerd."""
+
+    def __init__(self, deck: "CompiledDeck"):
+        self._deck = deck
+        self._ids: Optional[List[str]] = None
+
+    def __len__(self) -> int:
+        return self._deck.n_drills
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        deck = self._deck
+        question, answer, category = _TRIPLE.unpack_from(deck.buffer, deck.drills_offset + 12 * i)
+        return {"category": deck.string(category), "question": deck.string(question),
+                "answer": deck.string(answer)}
+
+    def drill_ids(self) -> List[str]:
+        """Tracker drill ID's (drill_hash) van alle drills, zonder de drills te decoderen."""
+        if self._ids is None:
+            deck = self._deck
+            raw = deck.buffer[deck.ids_offset:deck.ids_offset + 8 * len(self)].hex()
+            self._ids = [raw[i:i + 16] for i in range(0, len(raw), 16)]
+        return self._ids
+
+    def for_category(self, category: str) -> List[Dict]:
+        """Alle drills van één categorie (leest alleen die drills)."""
+        return [self[i] for i in self._deck.category_members(category)]
+
+
+class CompiledContext(Mapping):
+    """Context per categorie van een gecompileerd deck; tekst wordt pas bij opvragen gelezen."""
+
+    def __init__(self, deck: "CompiledDeck"):
+        self._deck = deck
+        self._index: Optional[Dict[str, int]] = None
+
+    def _positions(self) -> Dict[str, int]:
+        if self._index is None:
+            deck = self._deck
+            self._index = {}
+            for i in range(deck.n_context):
+                name, _ = _PAIR.unpack_from(deck.buffer, deck.context_offset + 8 * i)
+                self._index[deck.string(name)] = i
+        return self._index
+
+    def __getitem__(self, category: str) -> str:
+        i = self._positions()[category]
+        _, text = _PAIR.unpack_from(self._deck.buffer, self._deck.context_offset + 8 * i)
+        return self._deck.string(text)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._positions())
+
+    def __len__(self) -> int:
+        return self._deck.n_context
+
+
+class CompiledDeck:
+    """Een geopend (gemmapt) gecompileerd deck. as_deck() geeft de parse_file vorm."""
+
+    def __init__(self, path: Path, name: str):
+        self.path = Path(path)
+        self.name = name
+        with open(self.path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, parser_version, self.n_drills, self.n_categories, self.n_context,
+         self.n_strings, self.source_size, self.source_mtime_ns, self.compiled_at, digest,
+         self.strings_offset, self.blob_offset, self.drills_offset, self.categories_offset,
+         self.order_offset, self.context_offset, self.ids_offset) = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC or version != FORMAT_VERSION or parser_version != PARSER_VERSION:
+            self.buffer.close()
+            raise ValueError(f"Geen (actueel) gecompileerd deck: {self.path}")
+        self.source_digest = digest.hex()
+        self.drills = CompiledDrills(self)
+        self.context = CompiledContext(self)
+
+    def string(self, i: int) -> str:
+        start, end = _PAIR.unpack_from(self.buffer, self.strings_offset + 4 * i)
+        return self.buffer[self.blob_offset + start:self.blob_offset + end].decode("utf-8")
+
+    def category_members(self, category: str) -> List[int]:
+        for i in range(self.n_categories):
+            name, start, n = _TRIPLE.unpack_from(self.buffer, self.categories_offset + 12 * i)
+            if self.string(name) == category:
+                return list(struct.unpack_from(f"<{n}I", self.buffer, self.order_offset + 4 * start))
+        return []
+
+    @property
+    def categories(self) -> List[str]:
+        return [self.string(_TRIPLE.unpack_from(self.buffer, self.categories_offset + 12 * i)[0])
+                for i in range(self.n_categories)]
+
+    def is_fresh(self, source: Path) -> bool:
+        """Hoort dit bestand nog bij de huidige inhoud van `source`?"""
+        st = source.stat()
+        if (st.st_size, st.st_mtime_ns) != (self.source_size, self.source_mtime_ns):
+            return False
+        if st.st_mtime_ns / 1e9 >= self.compiled_at - RACY_SECONDS:
+            # Mogelijk gewijzigd binnen dezelfde mtime: op inhoud controleren
+            return _digest(source.read_bytes()) == self.source_digest
+        return True
+
+    def as_deck(self) -> Dict[str, Any]:
+        return {"filename": self.name, "drills": self.drills, "context": self.context}
+
+    def close(self) -> None:
+        """Geef de mmap vrij; drills en context van dit deck zijn daarna niet meer leesbaar."""
+        if not self.buffer.closed:
+            self.buffer.close()
+
+
+def compiled_path(source: Path, compiled_dir: Optional[Path] = None) -> Path:
+    """Pad van het gecompileerde bestand (naam + hash van het bronpad, tegen botsingen)."""
+    source = Path(source).resolve()
+    tag = hashlib.blake2b(str(source).encode("utf-8"), digest_size=4).hexdigest()
+    return Path(compiled_dir or COMPILED_DIR) / f"{source.name}.{tag}{SUFFIX}"
+
+
+@timed("compiled.compile")
+def compile_deck(source: Path, target: Optional[Path] = None) -> Path:
+    """Compileer een tekstdeck (via de parse cache) naar het binaire formaat. Returns: pad."""
+    source = Path(source)
+    target = Path(target) if target else compiled_path(source)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    st = source.stat()
+    raw = source.read_bytes()
+    cache = get_cache()
+    result = cache.lookup(source)
+    if result is None:
+        result = parse_text(source.name, raw.decode("utf-8"))
+        cache.remember(source, result, st.st_size, st.st_mtime_ns)
+    data = encode_deck(source.name, result, (st.st_size, st.st_mtime_ns, _digest(raw)))
+
+    # Atomisch vervangen: lezers met een oude mmap houden hun (oude) bestand
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, target)
+    count("compiled.compiled")
+    return target
+
+
+_open: Dict[Path, CompiledDeck] = {}
+_open_lock = threading.Lock()
+
+
+@timed("compiled.open")
+def open_compiled(source: Path, compiled_dir: Optional[Path] = None) -> CompiledDeck:
+    """
+    Open het gecompileerde deck van `source` (mmap). Is het er nog niet of hoort
+    het bij een oudere versie van de tekst, dan wordt het eerst (opnieuw) gecompileerd.
+    Geopende decks worden procesbreed hergebruikt; een verouderd deck blijft leesbaar
+    voor wie het nog vasthoudt.
+    """
+    source = Path(source)
+    target = compiled_path(source, compiled_dir)
+    with _open_lock:
+        deck = _open.get(target)
+        if deck is not None:
+            if deck.is_fresh(source):
+                count("compiled.reused")
+                return deck
+            # Niet sluiten: sessies kunnen dit deck nog lezen; de mmap gaat weg met de laatste verwijzing
+            del _open[target]
+        try:
+            deck = CompiledDeck(target, source.name)
+            if not deck.is_fresh(source):
+                deck.close()
+                deck = None
+        except (OSError, ValueError, struct.error):
+            deck = None
+        if deck is None:
+            deck = CompiledDeck(compile_deck(source, target), source.name)
+        _open[target] = deck
+        return deck
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compileer decks naar het binaire formaat")
+    parser.add_argument("paths", nargs="*", default=["data"], help="decks of mappen (standaard: data)")
+    args = parser.parse_args()
+
+    for arg in args.paths:
+        arg = Path(arg)
+        for source in sorted(arg.glob("*.txt")) if arg.is_dir() else [arg]:
+            started = time.perf_counter()
+            target = compile_deck(source)
+            print(f"{source} -> {target} ({target.stat().st_size / 1e6:.1f} MB, "
+                  f"{time.perf_counter() - started:.2f} s)")
@@ -0,0 +1,117 @@
+"""
+Corpus: alle decks uit data/ in één keer geladen, met één globale index.
+Decks die niet (meer) in de parse cache staan worden parallel geparsed in een
+process pool; de rest komt direct uit de cache. Cross-deck functies (alle
+decks oefenen, zoeken, deduplicatie) delen zo één structuur in het geheugen.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from src.drill_state import drill_hash
+from src.metrics import count, timed
+from src.parser import get_cache, read_deck
+
+ALL_DECKS = "📚 Alle decks"
+# Minder dan dit aan te parsen bytes: geen process pool (opstarten kost meer dan het oplevert)
+PARALLEL_MIN_BYTES = 1 << 20
+
+
+class Corpus:
+    """
+    Globale index over geparste decks.
+
+    `drills` is één lijst met per drill ook `file` en `id` (zelfde ID als de
+    learning tracker); `by_file`, `by_category` en `by_id` verwijzen naar
+    posities in die lijst. `context` voegt de context per categorie over alle
+    decks samen.
+    """
+
+    def __init__(self, decks: Dict[str, Dict]):
+        self.decks = decks  # bestandsnaam -> parse_file resultaat
+        self.drills: List[Dict] = []
+        self.by_file: Dict[str, range] = {}
+        self.by_category: Dict[str, List[int]] = {}
+        self.by_id: Dict[str, int] = {}
+        blocks: Dict[str, List[str]] = {}
+
+        for name, deck in decks.items():
+            start = len(self.drills)
+            for drill in deck["drills"]:
+                drill_id = drill_hash(name, drill["question"])
+                position = len(self.drills)
+                self.drills.append({"file": name, "id": drill_id, **drill})
+                self.by_category.setdefault(drill["category"], []).append(position)
+                self.by_id.setdefault(drill_id, position)
+            self.by_file[name] = range(start, len(self.drills))
+            for category, text in deck["context"].items():
+                blocks.setdefault(category, []).append(text)
+
+        self.context: Dict[str, str] = {category: " ".join(parts) for category, parts in blocks.items()}
+
+    def __len__(self) -> int:
+        return len(self.drills)
+
+    @property
+    def files(self) -> List[str]:
+        return list(self.decks)
+
+    @property
+    def categories(self) -> List[str]:
+        return list(self.by_category)
+
+    def get(self, drill_id: str) -> Optional[Dict]:
+        position = self.by_id.get(drill_id)
+        return self.drills[position] if position is not None else None
+
+    def drills_for(self, file: Optional[str] = None, category: Optional[str] = None) -> List[Dict]:
+        """Drills van één deck en/of categorie (zonder filters: alles)."""
+        if file is None and category is None:
+            return self.drills
+        if category is None:
+            return [self.drills[i] for i in self.by_file.get(file, ())]
+        positions = self.by_category.get(category, [])
+        if file is not None:
+            span = self.by_file.get(file, range(0))
+            positions = [i for i in positions if i in span]
+        return [self.drills[i] for i in positions]
+
+    def as_deck(self, name: str = ALL_DECKS) -> Dict:
+        """Het hele corpus in parse_file vorm, voor de app ('Alle decks')."""
+        return {"filename": name, "drills": self.drills, "context": self.context}
+
+
+def _parse_all(paths: List[Path], workers: Optional[int]) -> Iterable:
+    """read_deck voor elk pad; parallel als het genoeg werk is."""
+    total = sum(path.stat().st_size for path in paths)
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+    if workers <= 1 or total < PARALLEL_MIN_BYTES:
+        return map(read_deck, paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(paths) // (workers * 4))
+        return list(pool.map(read_deck, paths, chunksize=chunksize))
+
+
+@timed("corpus.load")
+def load_corpus(data_dir: Path, workers: Optional[int] = None, pattern: str = "*.txt") -> Corpus:
+    """
+    Laad alle decks uit `data_dir`. Gecachte decks komen uit de parse cache;
+    de rest wordt (over `workers` processen, standaard alle cores) geparsed
+    en daarna in de cache opgeslagen.
+    """
+    cache = get_cache()
+    paths = sorted(Path(data_dir).glob(pattern))
+    decks: Dict[str, Optional[Dict]] = {}
+    misses = []
+    for path in paths:
+        decks[path.name] = cache.lookup(path)
+        if decks[path.name] is None:
+            misses.append(path)
+
+    count("corpus.parsed", len(misses))
+    for path, (result, size, mtime_ns, digest) in zip(misses, _parse_all(misses, workers)):
+        cache.put(path, result, size, mtime_ns, digest)
+        decks[path.name] = result
+    return Corpus(decks)
@@ -0,0 +1,397 @@
+"""
+Deck watcher: houdt de decks in data/ in de gaten (polling, geen extra dependency)
+en parset bij een wijziging alleen de ## secties die echt veranderd zijn.
+Elke wijziging levert een DeckDiff op (toegevoegd, verwijderd, gewijzigd,
+hernoemd) die op het geladen deck en de learning tracker wordt toegepast:
+een drill met een aangepaste vraag houdt zo zijn historie.
+"""
+
+import hashlib
+import io
+import re
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.drill_state import drill_hash
+from src.metrics import count, timed
+from src.parser import CONTEXT, DRILL, get_cache, iter_parse_lines
+
+# Minimale gelijkenis (vraag + antwoord) om verwijderd + toegevoegd als hernoeming te zien
+RENAME_MIN_SIMILARITY = 0.6
+# Bij grote herschrijvingen geen hernoemingen zoeken (kwadratisch in het aantal drills)
+MAX_RENAME_PAIRS = 10_000
+# Zoveel wijzigingen onthoudt de watcher voor sessies die achterlopen
+HISTORY = 1000
+
+# Regeleinde vóór een ## header (na eventuele witruimte, zoals strip() in de parser);
+# het vaste '\n' begin laat de regex engine snel zoeken
+_HEADER = re.compile(r"\n(?=[^\S\n]*##)")
+
+
+def split_sections(text: str) -> List[str]:
+    """
+    Deel een deck op in secties: de regels voor de eerste header, daarna elke
+    ## header met zijn regels. Elke sectie parset los van de rest (de header
+    bepaalt de categorie), dus alleen gewijzigde secties hoeven opnieuw.
+    """
+    # Zelfde regeleinden als parse_file (universal newlines)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    starts = [m.end() for m in _HEADER.finditer(text)]
+    bounds = [0] + starts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:]) if a < b]
+
+
+@dataclass
+class DeckDiff:
+    """Verschil tussen twee versies van een deck, op drill niveau (drills zijn parse_file dicts)."""
+
+    file: str
+    added: List[Dict] = field(default_factory=list)
+    removed: List[Dict] = field(default_factory=list)
+    changed: List[Tuple[Dict, Dict]] = field(default_factory=list)  # (oud, nieuw), zelfde vraag
+    renamed: List[Tuple[Dict, Dict]] = field(default_factory=list)  # (oud, nieuw), andere vraag
+    context_changed: bool = False
+    sections_parsed: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed or self.renamed or self.context_changed)
+
+    def updated(self, drill: Optional[Dict], file: str) -> Optional[Dict]:
+        """De versie van `drill` (uit bestand `file`) na deze wijziging; None = verwijderd."""
+        if drill is None or file != self.file:
+            return drill
+        question = drill["question"]
+        for old, new in self.changed + self.renamed:
+            if old["question"] == question:
+                return _like(drill, new, file)
+        if any(old["question"] == question for old in self.removed):
+            return None
+        return drill
+
+
+def _like(template: Dict, drill: Dict, file: str) -> Dict:
+    """`drill` met dezelfde extra velden als `template` (file/id bij corpus drills)."""
+    if "file" not in template:
+        return drill
+    extra = {"file": file}
+    if "id" in template:
+        extra["id"] = drill_hash(file, drill["question"])
+    return {**extra, **drill}
+
+
+def _similarity(a: Dict, b: Dict) -> float:
+    matcher = SequenceMatcher(None, f"{a['question']} {a['answer']}", f"{b['question']} {b['answer']}")
+    if matcher.real_quick_ratio() < RENAME_MIN_SIMILARITY or matcher.quick_ratio() < RENAME_MIN_SIMILARITY:
+        return 0.0
+    return matcher.ratio()
+
+
+def _pair_renames(diff: DeckDiff) -> None:
+    """Koppel verwijderde aan toegevoegde drills die er sterk op lijken (beste paren eerst)."""
+    if not diff.removed or not diff.added or len(diff.removed) * len(diff.added) > MAX_RENAME_PAIRS:
+        return
+    candidates = sorted(
+        ((_similarity(old, new), i, j) for i, old in enumerate(diff.removed) for j, new in enumerate(diff.added)),
+        reverse=True,
+    )
+    used_old, used_new = set(), set()
+    for score, i, j in candidates:
+        if score < RENAME_MIN_SIMILARITY:
+            break
+        if i in used_old or j in used_new:
+            continue
+        used_old.add(i)
+        used_new.add(j)
+        diff.renamed.append((diff.removed[i], diff.added[j]))
+    diff.removed = [d for i, d in enumerate(diff.removed) if i not in used_old]
+    diff.added = [d for j, d in enumerate(diff.added) if j not in used_new]
+
+
+class SectionedDeck:
+    """
+    Eén deck als lijst secties met hun geparste drills en context. update()
+    parset alleen secties waarvan de tekst nieuw is en vergelijkt alleen de
+    drills van verdwenen en nieuwe secties; ongewijzigde secties worden hergebruikt.
+    Van de sectietekst wordt alleen een hash bewaard.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        # (hash van de tekst, drills, context); hash None = beginstand uit load()
+        self.sections: List[Tuple[Optional[bytes], List[Dict], List[Tuple[str, str]]]] = []
+        self.questions: Counter = Counter()  # vraag -> aantal keer in het deck
+        self.result: Dict = {"filename": name, "drills": [], "context": {}}
+
+    def load(self, result: Dict) -> None:
+        """
+        Beginstand uit een al geparst deck (de parse cache), zonder secties te parsen.
+        De eerste update() parset het deck dan één keer helemaal en vergelijkt met deze stand.
+        """
+        self.sections = [(None, result["drills"], list(result["context"].items()))]
+        self.questions = Counter(d["question"] for d in result["drills"])
+        self.result = result
+
+    @staticmethod
+    def _digest(chunk: str) -> bytes:
+        return hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest()
+
+    @staticmethod
+    def _parse(chunk: str, digest: bytes) -> Tuple[bytes, List[Dict], List[Tuple[str, str]]]:
+        drills, blocks = [], []
+        for event in iter_parse_lines(io.StringIO(chunk)):
+            if event[0] == DRILL:
+                drills.append(event[1])
+            elif event[0] == CONTEXT:
+                blocks.append((event[1], event[2]))
+        return digest, drills, blocks
+
+    @timed("watcher.update_deck")
+    def update(self, text: str) -> DeckDiff:
+        previous = Counter(section[0] for section in self.sections)
+        parsed = {section[0]: section for section in self.sections}
+        sections, fresh = [], []
+        for chunk in split_sections(text):
+            digest = self._digest(chunk)
+            if previous[digest] > 0:
+                previous[digest] -= 1
+                sections.append(parsed[digest])
+            else:
+                section = self._parse(chunk, digest)
+                sections.append(section)
+                fresh.append(section)
+        gone = [parsed[digest] for digest, n in previous.items() for _ in range(n)]
+
+        diff = self._diff(gone, fresh)
+        diff.sections_parsed = len(fresh)
+        count("watcher.sections_parsed", len(fresh))
+        self.sections = sections
+        previous_context = self.result["context"]
+        self.result = self._assemble()
+        diff.context_changed = self.result["context"] != previous_context
+        return diff
+
+    def _diff(self, gone: List[Tuple], fresh: List[Tuple]) -> DeckDiff:
+        before = [drill for section in gone for drill in section[1]]
+        after = [drill for section in fresh for drill in section[1]]
+        old_by_question = {d["question"]: d for d in reversed(before)}  # eerste voorkomen wint
+        new_by_question = {d["question"]: d for d in reversed(after)}
+        existed = {q: self.questions[q] > 0 for q in old_by_question.keys() | new_by_question.keys()}
+        self.questions.subtract(d["question"] for d in before)
+        self.questions.update(d["question"] for d in after)
+
+        diff = DeckDiff(self.name)
+        for question, old in old_by_question.items():
+            new = new_by_question.get(question)
+            if new is not None:
+                if new != old:
+                    diff.changed.append((old, new))
+            elif self.questions[question] <= 0:
+                diff.removed.append(old)
+        for question, new in new_by_question.items():
+            if question not in old_by_question and not existed[question]:
+                diff.added.append(new)
+        for question in existed:
+            if self.questions[question] <= 0:
+                del self.questions[question]
+        _pair_renames(diff)
+        return diff
+
+    def _assemble(self) -> Dict:
+        """Het parse_file resultaat uit de secties (zelfde vorm en volgorde als parse_lines)."""
+        drills: List[Dict] = []
+        blocks: Dict[str, List[str]] = {}
+        for _, section_drills, section_blocks in self.sections:
+            drills.extend(section_drills)
+            for category, text in section_blocks:
+                blocks.setdefault(category, []).append(text)
+        context = {category: " ".join(parts).strip() for category, parts in blocks.items()}
+        return {"filename": self.name, "drills": drills, "context": {k: v for k, v in context.items() if v}}
+
+
+def apply_diff(deck: Dict, diff: DeckDiff, include_added: bool = True) -> int:
+    """
+    Pas een diff toe op een geladen deck met drills uit meerdere bestanden
+    (elke drill heeft een 'file', zoals bij 'Alle decks' of een zoekopdracht).
+    De drill dicts zelf worden niet aangepast (die worden gedeeld). Returns:
+    aantal aangepaste drills.
+    """
+    replaced = {old["question"]: new for old, new in diff.changed + diff.renamed}
+    removed = {d["question"] for d in diff.removed}
+    drills, present, touched = [], set(), 0
+    for drill in deck["drills"]:
+        if drill.get("file") == diff.file:
+            question = drill["question"]
+            if question in removed:
+                touched += 1
+                continue
+            if question in replaced:
+                drill = _like(drill, replaced[question], diff.file)
+                touched += 1
+            present.add(drill["question"])
+        drills.append(drill)
+    if include_added:
+        template = next((d for d in deck["drills"] if "file" in d), {"file": diff.file})
+        for new in diff.added:
+            if new["question"] not in present:
+                drills.append(_like(template, new, diff.file))
+                touched += 1
+    deck["drills"] = drills
+    return touched
+
+
+def apply_to_tracker(diff: DeckDiff) -> int:
+    """Hernoemde drills houden hun historie in de learning tracker. Returns: aantal."""
+    from src.learning_tracker import rename_drill
+
+    moved = 0
+    for old, new in diff.renamed:
+        moved += rename_drill(diff.file, old["question"], new["question"], new["category"])
+    return moved
+
+
+class DeckWatcher:
+    """
+    Pollt een map met decks. Gewijzigde bestanden (grootte/mtime) worden gelezen
+    en per sectie bijgewerkt; de diffs gaan naar de listeners en in een
+    genummerde geschiedenis, zodat elke sessie zijn geladen deck kan bijwerken
+    met changes_since(). De eerste scan geeft geen diffs (beginstand) en neemt
+    de decks uit de parse cache over; een deck wordt pas in secties geparsed
+    als het voor het eerst wijzigt.
+    """
+
+    def __init__(self, data_dir: Path, pattern: str = "*.txt",
+                 listeners: Optional[List[Callable[[DeckDiff], object]]] = None):
+        self.data_dir = Path(data_dir)
+        self.pattern = pattern
+        self.listeners = list(listeners or [])
+        self.decks: Dict[str, SectionedDeck] = {}
+        self.errors: Dict[str, str] = {}  # bestandsnaam -> laatste fout
+        self.version = 0
+        self.history: deque = deque(maxlen=HISTORY)  # (versie, DeckDiff)
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._scanned = False
+
+    def deck(self, name: str) -> Optional[Dict]:
+        """Het actuele parse_file resultaat van een deck (None = onbekend of verwijderd)."""
+        with self._lock:
+            sectioned = self.decks.get(name)
+            return sectioned.result if sectioned is not None else None
+
+    @timed("watcher.poll")
+    def poll(self) -> List[DeckDiff]:
+        """Eén scan van de map; geeft de diffs van gewijzigde en verwijderde decks."""
+        diffs = []
+        with self._lock:
+            seen = set()
+            for path in sorted(self.data_dir.glob(self.pattern)):
+                seen.add(path.name)
+                try:
+                    diff = self._check(path)
+                except (OSError, UnicodeDecodeError) as e:
+                    self.errors[path.name] = str(e)
+                    continue
+                self.errors.pop(path.name, None)
+                if diff:
+                    diffs.append(diff)
+            for name in set(self.decks) - seen:
+                sectioned = self.decks.pop(name)
+                self._stats.pop(name, None)
+                diff = DeckDiff(name, removed=list(sectioned.result["drills"]),
+                                context_changed=bool(sectioned.result["context"]))
+                if diff and self._scanned:
+                    diffs.append(diff)
+
+            initial = not self._scanned
+            self._scanned = True
+            if initial:
+                return []
+            for diff in diffs:
+                self.version += 1
+                self.history.append((self.version, diff))
+
+        for diff in diffs:
+            for listener in self.listeners:
+                try:
+                    listener(diff)
+                except Exception as e:  # Een listener mag de watcher niet stoppen
+                    self.errors[diff.file] = f"{getattr(listener, '__name__', listener)}: {e}"
+        return diffs
+
+    def _check(self, path: Path) -> Optional[DeckDiff]:
+        st = path.stat()
+        stamp = (st.st_size, st.st_mtime_ns)
+        if self._stats.get(path.name) == stamp:
+            return None
+        sectioned = self.decks.get(path.name)
+        if sectioned is None and not self._scanned:
+            # Beginstand: het deck zoals de app het laadt, zonder elke sectie te parsen
+            sectioned = SectionedDeck(path.name)
+            sectioned.load(get_cache().load(path))
+            self.decks[path.name] = sectioned
+            self._stats[path.name] = stamp
+            return None
+        text = path.read_bytes().decode("utf-8")
+        if sectioned is None:
+            sectioned = self.decks[path.name] = SectionedDeck(path.name)
+        diff = sectioned.update(text)
+        self._stats[path.name] = stamp
+        if self._scanned:
+            # Parse cache in het geheugen bijwerken: load_deck en de zoekindex hoeven niet
+            # opnieuw te parsen (de cache op schijf volgt bij de volgende load na een herstart)
+            get_cache().remember(path, sectioned.result, st.st_size, st.st_mtime_ns)
+        return diff
+
+    def changes_since(self, version: int) -> Tuple[int, Optional[List[DeckDiff]]]:
+        """
+        (huidige versie, diffs na `version`). None in plaats van diffs als de
+        geschiedenis niet ver genoeg teruggaat: laad het deck dan opnieuw.
+        """
+        with self._lock:
+            if version >= self.version:
+                return self.version, []
+            if not self.history or self.history[0][0] > version + 1:
+                return self.version, None
+            return self.version, [diff for v, diff in self.history if v > version]
+
+    # --- Achtergrondthread -------------------------------------------------------------
+
+    def start(self, interval: float = 1.0) -> "DeckWatcher":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._loop, args=(interval,), name="deck-watcher", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def _loop(self, interval: float) -> None:
+        self.poll()
+        while not self._stop.wait(interval):
+            self.poll()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+
+_watchers: Dict[Path, DeckWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def get_watcher(data_dir: Path, interval: float = 1.0) -> DeckWatcher:
+    """Procesbrede, gestarte watcher voor `data_dir` die ook de tracker bijwerkt."""
+    key = Path(data_dir).resolve()
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = _watchers[key] = DeckWatcher(key, listeners=[apply_to_tracker]).start(interval)
+    return watcher
@@ -0,0 +1,213 @@
+"""
+Deduplicatie: vind (bijna) dubbele drills over alle decks met MinHash/LSH en link
+ze in drill_links.sqlite, zodat ze één SM-2 toestand delen.
+
+Elke drill wordt een verzameling byte 4-grams van de genormaliseerde vraag +
+antwoord (kleine letters, zonder accenten en leestekens). MinHash schat de
+Jaccard gelijkenis van die verzamelingen; LSH (banden van de signatuur) levert
+alleen paren die waarschijnlijk lijken, dus geen vergelijking van alle paren.
+Kandidaten worden gecontroleerd op geschatte gelijkenis én een passend antwoord
+('afstand tot Mars' en 'afstand tot Venus' lijken sterk, maar zijn niet hetzelfde feit).
+"""
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.drill_links import get_links
+from src.drill_state import drill_hash
+from src.learning_tracker import merge_linked_drills
+from src.metrics import count, timed
+from src.search_index import fold
+
+NUM_PERM = 64
+BANDS = 16  # 16 banden van 4 rijen: paren vanaf ~0.5 gelijkenis worden kandidaat
+THRESHOLD = 0.7  # Minimale geschatte Jaccard gelijkenis voor een link
+SHINGLE = 4
+# Buckets met meer drills zijn sjabloontekst (bijv. 'Hoeveel miljoen km ... tot de zon?'): overslaan
+MAX_BUCKET = 50
+# Zoveel shingles per keer door de hashfuncties (geheugen: CHUNK x NUM_PERM x 4 bytes)
+CHUNK = 1 << 16
+SEED = 20240521
+
+_rng = np.random.default_rng(SEED)
+# Permutaties van de 32-bit getallen: x -> a*x + b mod 2^32 (a oneven), op vooraf gemengde 4-grams
+_A = (_rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint32) << np.uint32(1)) | np.uint32(1)
+_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint32)
+
+_NOISE = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Kleine letters, geen accenten of leestekens (dus ook 13,8 == 13.8)."""
+    return _NOISE.sub(" ", fold(text)).strip()
+
+
+def _answers_match(a: str, b: str) -> bool:
+    """Zelfde antwoord, of het ene antwoord bevat het andere ('Mars' / 'de planeet Mars')."""
+    a_tokens, b_tokens = set(normalize(a).split()), set(normalize(b).split())
+    if not a_tokens or not b_tokens:
+        return a_tokens == b_tokens
+    return a_tokens <= b_tokens or b_tokens <= a_tokens
+
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    """32-bit finalizer (murmur3 fmix32): elk bit van de 4-gram beïnvloedt de hele hash."""
+    x = x ^ (x >> np.uint32(16))
+    x *= np.uint32(0x85EBCA6B)
+    x ^= x >> np.uint32(13)
+    x *= np.uint32(0xC2B2AE35)
+    return x ^ (x >> np.uint32(16))
+
+
+def signatures(texts: Sequence[str]) -> np.ndarray:
+    """MinHash signaturen (len(texts) x NUM_PERM) van de byte 4-grams van elke tekst."""
+    encoded = [normalize(text).encode("utf-8").ljust(SHINGLE) for text in texts]
+    n = len(encoded)
+    # Per permutatie een rij: reduceat werkt dan over aaneengesloten geheugen
+    result = np.full((NUM_PERM, n), np.iinfo(np.uint32).max, dtype=np.uint32)
+    if n == 0:
+        return result.T
+
+    # Alle teksten achter elkaar; 4-grams als 32-bit getal uit vier opeenvolgende bytes
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=n)
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint32)
+    grams = (data[:-3] << 24) | (data[1:-2] << 16) | (data[2:-1] << 8) | data[3:]
+    # Alleen 4-grams die binnen één tekst vallen: starts[i] .. starts[i] + len - 4
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    counts = lengths - SHINGLE + 1
+    index = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts) + np.arange(counts.sum())
+    grams = _mix(grams[index])
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    # Per blok teksten (ongeveer CHUNK shingles): hash met alle permutaties, minimum per tekst
+    first = 0
+    while first < n:
+        last = int(np.searchsorted(offsets, offsets[first] + CHUNK, side="right")) - 1
+        last = max(last, first + 1)
+        block = grams[offsets[first]:offsets[last]]
+        hashed = _A[:, None] * block + _B[:, None]
+        result[:, first:last] = np.minimum.reduceat(hashed, offsets[first:last] - offsets[first], axis=1)
+        first = last
+    return np.ascontiguousarray(result.T)
+
+
+def candidate_pairs(sigs: np.ndarray, bands: int = BANDS, max_bucket: int = MAX_BUCKET) -> np.ndarray:
+    """LSH: paren (i < j) die in minstens één band dezelfde bucket delen."""
+    n = len(sigs)
+    rows = sigs.shape[1] // bands
+    pairs = []
+    mix = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5]
+                   * (rows // 4 + 1), dtype=np.uint64)[:rows]
+    for band in range(bands):
+        # Eén sleutel per rij van de band (overflow bij vermenigvuldigen is de bedoeling)
+        keys = (sigs[:, band * rows:(band + 1) * rows] * mix).sum(axis=1, dtype=np.uint64)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [n]))
+        sizes = ends - starts
+        # Per bucketgrootte alle buckets tegelijk: (buckets x grootte) matrix van drills
+        for size in np.unique(sizes[(sizes > 1) & (sizes <= max_bucket)]).tolist():
+            members = order[starts[sizes == size][:, None] + np.arange(size)]
+            i, j = np.triu_indices(size, k=1)
+            pairs.append(np.stack([members[:, i].ravel(), members[:, j].ravel()], axis=1))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    pairs = np.sort(np.concatenate(pairs), axis=1).astype(np.int64)
+    # Ontdubbelen als één int64 per paar (veel sneller dan unique over rijen)
+    unique = np.unique(pairs[:, 0] * n + pairs[:, 1])
+    return np.stack([unique // n, unique % n], axis=1)
+
+
+def _find(parent: List[int], i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+@timed("dedup.find_duplicates")
+def find_duplicates(drills: Sequence[Dict], threshold: float = THRESHOLD) -> List[Tuple[List[int], float]]:
+    """
+    Groepen (bijna) dubbele drills als (posities in `drills`, laagste gelijkenis),
+    binnen een groep in de volgorde van `drills`. Groepen van één drill worden weggelaten.
+    """
+    texts = [f"{d['question']} {d['answer']}" for d in drills]
+    sigs = signatures(texts)
+    pairs = candidate_pairs(sigs)
+    count("dedup.candidates", len(pairs))
+
+    parent = list(range(len(drills)))
+    weakest: Dict[int, float] = {}
+    if len(pairs):
+        similarity = (sigs[pairs[:, 0]] == sigs[pairs[:, 1]]).mean(axis=1)
+        close = similarity >= threshold
+        for (i, j), s in zip(pairs[close].tolist(), similarity[close].tolist()):
+            if not _answers_match(drills[i]["answer"], drills[j]["answer"]):
+                continue
+            a, b = _find(parent, i), _find(parent, j)
+            root = min(a, b)
+            weakest[root] = min(s, weakest.get(a, 1.0), weakest.get(b, 1.0))
+            parent[max(a, b)] = root
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(drills)):
+        groups.setdefault(_find(parent, i), []).append(i)
+    return [(members, weakest.get(root, 1.0)) for root, members in groups.items() if len(members) > 1]
+
+
+def _drill_id(drill: Dict) -> str:
+    return drill.get("id") or drill_hash(drill["file"], drill["question"])
+
+
+@timed("dedup.link")
+def link_duplicates(drills: Sequence[Dict], force: bool = False) -> Optional[List[Tuple[List[Dict], float]]]:
+    """
+    Zoek duplicaten in een lijst drills met `file` (bijv. Corpus.drills) en sla
+    de links op; de eerste drill van elke groep is canoniek en krijgt de toestand
+    die zijn aliassen al hadden. Slaat het werk over
+    als het corpus niet veranderd is sinds de vorige keer (tenzij force).
+    Returns: de groepen als drills, of None als er niets opnieuw berekend is.
+    """
+    ids = [_drill_id(d) for d in drills]
+    # Vraag (via de ID) en antwoord: een ander antwoord kan een link maken of breken
+    content = sorted(f"{key}\x1f{d['answer']}" for key, d in zip(ids, drills))
+    fingerprint = hashlib.blake2b("\n".join(content).encode("utf-8"), digest_size=16).hexdigest()
+    links = get_links()
+    if not force and links.fingerprint() == fingerprint:
+        return None
+
+    groups = find_duplicates(drills)
+    aliases: Dict[str, Tuple[str, float]] = {}
+    for members, similarity in groups:
+        canonical = ids[members[0]]
+        for i in members[1:]:
+            if ids[i] != canonical:
+                aliases[ids[i]] = (canonical, similarity)
+    links.replace(aliases, fingerprint)
+    # Toestand die aliassen al hadden gaat naar hun canonieke drill (andere shards: bij openen)
+    merge_linked_drills()
+    count("dedup.linked", len(aliases))
+    return [([drills[i] for i in members], similarity) for members, similarity in groups]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.corpus import load_corpus
+
+    parser = argparse.ArgumentParser(description="Link (bijna) dubbele drills over alle decks")
+    parser.add_argument("data_dir", nargs="?", default="data", help="map met decks (standaard: data)")
+    args = parser.parse_args()
+
+    found = link_duplicates(load_corpus(Path(args.data_dir)).drills, force=True)
+    for members, similarity in found:
+        print(f"[{similarity:.2f}]")
+        for drill in members:
+            print(f"  {drill['file']}: {drill['question']} -> {drill['answer']}")
+    print(f"{len(found)} groep(en), {sum(len(m) - 1 for m, _ in found)} drill(s) gelinkt")
@@ -0,0 +1,174 @@
+"""
+Lokale afleiders voor MC mode: foute maar plausibele opties uit de antwoorden
+van andere drills in dezelfde categorie (en daarna hetzelfde deck), zonder LLM.
+
+Antwoorden worden ingedeeld naar soort: getallen (jaartallen apart, met hun
+eenheid), opsommingen en tekst (eigennaam of niet, aantal woorden). Bij een
+getal kiezen we getallen van dezelfde soort die er dichtbij liggen; zijn dat er
+te weinig, dan maken we er een paar in dezelfde notatie ('13,8' -> '12,4').
+De index wordt per categorie opgebouwd bij het eerste gebruik.
+"""
+
+import math
+import random
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from src.answer_match import check_answer, compile_answer
+from src.metrics import count, timed
+
+OPTIONS = 3  # Aantal foute opties naast het goede antwoord
+# Vermenigvuldigers voor zelfgemaakte getallen (en verschuivingen voor jaartallen)
+FACTORS = (0.5, 0.75, 1.25, 1.5, 2.0, 0.9, 1.1, 3.0)
+YEAR_SHIFTS = (-10, -5, -3, -2, -1, 1, 2, 3, 5, 10)
+
+
+class AnswerKind(NamedTuple):
+    kind: str  # "year", "number", "list" of "text"
+    unit: str  # eenheid bij getallen, anders ""
+    proper: bool  # eigennaam (hoofdletter), alleen voor tekst
+    words: int  # aantal woorden (tekst), begrensd op 4
+
+
+class Candidate(NamedTuple):
+    answer: str
+    kind: AnswerKind
+    value: Optional[float]
+
+
+def classify(answer: str) -> Tuple[AnswerKind, Optional[float]]:
+    """Soort antwoord (en de waarde bij getallen)."""
+    forms = compile_answer(answer).forms
+    if not forms:
+        return AnswerKind("text", "", False, 0), None  # leeg antwoord
+    form = forms[0]
+    if len(form.numbers) == 1 and len(form.words.split()) <= 1:
+        value, tolerance = form.numbers[0]
+        if tolerance == 0.5 and 1000 <= value <= 2100 and not form.words:
+            return AnswerKind("year", "", False, 1), value
+        return AnswerKind("number", form.words, False, 1), value
+    if form.unordered:
+        return AnswerKind("list", "", False, 0), None
+    stripped = answer.strip()
+    proper = stripped[:1].isupper()
+    return AnswerKind("text", "", proper, min(len(form.words.split()), 4)), None
+
+
+def _format_like(value: float, template: str) -> str:
+    """Getal in dezelfde notatie als `template` (decimaalteken, decimalen, duizendtallen)."""
+    raw = template.strip()
+    comma = "," in raw and ("." not in raw or raw.rfind(",") > raw.rfind("."))
+    _, tolerance = compile_answer(raw).forms[0].numbers[0]
+    decimals = max(0, round(-math.log10(tolerance * 2))) if tolerance < 0.5 else 0
+    text = f"{abs(value):,.{decimals}f}"  # 1,234.5
+    if comma:
+        text = text.replace(",", "_").replace(".", ",").replace("_", ".")
+    elif "." in raw and decimals == 0:
+        text = text.replace(",", ".")  # '300.000' stijl
+    else:
+        text = text.replace(",", "")
+    if value < 0:
+        text = "-" + text
+    unit = compile_answer(raw).forms[0].words
+    return f"{text} {unit}" if unit else text
+
+
+def _invent_numbers(answer: str, kind: AnswerKind, value: float, rng: random.Random) -> List[str]:
+    """Getallen in de buurt van het goede antwoord, in dezelfde notatie."""
+    if kind.kind == "year":
+        shifts = list(YEAR_SHIFTS)
+        rng.shuffle(shifts)
+        return [str(int(value) + shift) for shift in shifts]
+    factors = list(FACTORS)
+    rng.shuffle(factors)
+    if value == 0:
+        return [_format_like(v, answer) for v in (1, 2, 5, 10)]
+    return [_format_like(value * factor, answer) for factor in factors]
+
+
+class DistractorIndex:
+    """Antwoordsoorten per categorie van één geladen deck (lazy, per categorie)."""
+
+    def __init__(self, drills: Sequence[Dict]):
+        self.drills = drills
+        self._lock = threading.Lock()
+        self._categories: Dict[Tuple[str, str], List[Candidate]] = {}
+        self._by_category: Optional[Dict[Tuple[str, str], List[Dict]]] = None
+        self._deck: Optional[List[Candidate]] = None
+
+    @staticmethod
+    def _candidates(drills) -> List[Candidate]:
+        seen, result = set(), []
+        for drill in drills:
+            answer = drill["answer"]
+            if answer in seen or not answer.strip():
+                continue  # lege antwoorden zijn geen bruikbare afleider
+            seen.add(answer)
+            kind, value = classify(answer)
+            result.append(Candidate(answer, kind, value))
+        return result
+
+    def category(self, drill: Dict) -> List[Candidate]:
+        """Kandidaten uit dezelfde categorie (en hetzelfde bestand bij samengestelde decks)."""
+        key = (drill.get("file", ""), drill.get("category", ""))
+        with self._lock:
+            if key not in self._categories:
+                if hasattr(self.drills, "for_category"):
+                    # Gecompileerd deck: alleen deze categorie lezen
+                    members = self.drills.for_category(key[1])
+                else:
+                    if self._by_category is None:
+                        self._by_category = {}
+                        for d in self.drills:
+                            self._by_category.setdefault((d.get("file", ""), d.get("category", "")), []).append(d)
+                    members = self._by_category.get(key, [])
+                self._categories[key] = self._candidates(members)
+            return self._categories[key]
+
+    def deck(self) -> List[Candidate]:
+        """Kandidaten uit het hele deck (alleen nodig als de categorie te weinig heeft)."""
+        with self._lock:
+            if self._deck is None:
+                self._deck = self._candidates(self.drills)
+            return self._deck
+
+    @timed("distractors.pick")
+    def pick(self, drill: Dict, k: int = OPTIONS, rng: Optional[random.Random] = None) -> List[str]:
+        """Tot `k` foute opties voor een drill; minder als het deck er niet genoeg heeft."""
+        rng = rng or random.Random()
+        answer = drill["answer"]
+        kind, value = classify(answer)
+        chosen: List[str] = []
+
+        def take(options: List[str]) -> None:
+            for option in options:
+                if len(chosen) >= k:
+                    return
+                if option in chosen or option == answer or check_answer(option, answer).correct:
+                    continue
+                chosen.append(option)
+
+        for pool in (self.category(drill), None):
+            if len(chosen) >= k:
+                break
+            pool = pool if pool is not None else self.deck()
+            if kind.kind in ("year", "number"):
+                same = [c for c in pool if c.kind.kind == kind.kind and c.kind.unit == kind.unit]
+                # Dichtstbijzijnde getallen eerst (relatief, zodat 0,1 en 100 niet door elkaar lopen)
+                same.sort(key=lambda c: abs(math.log((abs(c.value) + 1e-9) / (abs(value) + 1e-9))))
+                near = [c.answer for c in same[:k * 2]]
+                rng.shuffle(near)
+                take(near + [c.answer for c in same[k * 2:]])
+            else:
+                same = [c for c in pool if c.kind.kind == kind.kind and c.kind.proper == kind.proper]
+                close = [c.answer for c in same if abs(c.kind.words - kind.words) <= 1]
+                rest = [c.answer for c in same if abs(c.kind.words - kind.words) > 1]
+                rng.shuffle(close)
+                rng.shuffle(rest)
+                take(close + rest)
+
+        if len(chosen) < k and value is not None:
+            take(_invent_numbers(answer, kind, value, rng))
+        count("distractors.local", len(chosen))
+        rng.shuffle(chosen)
+        return chosen
@@ -0,0 +1,101 @@
+"""
+Drill links: alias -> canonieke drill ID voor drills die (bijna) hetzelfde feit
+zijn, vaak in verschillende decks. De learning tracker zoekt elke drill ID eerst
+hier op, zodat gelinkte drills één SM-2 toestand delen en niet dubbel ingepland
+worden. Opgeslagen in drill_links.sqlite, gedeeld door alle gebruikers (het is
+een eigenschap van de decks, niet van iemands voortgang). Gevuld door src/dedup.py.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+LINKS_FILE = Path(__file__).parent.parent / "drill_links.sqlite"
+
+
+class DrillLinks:
+    """Alias map in het geheugen met SQLite als opslag (het bestand ontstaat pas bij de eerste link)."""
+
+    def __init__(self, path: Path = LINKS_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.aliases: Dict[str, str] = {}
+        self.members: Dict[str, List[str]] = {}
+        if self.path.exists():
+            self._connect()
+            self._set({alias: canonical for alias, canonical in
+                       self.conn.execute("SELECT alias, canonical FROM drill_links")})
+
+    def _set(self, aliases: Dict[str, str]) -> None:
+        members: Dict[str, List[str]] = {}
+        for alias, canonical in aliases.items():
+            members.setdefault(canonical, []).append(alias)
+        self.aliases, self.members = aliases, members
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.conn is None:
+            self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS drill_links (
+                    alias      TEXT PRIMARY KEY,
+                    canonical  TEXT NOT NULL,
+                    similarity REAL NOT NULL,
+                    linked_at  REAL NOT NULL
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        return self.conn
+
+    def resolve(self, key: str) -> str:
+        """De drill ID waaronder de toestand van `key` staat (zichzelf als niet gelinkt)."""
+        return self.aliases.get(key, key)
+
+    def group(self, key: str) -> List[str]:
+        """Alle drill ID's die dezelfde toestand delen als `key` (canoniek eerst)."""
+        canonical = self.resolve(key)
+        return [canonical] + self.members.get(canonical, [])
+
+    def replace(self, links: Dict[str, Tuple[str, float]], fingerprint: Optional[str] = None) -> None:
+        """Vervang alle links door {alias: (canoniek, gelijkenis)}."""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM drill_links")
+                conn.executemany(
+                    "INSERT INTO drill_links VALUES (?, ?, ?, ?)",
+                    [(alias, canonical, similarity, now) for alias, (canonical, similarity) in links.items()],
+                )
+                if fingerprint is not None:
+                    conn.execute("INSERT OR REPLACE INTO meta VALUES ('fingerprint', ?)", (fingerprint,))
+            self._set({alias: canonical for alias, (canonical, _) in links.items()})
+
+    def fingerprint(self) -> Optional[str]:
+        """Vingerafdruk van het corpus waarvoor de links het laatst berekend zijn."""
+        if self.conn is None:
+            return None
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        return row[0] if row else None
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+_links: Optional[DrillLinks] = None
+_links_lock = threading.Lock()
+
+
+def get_links() -> DrillLinks:
+    """Procesbrede DrillLinks (lazy)."""
+    global _links
+    if _links is None:
+        with _links_lock:
+            if _links is None:
+                _links = DrillLinks(LINKS_FILE)
+    return _links
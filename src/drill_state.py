@@ -0,0 +1,162 @@
+"""
+Drill State: compacte drill IDs en per-drill SM-2 state.
+Een drill wordt geïdentificeerd door een stabiele content hash van bestand +
+volledige vraag (geen botsingen meer op de eerste 50 tekens). In een
+DrillTable wordt die hash geïnterned naar een klein int; de state zelf staat
+in __slots__ records met float timestamps in plaats van dicts met strings.
+"""
+
+import hashlib
+import sys
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.due_index import MAX_DUE_DAYS, SECONDS_PER_DAY, iso_seconds, from_seconds
+
+
+def drill_hash(file: str, question: str) -> str:
+    """Stabiele ID (16 hex tekens) op basis van bestand en volledige vraag."""
+    return hashlib.blake2b(f"{file}\x1f{question}".encode("utf-8"), digest_size=8).hexdigest()
+
+
+def legacy_drill_id(file: str, question: str) -> str:
+    """Oude ID vorm (file::vraag[:50]), alleen nog voor migratie."""
+    return f"{file}::{question[:50]}"
+
+
+def _is_legacy(key: str) -> bool:
+    return "::" in key  # Hashes zijn hex, dus alleen oude keys bevatten '::'
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+class DrillState:
+    """SM-2 state van één drill. Timestamps zijn seconden sinds (naive) epoch."""
+
+    __slots__ = ("file", "category", "label", "correct", "incorrect",
+                 "ease_factor", "interval", "last_seen", "due")
+
+    def __init__(self, file: str, category: str, label: str, correct: int = 0,
+                 incorrect: int = 0, ease_factor: float = 2.5, interval: int = 1,
+                 last_seen: Optional[float] = None, due: Optional[float] = None):
+        self.file = _intern(file)
+        self.category = _intern(category)
+        self.label = label  # Eerste 50 tekens van de vraag (voor weergave)
+        self.correct = correct
+        self.incorrect = incorrect
+        self.ease_factor = ease_factor
+        self.interval = interval
+        self.last_seen = last_seen
+        self.due = due
+
+    def copy(self) -> "DrillState":
+        return DrillState(*(getattr(self, name) for name in self.__slots__))
+
+    def to_dict(self) -> Dict:
+        """Oude dict vorm (isoformat timestamps) voor load_data/save_data."""
+        return {
+            "correct": self.correct,
+            "incorrect": self.incorrect,
+            "last_seen": from_seconds(self.last_seen).isoformat() if self.last_seen is not None else None,
+            "ease_factor": self.ease_factor,
+            "interval": self.interval,
+            "due": from_seconds(self.due).isoformat() if self.due is not None else None,
+            "category": self.category,
+            "file": self.file,
+            "label": self.label,
+        }
+
+    @classmethod
+    def from_dict(cls, drill_id: str, drill: Dict) -> "DrillState":
+        """Bouw state uit de dict vorm (ook oude records zonder label/due)."""
+        label = drill.get("label") or (drill_id.split("::", 1)[1] if "::" in drill_id else drill_id)
+        last_seen = iso_seconds(drill["last_seen"]) if drill.get("last_seen") else None
+        interval = drill.get("interval", 1)
+        if drill.get("due"):
+            due = iso_seconds(drill["due"])
+        elif last_seen is not None:
+            due = last_seen + min(interval, MAX_DUE_DAYS) * SECONDS_PER_DAY
+        else:
+            due = None
+        return cls(drill.get("file"), drill.get("category"), label,
+                   drill.get("correct", 0), drill.get("incorrect", 0),
+                   drill.get("ease_factor", 2.5), interval, last_seen, due)
+
+
+class DrillTable:
+    """
+    Interned drill IDs: elke key (hash) krijgt een klein int, states staan in een lijst.
+    Indexen (due, per bestand) werken met die ints in plaats van lange strings.
+    Een verwijderde drill laat een leeg slot achter, zodat de andere ints gelijk blijven.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._keys: List[Optional[str]] = []
+        self._states: List[Optional[DrillState]] = []
+        self._legacy = 0  # Aantal keys in de oude file::vraag vorm
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._ids
+
+    def id_of(self, key: str) -> Optional[int]:
+        return self._ids.get(key)
+
+    def key_of(self, idx: int) -> str:
+        return self._keys[idx]
+
+    def state(self, idx: int) -> DrillState:
+        return self._states[idx]
+
+    def get(self, key: str) -> Optional[DrillState]:
+        idx = self._ids.get(key)
+        return self._states[idx] if idx is not None else None
+
+    def add(self, key: str, state: DrillState) -> int:
+        idx = len(self._states)
+        self._legacy += _is_legacy(key)
+        self._ids[key] = idx
+        self._keys.append(key)
+        self._states.append(state)
+        return idx
+
+    def rekey(self, idx: int, new_key: str) -> str:
+        """Geef een drill een nieuwe key (int ID blijft gelijk). Returns: oude key."""
+        old_key = self._keys[idx]
+        self._legacy += _is_legacy(new_key) - _is_legacy(old_key)
+        del self._ids[old_key]
+        self._ids[new_key] = idx
+        self._keys[idx] = new_key
+        return old_key
+
+    def has_legacy_keys(self) -> bool:
+        """Zijn er nog drills met een oude file::vraag key (nog niet gemigreerd)?"""
+        return self._legacy > 0
+
+    def remove(self, idx: int) -> str:
+        """Verwijder een drill (zijn int ID wordt niet hergebruikt). Returns: zijn key."""
+        key = self._keys[idx]
+        self._legacy -= _is_legacy(key)
+        del self._ids[key]
+        self._keys[idx] = None
+        self._states[idx] = None
+        return key
+
+    def items(self) -> Iterator[Tuple[int, str, DrillState]]:
+        for idx, state in enumerate(self._states):
+            if state is not None:
+                yield idx, self._keys[idx], state
+
+    def to_dicts(self) -> Dict[str, Dict]:
+        return {key: state.to_dict() for _, key, state in self.items()}
+
+    @classmethod
+    def from_dicts(cls, drills: Dict[str, Dict]) -> "DrillTable":
+        table = cls()
+        for drill_id, drill in drills.items():
+            table.add(drill_id, DrillState.from_dict(drill_id, drill))
+        return table
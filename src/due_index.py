@@ -0,0 +1,102 @@
+"""
+Due Index: gesorteerde index van drills op volgende herhaalmoment (SM-2).
+Houdt per bestand en globaal een gesorteerde lijst (due, drill) bij, met
+drills als geïnternde int IDs uit de DrillTable, zodat 'volgende kaart' en
+'aantal kaarten due' binary searches zijn.
+"""
+
+import bisect
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from src.drill_state import DrillTable
+
+# Timestamps in de tracker zijn naive (lokale tijd), dus ook naive rekenen
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+# SM-2 intervallen groeien exponentieel; begrens due-tijden (100 jaar) tegen overflow
+MAX_DUE_DAYS = 36500
+
+
+@lru_cache(maxsize=65536)
+def iso_seconds(value: str) -> float:
+    """Parse een isoformat timestamp één keer naar seconden sinds (naive) epoch."""
+    return (datetime.fromisoformat(value) - EPOCH).total_seconds()
+
+
+def to_seconds(moment: datetime) -> float:
+    return (moment - EPOCH).total_seconds()
+
+
+def from_seconds(seconds: float) -> datetime:
+    return EPOCH + timedelta(seconds=seconds)
+
+
+class DueIndex:
+    """
+    Sorted index op due-tijd, per bestand en globaal.
+
+    Zoeken (next_due, count_due) is O(log n); een update verplaatst één
+    entry binnen een gesorteerde lijst.
+    """
+
+    def __init__(self):
+        self._all: List[Tuple[float, int]] = []
+        self._by_file: Dict[str, List[Tuple[float, int]]] = {}
+        self._entries: Dict[int, Tuple[float, str]] = {}  # drill -> (due, file)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @classmethod
+    def build(cls, drills: "DrillTable") -> "DueIndex":
+        """Bouw de index in één keer op uit alle drill states."""
+        index = cls()
+        for idx, _, state in drills.items():
+            if state.due is not None:
+                index._entries[idx] = (state.due, state.file)
+                index._by_file.setdefault(state.file, []).append((state.due, idx))
+                index._all.append((state.due, idx))
+        index._all.sort()
+        for entries in index._by_file.values():
+            entries.sort()
+        return index
+
+    def update(self, drill: int, file: str, due: float) -> None:
+        """Zet (of verplaats) een drill op zijn nieuwe due-tijd."""
+        self.remove(drill)
+        self._entries[drill] = (due, file)
+        bisect.insort(self._all, (due, drill))
+        bisect.insort(self._by_file.setdefault(file, []), (due, drill))
+
+    def remove(self, drill: int) -> None:
+        if drill not in self._entries:
+            return
+        due, file = self._entries.pop(drill)
+        for entries in (self._all, self._by_file[file]):
+            i = bisect.bisect_left(entries, (due, drill))
+            if i < len(entries) and entries[i] == (due, drill):
+                del entries[i]
+
+    def _entries_for(self, file: Optional[str]) -> List[Tuple[float, int]]:
+        return self._all if file is None else self._by_file.get(file, [])
+
+    def next_due(self, file: Optional[str] = None) -> Optional[Tuple[float, int]]:
+        """Eerstvolgende (due, drill), of None als de index leeg is."""
+        entries = self._entries_for(file)
+        return entries[0] if entries else None
+
+    def count_due(self, until: float, file: Optional[str] = None) -> int:
+        """Aantal drills met due <= until."""
+        return bisect.bisect_right(self._entries_for(file), (until, float("inf")))
+
+    def due_ids(self, until: float, file: Optional[str] = None,
+                limit: Optional[int] = None) -> List[int]:
+        """Drills met due <= until, meest achterstallig eerst."""
+        entries = self._entries_for(file)
+        end = self.count_due(until, file)
+        if limit is not None:
+            end = min(end, limit)
+        return [drill for _, drill in entries[:end]]
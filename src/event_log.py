@@ -0,0 +1,183 @@
+"""
+Event Log: append-only opslag van alle gegeven antwoorden.
+Elk antwoord is één JSON regel in het actieve segment (current.jsonl).
+Volle of oude segmenten worden geroteerd en met gzip gecomprimeerd,
+zodat de volledige historie goedkoop bewaard blijft voor analyses.
+"""
+
+import gzip
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+CURRENT_NAME = "current.jsonl"
+SEGMENT_GLOB = "answers-*.jsonl.gz"
+STAMP_FORMAT = "%Y%m%dT%H%M%S"
+
+
+class AnswerLog:
+    """
+    Append-only log van antwoord-events met segment rotatie.
+
+    Segmenten heten answers-<volgnummer>-<eerste>--<laatste>.jsonl.gz
+    (timestamps van het eerste en laatste event), zodat tijdvensters zonder
+    te lezen kunnen worden overgeslagen.
+    """
+
+    def __init__(self, directory: Path, max_segment_bytes: int = 4 * 1024 * 1024,
+                 max_segment_age: timedelta = timedelta(days=7)):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self._lock = threading.Lock()
+        self._handle = None
+        self._first_date: Optional[str] = None
+        self._last_date: Optional[str] = None
+        self._scan_current()
+
+    @property
+    def current_path(self) -> Path:
+        return self.directory / CURRENT_NAME
+
+    def _scan_current(self) -> None:
+        """Lees eerste/laatste datum van het actieve segment (na herstart)."""
+        self._first_date = self._last_date = None
+        if not self.current_path.exists():
+            return
+        for event in _read_lines(self.current_path.open('r', encoding='utf-8')):
+            if self._first_date is None:
+                self._first_date = event["date"]
+            self._last_date = event["date"]
+
+    # --- Schrijven ------------------------------------------------------------
+
+    def append(self, event: Dict) -> None:
+        """Voeg één event toe aan het einde van het log (O(1))."""
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._should_rotate(event["date"]):
+                self._rotate()
+            if self._handle is None:
+                self._handle = self.current_path.open('a', encoding='utf-8')
+            self._handle.write(line)
+            self._handle.flush()
+            if self._first_date is None:
+                self._first_date = event["date"]
+            self._last_date = event["date"]
+
+    def extend(self, events: List[Dict]) -> None:
+        for event in events:
+            self.append(event)
+
+    def sync(self) -> None:
+        """Zorg dat alles wat geschreven is ook op schijf staat (fsync)."""
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+                os.fsync(self._handle.fileno())
+
+    def _should_rotate(self, date: str) -> bool:
+        if self._first_date is None:
+            return False
+        if self.current_path.stat().st_size >= self.max_segment_bytes:
+            return True
+        age = datetime.fromisoformat(date) - datetime.fromisoformat(self._first_date)
+        return age >= self.max_segment_age
+
+    def rotate(self) -> Optional[Path]:
+        """Sluit het actieve segment af en comprimeer het."""
+        with self._lock:
+            return self._rotate()
+
+    def _rotate(self) -> Optional[Path]:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if self._first_date is None or not self.current_path.exists():
+            return None
+
+        segments = self.segments()
+        seq = int(segments[-1].name.split("-")[1]) + 1 if segments else 1
+        first = datetime.fromisoformat(self._first_date).strftime(STAMP_FORMAT)
+        last = datetime.fromisoformat(self._last_date).strftime(STAMP_FORMAT)
+        target = self.directory / f"answers-{seq:06d}-{first}--{last}.jsonl.gz"
+
+        with self.current_path.open('rb') as src, open(target, 'wb') as raw:
+            with gzip.open(raw, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.fsync(raw.fileno())  # Segment eerst op schijf, dan pas het origineel weg
+        self.current_path.unlink()
+        self._first_date = self._last_date = None
+        return target
+
+    def compact(self, keep_days: int) -> List[Path]:
+        """
+        Verwijder gecomprimeerde segmenten die geheel ouder zijn dan keep_days.
+        Dag-rollups in de tracker blijven bestaan; alleen de ruwe events verdwijnen.
+        """
+        cutoff = (datetime.now() - timedelta(days=keep_days)).strftime(STAMP_FORMAT)
+        removed = []
+        with self._lock:
+            for segment in self.segments():
+                if _segment_end(segment) < cutoff:
+                    segment.unlink()
+                    removed.append(segment)
+        return removed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    # --- Lezen ----------------------------------------------------------------
+
+    def segments(self) -> List[Path]:
+        """Gecomprimeerde segmenten, oudste eerst."""
+        return sorted(self.directory.glob(SEGMENT_GLOB))
+
+    def iter_events(self, since: Optional[datetime] = None) -> Iterator[Dict]:
+        """Alle events in volgorde; segmenten die geheel voor `since` vallen worden overgeslagen."""
+        since_stamp = since.strftime(STAMP_FORMAT) if since else None
+        since_iso = since.isoformat() if since else None
+
+        for segment in self.segments():
+            if since_stamp and _segment_end(segment) < since_stamp:
+                continue
+            with gzip.open(segment, 'rt', encoding='utf-8') as f:
+                yield from _since(_read_lines(f), since_iso)
+
+        with self._lock:
+            if self._handle is not None:
+                self._handle.flush()
+        if self.current_path.exists():
+            with self.current_path.open('r', encoding='utf-8') as f:
+                yield from _since(_read_lines(f), since_iso)
+
+
+def _segment_end(segment: Path) -> str:
+    """Timestamp van het laatste event uit de segmentnaam."""
+    return segment.name.split("--", 1)[1][:len("YYYYmmddTHHMMSS")]
+
+
+def _read_lines(f) -> Iterator[Dict]:
+    with f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Half geschreven regel (bijv. na crash)
+
+
+def _since(events: Iterator[Dict], since_iso: Optional[str]) -> Iterator[Dict]:
+    for event in events:
+        if since_iso is None or event["date"] >= since_iso:
+            yield event
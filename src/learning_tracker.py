@@ -1,36 +1,155 @@
 """
 Learning Tracker: Spaced repetition en progressie tracking.
-Slaat leerdata op in JSON voor persistentie tussen sessies.
+Slaat leerdata op in SQLite (user_data.sqlite) voor persistentie tussen sessies.
+Een bestaand user_data.json wordt bij de eerste start eenmalig gemigreerd.
+Alle functies werken op een in-memory TrackerStore die in de achtergrond flusht;
+met set_user() krijgt elke gebruiker een eigen store onder users/.
+De volledige antwoordhistorie staat in een append-only log (answer_log/).
 """
 
-import json
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import math
+import bisect
+import threading
+from contextvars import ContextVar
 
-DATA_FILE = Path(__file__).parent.parent / "user_data.json"
+import numpy as np
 
+from src.achievements import ACHIEVEMENTS, RULES, AchievementEngine
+from src.drill_links import get_links
+from src.drill_state import DrillState, drill_hash, legacy_drill_id
+from src.due_index import SECONDS_PER_DAY, to_seconds, from_seconds
+from src.event_log import AnswerLog
+from src.metrics import timed
+from src.scheduler import next_review, selection_weights
+from src.tracker_storage import TrackerDB
+from src.tracker_store import TrackerStore
+from src.user_shards import ShardLock, ShardRegistry, shard_name
 
+DATA_FILE = Path(__file__).parent.parent / "user_data.json"  # Oude opslag (alleen migratie)
+DB_FILE = Path(__file__).parent.parent / "user_data.sqlite"
+LOG_DIR = Path(__file__).parent.parent / "answer_log"
+FLUSH_INTERVAL = 5.0  # Seconden tussen achtergrond-flushes (0 = alleen bij flush()/afsluiten)
+
+USERS_DIR = Path(__file__).parent.parent / "users"  # Eén submap per gebruiker
+
+_registry: Optional[ShardRegistry] = None
+_registry_lock = threading.Lock()
+_current_user: ContextVar[Optional[str]] = ContextVar("tracker_user", default=None)
+
+
+def set_user(user: Optional[str]) -> None:
+    """
+    Kies de gebruiker voor alle tracker functies in deze thread/context.
+    Streamlit draait elke rerun in een eigen thread: zet dit aan het begin van het script.
+    None = de gedeelde standaard opslag (user_data.sqlite).
+    """
+    _current_user.set(user or None)
+
+
+def get_user() -> Optional[str]:
+    return _current_user.get()
+
+
+def _get_registry() -> ShardRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ShardRegistry(_open_store, flush_interval=FLUSH_INTERVAL)
+    return _registry
+
+
+def get_store(user: Optional[str] = None) -> TrackerStore:
+    """TrackerStore van de gegeven (of huidige) gebruiker, lazy geopend."""
+    return _get_registry().get(user or _current_user.get())
+
+
+def _shard_paths(user: Optional[str]) -> Tuple[Path, Path]:
+    """(database, log map) van een gebruiker; None gebruikt de oude locaties."""
+    if user is None:
+        return DB_FILE, LOG_DIR
+    directory = USERS_DIR / shard_name(user)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / "user_data.sqlite", directory / "answer_log"
+
+
+@timed("tracker.open_store")
+def _open_store(user: Optional[str]) -> TrackerStore:
+    """Open de shard van een gebruiker; migreert eenmalig vanuit user_data.json."""
+    db_path, log_dir = _shard_paths(user)
+    lock = ShardLock(db_path.with_name(db_path.name + ".lock"))
+    lock.acquire()
+    try:
+        db = TrackerDB(db_path)
+        if user is None:
+            db.migrate_json(DATA_FILE)
+        log = AnswerLog(log_dir)
+
+        def to_log(answers: List[Dict]) -> None:
+            log.extend(answers)
+            log.sync()
+
+        # Oude answers_log (JSON/SQLite) eenmalig naar het event log, pas daarna weg uit SQLite
+        db.take_legacy_answers(to_log)
+        if db.get_meta("rollups_built") is None:
+            _backfill_rollups(db, log)
+    except Exception:
+        lock.release()
+        raise
+    # Geen eigen flush-thread: de registry flusht alle shards vanuit één writer
+    store = TrackerStore(db, log, _empty_data(), flush_interval=0, file_lock=lock)
+    with store.lock:
+        _attach_achievements(store)
+        _merge_links(store)  # Links die gemaakt zijn terwijl deze shard dicht was
+    return store
+
+
+def _backfill_rollups(db: TrackerDB, log: AnswerLog) -> None:
+    """Bouw de dag-rollups eenmalig op uit de volledige antwoordhistorie."""
+    rollups: Dict[str, Dict] = {}
+    for event in log.iter_events():
+        _add_to_rollups(rollups, event["date"][:10], event["file"], event["category"], event["correct"])
+    with db.transaction():
+        db.replace_rollups(rollups)
+        db.set_meta("rollups_built", datetime.now().isoformat())
+
+
+def _add_to_rollups(rollups: Dict[str, Dict], day: str, file: str, category: str, correct: bool) -> None:
+    """Tel één antwoord op in de bucket van die dag (totaal, per bestand, per categorie)."""
+    bucket = rollups.setdefault(day, {"correct": 0, "total": 0, "files": {}, "categories": {}})
+    for counts in (
+        bucket,
+        bucket["files"].setdefault(file, {"correct": 0, "total": 0}),
+        bucket["categories"].setdefault(category, {"correct": 0, "total": 0}),
+    ):
+        counts["total"] += 1
+        if correct:
+            counts["correct"] += 1
+
+
+def flush() -> None:
+    """Schrijf openstaande wijzigingen van alle gebruikers direct naar de database."""
+    if _registry is not None:
+        _registry.flush()
+
+
+@timed("tracker.load_data")
 def load_data() -> Dict:
-    """Laad gebruikersdata uit JSON."""
-    if DATA_FILE.exists():
-        try:
-            with open(DATA_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return _empty_data()
-    return _empty_data()
+    """Kopie van alle gebruikersdata (zelfde structuur als het oude JSON bestand)."""
+    return get_store().snapshot()
 
 
 def _empty_data() -> Dict:
     """Lege datastructuur."""
     return {
-        "drills": {},  # drill_id -> {correct, incorrect, last_seen, ease_factor, interval}
+        "drills": {},  # drill_id -> DrillState (in de store een DrillTable)
         "sessions": [],  # [{date, file, score, total}]
         "categories": {},  # category -> {correct, incorrect}
-        "answers_log": [],  # [{date, correct, file, category}] voor progressie tracking
         "achievements": {},  # achievement_id -> {unlocked_at, seen}
+        "rollups": {},  # YYYY-MM-DD -> {correct, total, files: {...}, categories: {...}}
         "stats": {  # globale stats voor achievements
             "total_correct": 0,
             "total_incorrect": 0,
@@ -44,51 +163,149 @@ def _empty_data() -> Dict:
     }
 
 
+@timed("tracker.save_data")
 def save_data(data: Dict) -> None:
-    """Sla data op naar JSON."""
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    """Vervang alle opgeslagen data door de gegeven dict (weggeschreven bij de volgende flush)."""
+    store = get_store()
+    with store.lock:
+        store.replace(data, _empty_data())
+        _attach_achievements(store)
 
 
 def get_drill_id(file: str, question: str) -> str:
-    """Genereer unieke ID voor een drill."""
-    return f"{file}::{question[:50]}"
+    """Genereer unieke, stabiele ID voor een drill (content hash van bestand + vraag)."""
+    return drill_hash(file, question)
+
+
+def _lookup(store: TrackerStore, file: str, question: str) -> Optional[int]:
+    """
+    Zoek de geïnternde ID van een drill (aanroeper houdt store.lock vast).
+    Drills met een oude file::vraag[:50] key worden hierbij naar hun hash gemigreerd;
+    gelinkte duplicaten (src/dedup.py) delen de toestand van hun canonieke drill.
+    """
+    key = get_drill_id(file, question)
+    idx = _resolve(store, key)
+    if idx is None:
+        idx = store.data["drills"].id_of(legacy_drill_id(file, question))
+        if idx is not None:
+            store.rekey_drill(idx, get_links().resolve(key))
+    return idx
 
 
+def _resolve(store: TrackerStore, key: str) -> Optional[int]:
+    """
+    Geïnternde ID van de toestand van drill `key`: die van zijn canonieke drill.
+    Had een drill uit de groep al toestand van vóór de link, dan wordt die de gedeelde.
+    """
+    drills = store.data["drills"]
+    links = get_links()
+    canonical = links.resolve(key)
+    idx = drills.id_of(canonical)
+    if idx is None and canonical in links.members:
+        for alias in links.members[canonical]:
+            idx = drills.id_of(alias)
+            if idx is not None:
+                store.rekey_drill(idx, canonical)
+                break
+    return idx
+
+
+def _merge_links(store: TrackerStore) -> int:
+    """
+    Voeg de toestand van gelinkte drills samen onder hun canonieke key (aanroeper
+    houdt store.lock vast). Tellers worden opgeteld; de planning (ease, interval,
+    due) komt van de drill die het laatst geoefend is.
+    Returns: aantal samengevoegde aliassen.
+    """
+    drills = store.data["drills"]
+    merged = 0
+    for canonical, aliases in get_links().members.items():
+        target = drills.id_of(canonical)
+        for alias in aliases:
+            idx = drills.id_of(alias)
+            if idx is None:
+                continue
+            if target is None:
+                store.rekey_drill(idx, canonical)
+                target = idx
+                continue
+            kept, other = drills.state(target), drills.state(idx)
+            kept.correct += other.correct
+            kept.incorrect += other.incorrect
+            if (other.last_seen or 0) > (kept.last_seen or 0):
+                kept.ease_factor, kept.interval = other.ease_factor, other.interval
+                kept.last_seen, kept.due = other.last_seen, other.due
+            store.remove_drill(idx)
+            if kept.due is not None:
+                store.due.update(target, kept.file, kept.due)
+            store.file_drills.setdefault(other.file, set()).add(target)
+            store.touch("drills", target)
+            merged += 1
+    return merged
+
+
+def merge_linked_drills() -> int:
+    """Voeg gelinkte drills samen in de huidige en alle geopende shards (na src/dedup.py)."""
+    stores = {id(store): store for store in [get_store(), *_get_registry().stores()]}
+    merged = 0
+    for store in stores.values():
+        with store.lock:
+            merged += _merge_links(store)
+    return merged
+
+
+@timed("tracker.record_answer")
 def record_answer(file: str, question: str, category: str, correct: bool) -> None:
     """Registreer een antwoord voor spaced repetition."""
-    data = load_data()
-    drill_id = get_drill_id(file, question)
+    store = get_store()
+    with store.lock:
+        _apply_answer(store, file, question, category, correct, datetime.now())
+
+
+@timed("tracker.record_event")
+def record_event(file: str, question: str, category: str, correct: bool,
+                 ts: Optional[datetime] = None) -> List[str]:
+    """
+    Registreer één antwoord in één keer: drill (SM-2), categorie, log, rollups,
+    globale stats en achievements. Alle wijzigingen gebeuren onder één lock en
+    worden samen in één transactie geflusht.
+    Returns: lijst van nieuw behaalde achievement IDs.
+    """
+    now = ts or datetime.now()
+    store = get_store()
+    with store.lock:
+        _apply_answer(store, file, question, category, correct, now)
+        return _apply_achievements(store, correct, now)
 
-    # Init answers_log indien niet aanwezig (backwards compatibility)
-    if "answers_log" not in data:
-        data["answers_log"] = []
+
+def _apply_answer(store: TrackerStore, file: str, question: str, category: str,
+                  correct: bool, now: datetime) -> None:
+    """Verwerk een antwoord in de store (aanroeper houdt store.lock vast)."""
+    data = store.data
+    drills = data["drills"]
 
     # Init drill stats indien nieuw
-    if drill_id not in data["drills"]:
-        data["drills"][drill_id] = {
-            "correct": 0,
-            "incorrect": 0,
-            "last_seen": None,
-            "ease_factor": 2.5,  # SM-2 standaard
-            "interval": 1,
-            "category": category,
-            "file": file
-        }
+    idx = _lookup(store, file, question)
+    if idx is None:
+        idx = drills.add(get_links().resolve(get_drill_id(file, question)),
+                         DrillState(file, category, question[:50]))
 
-    drill = data["drills"][drill_id]
-    drill["last_seen"] = datetime.now().isoformat()
+    drill = drills.state(idx)
+    drill.last_seen = to_seconds(now)
 
     if correct:
-        drill["correct"] += 1
-        # SM-2: verhoog interval en ease
-        drill["ease_factor"] = max(1.3, drill["ease_factor"] + 0.1)
-        drill["interval"] = int(drill["interval"] * drill["ease_factor"])
+        drill.correct += 1
     else:
-        drill["incorrect"] += 1
-        # SM-2: reset interval, verlaag ease
-        drill["ease_factor"] = max(1.3, drill["ease_factor"] - 0.2)
-        drill["interval"] = 1
+        drill.incorrect += 1
+    # SM-2: goed = interval en ease omhoog, fout = interval reset en ease omlaag
+    drill.ease_factor, drill.interval = next_review(drill.ease_factor, drill.interval, correct)
+
+    # Volgende herhaling: houd de due-index incrementeel bij. Een gelinkte drill
+    # deelt zijn toestand over decks: indexen en tellers gaan naar het deck van dit antwoord
+    drill.due = drill.last_seen + drill.interval * SECONDS_PER_DAY
+    store.due.update(idx, file, drill.due)
+    store.index_result(idx, file, correct)
+    store.touch("drills", idx)
 
     # Update category stats
     if category not in data["categories"]:
@@ -98,69 +315,133 @@ def record_answer(file: str, question: str, category: str, correct: bool) -> Non
         data["categories"][category]["correct"] += 1
     else:
         data["categories"][category]["incorrect"] += 1
+    store.touch("categories", category)
 
-    # Log voor progressie grafiek
-    data["answers_log"].append({
-        "date": datetime.now().isoformat(),
+    # Dag-rollups voor de progressie grafiek
+    day = now.strftime("%Y-%m-%d")
+    _add_to_rollups(data["rollups"], day, file, category, correct)
+    store.touch("rollups", day)
+
+    # Append-only log voor progressie en analyses (volledige historie)
+    store.log_answer({
+        "date": now.isoformat(),
         "correct": correct,
         "file": file,
-        "category": category
+        "category": category,
+        "drill_id": drills.key_of(idx)
     })
-    # Bewaar max 5000 entries
-    data["answers_log"] = data["answers_log"][-5000:]
 
-    save_data(data)
+
+@timed("tracker.rename_drill")
+def rename_drill(file: str, old_question: str, new_question: str,
+                 category: Optional[str] = None) -> int:
+    """
+    Draag de historie van een drill over naar zijn nieuwe vraag (de drill ID
+    hangt af van de vraagtekst). Geldt voor de huidige gebruiker en alle
+    geopende shards; heeft de nieuwe vraag al eigen historie, dan blijft die.
+    Returns: aantal stores waarin de drill hernoemd is.
+    """
+    old_key = get_drill_id(file, old_question)
+    new_key = get_drill_id(file, new_question)
+    stores = {id(store): store for store in [get_store(), *_get_registry().stores()]}
+    renamed = 0
+    for store in stores.values():
+        with store.lock:
+            drills = store.data["drills"]
+            idx = _lookup(store, file, old_question)
+            # Gedeelde toestand van een gelinkte drill blijft bij zijn canonieke key
+            if idx is None or drills.key_of(idx) != old_key or drills.id_of(new_key) is not None:
+                continue
+            store.rekey_drill(idx, new_key)
+            drill = drills.state(idx)
+            drill.label = new_question[:50]
+            if category is not None:
+                drill.category = category
+            store.touch("drills", idx)
+            renamed += 1
+    return renamed
 
 
 def record_session(file: str, score: int, total: int) -> None:
     """Registreer een oefensessie voor progressie tracking."""
-    data = load_data()
-    data["sessions"].append({
+    # Bewaart max 1000 sessies
+    get_store().append("sessions", {
         "date": datetime.now().isoformat(),
         "file": file,
         "score": score,
         "total": total
     })
-    # Bewaar max 1000 sessies
-    data["sessions"] = data["sessions"][-1000:]
-    save_data(data)
 
 
-def get_drill_weight(file: str, question: str) -> float:
+@timed("tracker.compute_weights")
+def compute_weights(file: str, drills: List[Dict]) -> np.ndarray:
     """
-    Bereken gewicht voor drill selectie.
+    Bereken de selectiegewichten voor een heel deck in één keer.
+    Zelfde formule als get_drill_weight, maar gevectoriseerd met NumPy.
     Hogere weight = moet vaker geoefend worden.
     """
-    data = load_data()
-    drill_id = get_drill_id(file, question)
-
-    if drill_id not in data["drills"]:
-        return 1.0  # Nieuwe drill: normaal gewicht
-
-    drill = data["drills"][drill_id]
-    total = drill["correct"] + drill["incorrect"]
-
-    if total == 0:
-        return 1.0
+    n = len(drills)
+    correct = np.zeros(n)
+    incorrect = np.zeros(n)
+    interval = np.ones(n)
+    seen = np.full(n, np.nan)
+
+    # Gecompileerde decks hebben de drill ID's al; dan hoeft geen enkele drill gedecodeerd
+    ids = drills.drill_ids() if hasattr(drills, "drill_ids") else None
+
+    # Gelinkte duplicaten in dit deck: alleen de eerste wordt ingepland
+    links = get_links()
+    linked = bool(links.aliases)
+    duplicate = np.zeros(n, dtype=bool)
+    scheduled = set()
+
+    store = get_store()
+    with store.lock:
+        records = store.data["drills"]
+        # Oude keys vragen de vraagtekst; alleen dan decoderen we drills zonder toestand
+        legacy = ids is not None and records.has_legacy_keys()
+        for i in range(n):
+            if ids is not None:
+                canonical = links.resolve(ids[i])
+                idx = _resolve(store, ids[i])
+                if idx is None and legacy:
+                    d = drills[i]
+                    idx = _lookup(store, d.get("file", file), d["question"])
+            else:
+                # Corpus drills (alle decks) dragen hun eigen bestand mee
+                d = drills[i]
+                drill_file = d.get("file", file)
+                idx = _lookup(store, drill_file, d["question"])
+                if linked:
+                    canonical = links.resolve(get_drill_id(drill_file, d["question"]))
+            if linked:
+                duplicate[i] = canonical in scheduled
+                scheduled.add(canonical)
+            if idx is None:
+                continue
+            drill = records.state(idx)
+            correct[i] = drill.correct
+            incorrect[i] = drill.incorrect
+            interval[i] = drill.interval
+            if drill.last_seen is not None:
+                seen[i] = drill.last_seen
+
+    # Hele dagen sinds laatste keer gezien (zoals timedelta.days), NaN = nooit
+    days_ago = np.floor((to_seconds(datetime.now()) - seen) / SECONDS_PER_DAY)
+    weights = selection_weights(correct, incorrect, interval, days_ago)
+    weights[duplicate] = 0.0
+    return weights
 
-    # Basis: percentage fout
-    error_rate = drill["incorrect"] / total
 
-    # Factor in tijd sinds laatste keer gezien
-    time_factor = 1.0
-    if drill["last_seen"]:
-        last = datetime.fromisoformat(drill["last_seen"])
-        days_ago = (datetime.now() - last).days
-        # Als interval verstreken is, verhoog gewicht
-        if days_ago >= drill["interval"]:
-            time_factor = 1.0 + (days_ago / drill["interval"]) * 0.5
-
-    # Combineer: meer fouten + langer geleden = hoger gewicht
-    weight = (0.3 + error_rate * 0.7) * time_factor
-
-    return max(0.1, min(3.0, weight))  # Clamp tussen 0.1 en 3.0
+def get_drill_weight(file: str, question: str) -> float:
+    """
+    Bereken gewicht voor drill selectie.
+    Hogere weight = moet vaker geoefend worden.
+    """
+    return float(compute_weights(file, [{"question": question}])[0])
 
 
+@timed("tracker.select_weighted_drill")
 def select_weighted_drill(drills: List[Dict], file: str) -> Dict:
     """Selecteer een drill met spaced repetition weging."""
     import random
@@ -168,41 +449,62 @@ def select_weighted_drill(drills: List[Dict], file: str) -> Dict:
     if not drills:
         return None
 
-    weights = [get_drill_weight(file, d["question"]) for d in drills]
-    total_weight = sum(weights)
-
-    # Genormaliseerde kansen
-    probabilities = [w / total_weight for w in weights]
-
-    # Weighted random selection
-    r = random.random()
-    cumulative = 0
-    for i, p in enumerate(probabilities):
-        cumulative += p
-        if r <= cumulative:
-            return drills[i]
+    # Weighted random selection via cumulatieve som + binary search
+    cumulative = np.cumsum(compute_weights(file, drills))
+    r = random.random() * cumulative[-1]
+    i = bisect.bisect_left(cumulative, r)
 
-    return drills[-1]
+    return drills[min(i, len(drills) - 1)]
 
 
-def get_drill_difficulty(file: str, question: str) -> Tuple[str, float]:
+def get_next_due(file: Optional[str] = None) -> Optional[Tuple[str, datetime]]:
     """
-    Bereken moeilijkheidsgraad van een drill.
-    Returns: (label, percentage_correct)
+    Eerstvolgende drill om te herhalen (globaal of voor één bestand).
+    Returns: (drill_id, due moment) of None als er nog niets geoefend is.
     """
-    data = load_data()
-    drill_id = get_drill_id(file, question)
+    store = get_store()
+    with store.lock:
+        entry = store.due.next_due(file)
+        if entry is None:
+            return None
+        due, idx = entry
+        return (store.data["drills"].key_of(idx), from_seconds(due))
+
+
+def count_due(file: Optional[str] = None, until: Optional[datetime] = None) -> int:
+    """Aantal drills dat uiterlijk op `until` (standaard: nu) herhaald moet worden."""
+    until = until or datetime.now()
+    store = get_store()
+    with store.lock:
+        return store.due.count_due(to_seconds(until), file)
 
-    if drill_id not in data["drills"]:
+
+@timed("tracker.count_due_today")
+def count_due_today(file: Optional[str] = None) -> int:
+    """Aantal drills dat vandaag (tot middernacht) herhaald moet worden."""
+    tomorrow = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    return count_due(file, tomorrow - timedelta(microseconds=1))
+
+
+def get_due_drill_ids(file: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
+    """Drill IDs die nu due zijn, meest achterstallig eerst."""
+    store = get_store()
+    with store.lock:
+        drills = store.data["drills"]
+        return [drills.key_of(idx) for idx in store.due.due_ids(to_seconds(datetime.now()), file, limit)]
+
+
+def _difficulty_label(drill: Optional[DrillState]) -> Tuple[str, float]:
+    """Moeilijkheidslabel voor een (mogelijk ontbrekende) drill state."""
+    if drill is None:
         return ("Nieuw", -1)
 
-    drill = data["drills"][drill_id]
-    total = drill["correct"] + drill["incorrect"]
+    total = drill.correct + drill.incorrect
 
     if total == 0:
         return ("Nieuw", -1)
 
-    pct = drill["correct"] / total * 100
+    pct = drill.correct / total * 100
 
     if pct >= 80:
         return ("Makkelijk", pct)
@@ -212,12 +514,28 @@ def get_drill_difficulty(file: str, question: str) -> Tuple[str, float]:
         return ("Moeilijk", pct)
 
 
+@timed("tracker.get_drill_difficulty")
+def get_drill_difficulty(file: str, question: str) -> Tuple[str, float]:
+    """
+    Bereken moeilijkheidsgraad van een drill.
+    Returns: (label, percentage_correct)
+    """
+    store = get_store()
+    with store.lock:
+        idx = _lookup(store, file, question)
+        return _difficulty_label(store.data["drills"].state(idx) if idx is not None else None)
+
+
+@timed("tracker.get_category_stats")
 def get_category_stats() -> Dict[str, Dict]:
     """Haal statistieken per categorie op."""
-    data = load_data()
     stats = {}
 
-    for cat, values in data["categories"].items():
+    store = get_store()
+    with store.lock:
+        categories = {cat: dict(values) for cat, values in store.data["categories"].items()}
+
+    for cat, values in categories.items():
         total = values["correct"] + values["incorrect"]
         if total > 0:
             stats[cat] = {
@@ -230,17 +548,14 @@ def get_category_stats() -> Dict[str, Dict]:
     return stats
 
 
+@timed("tracker.get_file_stats")
 def get_file_stats(file: str) -> Dict:
     """Haal statistieken voor een specifiek bestand op."""
-    data = load_data()
-
-    correct = 0
-    incorrect = 0
-
-    for drill_id, drill in data["drills"].items():
-        if drill.get("file") == file:
-            correct += drill["correct"]
-            incorrect += drill["incorrect"]
+    store = get_store()
+    with store.lock:
+        totals = store.file_totals.get(file, {"correct": 0, "incorrect": 0})
+        correct = totals["correct"]
+        incorrect = totals["incorrect"]
 
     total = correct + incorrect
     return {
@@ -251,40 +566,42 @@ def get_file_stats(file: str) -> Dict:
     }
 
 
-def get_progress_data(days: int = 30) -> List[Dict]:
-    """Haal progressie data op voor de laatste N dagen (uit drill history)."""
-    data = load_data()
-    cutoff = datetime.now() - timedelta(days=days)
-
-    # Groepeer drill pogingen per dag
-    daily = {}
-
-    # Gebruik answers_log voor dagelijkse progressie
-    if "answers_log" in data:
-        for entry in data["answers_log"]:
-            entry_date = datetime.fromisoformat(entry["date"])
-            if entry_date >= cutoff:
-                day_key = entry_date.strftime("%Y-%m-%d")
-                if day_key not in daily:
-                    daily[day_key] = {"correct": 0, "total": 0}
-                daily[day_key]["total"] += 1
-                if entry["correct"]:
-                    daily[day_key]["correct"] += 1
+@timed("tracker.get_progress_data")
+def get_progress_data(days: int = 30, file: Optional[str] = None,
+                      category: Optional[str] = None) -> List[Dict]:
+    """
+    Haal progressie data op voor de laatste N dagen.
+    Leest de voorgeaggregeerde dag-rollups (optioneel gefilterd op bestand of categorie).
+    """
+    today = datetime.now().date()
 
-    # Converteer naar lijst met percentages
+    store = get_store()
     result = []
-    for day, values in sorted(daily.items()):
-        pct = round(values["correct"] / values["total"] * 100, 1) if values["total"] > 0 else 0
-        result.append({
-            "date": day,
-            "score": values["correct"],
-            "total": values["total"],
-            "percentage": pct
-        })
+    with store.lock:
+        rollups = store.data["rollups"]
+        for offset in range(days, -1, -1):
+            day = (today - timedelta(days=offset)).isoformat()
+            bucket = rollups.get(day)
+            if bucket is None:
+                continue
+            if file is not None:
+                bucket = bucket["files"].get(file)
+            elif category is not None:
+                bucket = bucket["categories"].get(category)
+            if not bucket or bucket["total"] == 0:
+                continue
+
+            result.append({
+                "date": day,
+                "score": bucket["correct"],
+                "total": bucket["total"],
+                "percentage": round(bucket["correct"] / bucket["total"] * 100, 1)
+            })
 
     return result
 
 
+@timed("tracker.get_weak_categories")
 def get_weak_categories(limit: int = 5) -> List[Tuple[str, float]]:
     """Vind de zwakste categorieën om te oefenen."""
     stats = get_category_stats()
@@ -296,21 +613,23 @@ def get_weak_categories(limit: int = 5) -> List[Tuple[str, float]]:
     return weak[:limit]
 
 
+@timed("tracker.get_drill_stats_for_file")
 def get_drill_stats_for_file(file: str) -> Dict[str, Dict]:
     """Haal alle drill stats op voor een bestand."""
-    data = load_data()
     stats = {}
 
-    for drill_id, drill in data["drills"].items():
-        if drill.get("file") == file:
-            question = drill_id.split("::", 1)[1] if "::" in drill_id else drill_id
-            total = drill["correct"] + drill["incorrect"]
-            stats[question] = {
-                "correct": drill["correct"],
-                "incorrect": drill["incorrect"],
+    store = get_store()
+    with store.lock:
+        drills = store.data["drills"]
+        for idx in store.file_drills.get(file, ()):
+            drill = drills.state(idx)
+            total = drill.correct + drill.incorrect
+            stats[drill.label] = {
+                "correct": drill.correct,
+                "incorrect": drill.incorrect,
                 "total": total,
-                "percentage": round(drill["correct"] / total * 100, 1) if total > 0 else 0,
-                "difficulty": get_drill_difficulty(file, question)[0]
+                "percentage": round(drill.correct / total * 100, 1) if total > 0 else 0,
+                "difficulty": _difficulty_label(drill)[0]
             }
 
     return stats
@@ -320,109 +639,51 @@ def get_drill_stats_for_file(file: str) -> Dict[str, Dict]:
 # ACHIEVEMENTS SYSTEEM
 # =============================================================================
 
-ACHIEVEMENTS = {
-    "first_blood": {
-        "icon": "🏆",
-        "name": "First Blood",
-        "desc": "Je eerste vraag goed beantwoord"
-    },
-    "on_fire": {
-        "icon": "🔥",
-        "name": "On Fire",
-        "desc": "10 vragen op rij goed"
-    },
-    "unstoppable": {
-        "icon": "⚡",
-        "name": "Unstoppable",
-        "desc": "25 vragen op rij goed"
-    },
-    "big_brain": {
-        "icon": "🧠",
-        "name": "Big Brain",
-        "desc": "100 vragen goed in één sessie"
-    },
-    "masochist": {
-        "icon": "💀",
-        "name": "Masochist",
-        "desc": "50 keer fout in één sessie"
-    },
-    "night_owl": {
-        "icon": "🦉",
-        "name": "Nachtbraker",
-        "desc": "Oefenen na middernacht"
-    },
-    "early_bird": {
-        "icon": "☀️",
-        "name": "Vroege Vogel",
-        "desc": "Oefenen voor 7:00"
-    },
-    "centurion": {
-        "icon": "💯",
-        "name": "Centurion",
-        "desc": "100 vragen totaal goed"
-    },
-    "scholar": {
-        "icon": "📚",
-        "name": "Scholar",
-        "desc": "500 vragen totaal goed"
-    },
-    "master": {
-        "icon": "🎓",
-        "name": "Master",
-        "desc": "1000 vragen totaal goed"
-    },
-    "streak_week": {
-        "icon": "📅",
-        "name": "Streaker",
-        "desc": "7 dagen op rij geoefend"
-    },
-    "perfectionist": {
-        "icon": "🎯",
-        "name": "Perfectionist",
-        "desc": "20 vragen op rij goed"
-    },
-    "comeback": {
-        "icon": "💪",
-        "name": "Comeback Kid",
-        "desc": "Na 5 fouten, 5 goed op rij"
-    },
-}
-
-
 def check_achievements(correct: bool) -> List[str]:
     """
     Check of er nieuwe achievements zijn behaald.
     Returns: lijst van nieuw behaalde achievement IDs.
     """
-    data = load_data()
-
-    # Init stats als niet aanwezig (backwards compatibility)
-    if "stats" not in data:
-        data["stats"] = {
-            "total_correct": 0, "total_incorrect": 0,
-            "current_streak": 0, "best_streak": 0,
-            "session_correct": 0, "session_incorrect": 0,
-            "days_streak": 0, "last_practice_date": None
-        }
-    if "achievements" not in data:
-        data["achievements"] = {}
+    store = get_store()
+    with store.lock:
+        return _apply_achievements(store, correct, datetime.now())
+
 
+def _attach_achievements(store: TrackerStore) -> List[str]:
+    """
+    Geef de store een AchievementEngine (aanroeper houdt store.lock vast). Regels
+    waarvan de drempel al gehaald is (bijv. net toegevoegd) worden meteen behaald.
+    Returns: die nieuw behaalde achievement IDs.
+    """
+    store.achievement_engine = AchievementEngine(RULES, store.data["achievements"])
+    unlocked = store.achievement_engine.catch_up(store.data["stats"])
+    now = datetime.now().isoformat()
+    for aid in unlocked:
+        store.data["achievements"][aid] = {"unlocked_at": now, "seen": False}
+        store.touch("achievements", aid)
+    return unlocked
+
+
+def _apply_achievements(store: TrackerStore, correct: bool, now: datetime) -> List[str]:
+    """Werk globale stats bij en unlock achievements (aanroeper houdt store.lock vast)."""
+    data = store.data
     stats = data["stats"]
-    now = datetime.now()
-    hour = now.hour
     today = now.strftime("%Y-%m-%d")
 
-    # Update stats
+    # Update stats; houd bij welke counters dit event raakt
     if correct:
         stats["total_correct"] += 1
         stats["session_correct"] += 1
         stats["current_streak"] += 1
+        changed = ["total_correct", "session_correct", "current_streak"]
         if stats["current_streak"] > stats["best_streak"]:
             stats["best_streak"] = stats["current_streak"]
+            changed.append("best_streak")
     else:
         stats["total_incorrect"] += 1
         stats["session_incorrect"] += 1
         stats["current_streak"] = 0
+        changed = ["total_incorrect", "session_incorrect", "current_streak"]
 
     # Update days streak
     if stats["last_practice_date"] != today:
@@ -434,92 +695,55 @@ def check_achievements(correct: bool) -> List[str]:
         else:
             stats["days_streak"] = 1
         stats["last_practice_date"] = today
+        changed.append("days_streak")
+    store.touch("stats")
+
+    # Alleen regels die op de gewijzigde counters geabonneerd zijn
+    counters = {**stats, "hour": now.hour}
+    new_achievements = store.achievement_engine.evaluate(counters, changed + ["hour"])
+
+    for aid in new_achievements:
+        data["achievements"][aid] = {"unlocked_at": now.isoformat(), "seen": False}
+        store.touch("achievements", aid)
 
-    # Check achievements
-    new_achievements = []
-
-    def unlock(aid):
-        if aid not in data["achievements"]:
-            data["achievements"][aid] = {"unlocked_at": now.isoformat(), "seen": False}
-            new_achievements.append(aid)
-
-    # First Blood
-    if stats["total_correct"] >= 1:
-        unlock("first_blood")
-
-    # Streak achievements
-    if stats["current_streak"] >= 10:
-        unlock("on_fire")
-    if stats["current_streak"] >= 20:
-        unlock("perfectionist")
-    if stats["current_streak"] >= 25:
-        unlock("unstoppable")
-
-    # Session achievements
-    if stats["session_correct"] >= 100:
-        unlock("big_brain")
-    if stats["session_incorrect"] >= 50:
-        unlock("masochist")
-
-    # Total achievements
-    if stats["total_correct"] >= 100:
-        unlock("centurion")
-    if stats["total_correct"] >= 500:
-        unlock("scholar")
-    if stats["total_correct"] >= 1000:
-        unlock("master")
-
-    # Time-based achievements
-    if 0 <= hour < 5:
-        unlock("night_owl")
-    if 5 <= hour < 7:
-        unlock("early_bird")
-
-    # Days streak
-    if stats["days_streak"] >= 7:
-        unlock("streak_week")
-
-    # Comeback kid: na 5 fouten, nu 5 goed op rij
-    if stats["current_streak"] >= 5 and stats["session_incorrect"] >= 5:
-        unlock("comeback")
-
-    save_data(data)
     return new_achievements
 
 
+@timed("tracker.get_achievements")
 def get_achievements() -> Dict[str, Dict]:
     """Haal alle behaalde achievements op."""
-    data = load_data()
-    if "achievements" not in data:
-        return {}
+    store = get_store()
+    with store.lock:
+        unlocked = {aid: dict(info) for aid, info in store.data["achievements"].items()}
 
     result = {}
-    for aid, info in data["achievements"].items():
+    for aid, info in unlocked.items():
         if aid in ACHIEVEMENTS:
             result[aid] = {**ACHIEVEMENTS[aid], **info}
     return result
 
 
+@timed("tracker.get_stats")
 def get_stats() -> Dict:
     """Haal globale stats op."""
-    data = load_data()
-    if "stats" not in data:
-        return {}
-    return data["stats"]
+    store = get_store()
+    with store.lock:
+        return dict(store.data["stats"])
 
 
 def mark_achievement_seen(achievement_id: str) -> None:
     """Markeer achievement als gezien."""
-    data = load_data()
-    if "achievements" in data and achievement_id in data["achievements"]:
-        data["achievements"][achievement_id]["seen"] = True
-        save_data(data)
+    store = get_store()
+    with store.lock:
+        if achievement_id in store.data["achievements"]:
+            store.data["achievements"][achievement_id]["seen"] = True
+            store.touch("achievements", achievement_id)
 
 
 def reset_session_stats() -> None:
     """Reset sessie stats (bij nieuwe sessie)."""
-    data = load_data()
-    if "stats" in data:
-        data["stats"]["session_correct"] = 0
-        data["stats"]["session_incorrect"] = 0
-        save_data(data)
+    store = get_store()
+    with store.lock:
+        store.data["stats"]["session_correct"] = 0
+        store.data["stats"]["session_incorrect"] = 0
+        store.touch("stats")
@@ -0,0 +1,188 @@
+"""
+Persistente cache voor LLM generaties (llm_cache.sqlite), zodat dezelfde vraag
+met dezelfde context, hetzelfde niveau en model niet opnieuw gegenereerd wordt.
+
+Sleutel = hash van (model, system prompt, prompt, opties). Per sleutel kunnen
+meerdere varianten bewaard worden: wie om N varianten vraagt krijgt eerst N
+verse generaties en daarna een willekeurige gecachte, zodat vragen afwisselen.
+Oude entries verlopen (TTL) en bij te veel entries of bytes gaan de minst
+recent gebruikte eruit (LRU). Hits, misses en de bespaarde tijd worden bijgehouden.
+Een lookup schrijft niet: tellers en gebruikstijden blijven in het geheugen en
+gaan mee met de volgende put(), elke STATS_SAVE_SECONDS, of bij close().
+"""
+
+import atexit
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from src.metrics import count
+
+LLM_CACHE_FILE = Path(__file__).parent.parent / "llm_cache.sqlite"
+MAX_ENTRIES = 5000
+MAX_BYTES = 20 * 1024 * 1024
+TTL_SECONDS = 30 * 24 * 3600
+STATS_SAVE_SECONDS = 60.0
+
+
+def cache_key(model: str, prompt: str, system: str = "", options: Optional[Dict[str, Any]] = None) -> str:
+    """Sleutel van een generatie: hash van model, prompts en opties."""
+    payload = json.dumps([model, system, prompt, options or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class GenerationCache:
+    """LLM antwoorden per sleutel en variant, met LRU/grootte eviction en TTL."""
+
+    def __init__(self, path: Path = LLM_CACHE_FILE, max_entries: int = MAX_ENTRIES,
+                 max_bytes: int = MAX_BYTES, ttl: float = TTL_SECONDS):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS generations (
+                key        TEXT NOT NULL,
+                variant    INTEGER NOT NULL,
+                response   TEXT NOT NULL,
+                bytes      INTEGER NOT NULL,
+                latency    REAL NOT NULL,
+                created_at REAL NOT NULL,
+                used_at    REAL NOT NULL,
+                PRIMARY KEY (key, variant)
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS generations_used ON generations (used_at)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value REAL NOT NULL)")
+        self._stats = {"hits": 0.0, "misses": 0.0, "saved_seconds": 0.0}
+        self._stats.update(dict(self.conn.execute("SELECT name, value FROM stats")))
+        self._used: Dict[Tuple[str, int], float] = {}  # (key, variant) -> gebruikt op, nog niet opgeslagen
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        self._closed = False
+
+    def get(self, key: str, variants: int = 1, rng: Optional[random.Random] = None) -> Optional[str]:
+        """
+        Gecacht antwoord, of None (miss) als er minder dan `variants` verse varianten zijn.
+        Bij meerdere varianten wordt er willekeurig één gekozen.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT variant, response, latency FROM generations WHERE key = ? AND created_at >= ?",
+                (key, now - self.ttl),
+            ).fetchall()
+            if len(rows) < max(1, variants):
+                self._record(hit=False)
+                return None
+            variant, response, latency = (rng or random).choice(rows)
+            self._used[(key, variant)] = now
+            self._record(hit=True, saved=latency)
+            return response
+
+    def put(self, key: str, response: str, latency: float = 0.0, variants: int = 1) -> None:
+        """Bewaar een generatie; bij `variants` varianten vervangt hij de oudste."""
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            with self.conn:
+                self._save()  # Gebruikstijden eerst, zodat de LRU ze meeneemt
+                # Verlopen varianten eerst weg, zodat hun plek opnieuw gevuld wordt
+                self.conn.execute("DELETE FROM generations WHERE key = ? AND created_at < ?",
+                                  (key, now - self.ttl))
+                taken = [row[0] for row in self.conn.execute(
+                    "SELECT variant FROM generations WHERE key = ? ORDER BY created_at", (key,))]
+                free = [v for v in range(max(1, variants)) if v not in taken]
+                variant = free[0] if free else taken[0]
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, variant, response, size, latency, now, now),
+                )
+                self._evict(now)
+
+    def _evict(self, now: float) -> int:
+        """Verlopen entries weg, daarna de minst recent gebruikte tot binnen de limieten."""
+        removed = self.conn.execute("DELETE FROM generations WHERE created_at < ?", (now - self.ttl,)).rowcount
+        entries, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM generations").fetchone()
+        if entries <= self.max_entries and total <= self.max_bytes:
+            return removed
+        doomed = []
+        for key, variant, size in self.conn.execute(
+                "SELECT key, variant, bytes FROM generations ORDER BY used_at"):
+            if entries <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key, variant))
+            entries -= 1
+            total -= size
+        self.conn.executemany("DELETE FROM generations WHERE key = ? AND variant = ?", doomed)
+        count("llm_cache.evicted", len(doomed))
+        return removed + len(doomed)
+
+    def _record(self, hit: bool, saved: float = 0.0) -> None:
+        """Hit/miss tellen in het geheugen (aanroeper houdt de lock vast)."""
+        self._stats["hits" if hit else "misses"] += 1
+        self._stats["saved_seconds"] += saved
+        self._dirty = True
+        count("llm_cache.hit" if hit else "llm_cache.miss")
+        if time.monotonic() - self._saved_at >= STATS_SAVE_SECONDS:
+            with self.conn:
+                self._save()
+
+    def _save(self) -> None:
+        """Tellers en gebruikstijden wegschrijven (aanroeper houdt de lock vast, in een transactie)."""
+        if self._used:
+            self.conn.executemany("UPDATE generations SET used_at = ? WHERE key = ? AND variant = ?",
+                                  [(used, key, variant) for (key, variant), used in self._used.items()])
+            self._used.clear()
+        if self._dirty:
+            self.conn.executemany("INSERT OR REPLACE INTO stats VALUES (?, ?)", list(self._stats.items()))
+            self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def stats(self) -> Dict[str, float]:
+        """Hits, misses, hit rate en bespaarde seconden (ook van eerdere sessies), plus omvang."""
+        with self._lock:
+            entries, total = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM generations").fetchone()
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {**self._stats, "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                    "entries": entries, "bytes": total}
+
+    def clear(self) -> None:
+        with self._lock:
+            with self.conn:
+                self.conn.execute("DELETE FROM generations")
+            self._used.clear()
+
+    def close(self) -> None:
+        """Sla de tellers en gebruikstijden op en sluit de database."""
+        with self._lock:
+            if self._closed:
+                return
+            with self.conn:
+                self._save()
+            self.conn.close()
+            self._closed = True
+
+
+_cache: Optional[GenerationCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_generation_cache() -> GenerationCache:
+    """Procesbrede GenerationCache (lazy)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = GenerationCache(LLM_CACHE_FILE)
+                atexit.register(_cache.close)
+    return _cache
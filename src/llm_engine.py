@@ -4,14 +4,37 @@ Vervangt Bloom's Taxonomy door een System Depth Model (Structuur, Mechanisme, Ca
 """
 
 import ollama
-from typing import Literal, List, Dict
+import time
+from typing import Literal, List, Dict, Optional
+
+from src.llm_cache import GenerationCache, cache_key, get_generation_cache
+from src.metrics import timed
 
 # Nieuw model: System Depth
 SystemLevel = Literal["structure", "mechanism", "causality"]
 
 class LLMEngine:
-    def __init__(self, model_name: str = "gpt-oss:20b"):
+    def __init__(self, model_name: str = "gpt-oss:20b", cache: Optional[GenerationCache] = None,
+                 question_variants: int = 1):
         self.model_name = model_name
+        # Generaties komen uit de persistente cache; question_variants > 1 = afwisselende vragen
+        self.cache = cache or get_generation_cache()
+        self.question_variants = question_variants
+
+    def _generate(self, prompt: str, system: Optional[str] = None, options: Optional[Dict] = None,
+                  variants: int = 1) -> str:
+        """ollama.generate via de cache. Fouten gaan als exceptie door en worden niet gecachet."""
+        key = cache_key(self.model_name, prompt, system or "", options)
+        cached = self.cache.get(key, variants)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        kwargs = {"system": system} if system else {}
+        if options:
+            kwargs["options"] = options
+        response = ollama.generate(model=self.model_name, prompt=prompt, **kwargs)['response']
+        self.cache.put(key, response, time.perf_counter() - started, variants)
+        return response
 
     def _get_system_prompt(self, level: SystemLevel) -> str:
         base = """Je bent een System Analyzer.
@@ -51,6 +74,7 @@ FOCUS: CAUSALITEIT (Oorzaak & Gevolg)
         ]
         return " ".join(lines)
 
+    @timed("llm.generate_question")
     def generate_question(self, context_text: str, level: SystemLevel) -> str:
         cleaned = self._clean_context(context_text)
         system = self._get_system_prompt(level)
@@ -64,13 +88,13 @@ Stel één scherpe vraag die de kennis van de gebruiker test op het gebied van:
 Gebruik alleen de informatie uit de context. Verzin niets erbij.
 """
         try:
-            response = ollama.generate(
-                model=self.model_name,
-                prompt=prompt,
+            response = self._generate(
+                prompt,
                 system=system,
-                options={'temperature': 0.2} # Laag voor precisie
+                options={'temperature': 0.2}, # Laag voor precisie
+                variants=self.question_variants
             )
-            return response['response'].strip()
+            return response.strip()
         except ConnectionError:
             return "⚠️ Kan Ollama niet bereiken. Is de server actief? Start met: ollama serve"
         except Exception as e:
@@ -78,6 +102,7 @@ Gebruik alleen de informatie uit de context. Verzin niets erbij.
                 return f"⚠️ Model '{self.model_name}' niet gevonden. Download met: ollama pull {self.model_name}"
             return f"⚠️ Fout bij vraag genereren: {str(e)[:100]}"
 
+    @timed("llm.continue_conversation")
     def continue_conversation(self, question: str, context: str, history: List[Dict], user_msg: str, level: SystemLevel) -> str:
         cleaned = self._clean_context(context)
         history_str = "\n".join([f"{m['role'].upper()}: {m['content']}" for m in history])
@@ -108,19 +133,16 @@ Valideer het antwoord van de gebruiker logisch.
         except Exception as e:
             return f"⚠️ Fout bij verwerken: {str(e)[:100]}"
 
-    def generate_multiple_choice_distractors(self, question: str, correct: str) -> List[str]:
-        # Genereer plausibele foute opties voor MC mode
-        prompt = f"Vraag: {question}\nAntwoord: {correct}\nGenereer 3 foute maar plausibele opties."
+    @timed("llm.generate_multiple_choice_distractors")
+    def generate_multiple_choice_distractors(self, question: str, correct: str, n: int = 3) -> List[str]:
+        # Genereer plausibele foute opties voor MC mode (aanvulling op src/distractors.py)
+        prompt = f"Vraag: {question}\nAntwoord: {correct}\nGenereer {n} foute maar plausibele opties."
         try:
-            response = ollama.generate(model=self.model_name, prompt=prompt)
-            lines = [l.strip() for l in response['response'].split('\n') if l.strip()]
+            response = self._generate(prompt)
+            lines = [l.strip() for l in response.split('\n') if l.strip()]
             # Remove duplicates terwijl volgorde behouden blijft
             unique_lines = list(dict.fromkeys(lines))
-            # Zorg dat we minimaal 3 opties hebben
-            if len(unique_lines) >= 3:
-                return unique_lines[:3]
-            else:
-                # Fallback als LLM niet genoeg opties geeft
-                return unique_lines + ["Optie A", "Optie B", "Optie C"][:3 - len(unique_lines)]
-        except:
-            return ["Fout A", "Fout B", "Fout C"]
\ No newline at end of file
+            # Geen nep-opties: liever minder opties dan 'Fout A'
+            return unique_lines[:n]
+        except Exception:
+            return []
\ No newline at end of file
@@ -0,0 +1,218 @@
+"""
+Metrics: lichte instrumentatie (timers en tellers) voor de hot paths.
+Metingen worden per Streamlit rerun verzameld (start_run/finish_run) en
+procesbreed opgeteld. Met JOMCOLLEGE_TRACE=<pad> komt er ook een JSONL trace
+(Chrome trace events) bij, die `python -m src.metrics` omzet naar een bestand
+voor Perfetto/speedscope of naar folded stacks voor flamegraph.pl.
+"""
+
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+
+TRACE_FILE = os.environ.get("JOMCOLLEGE_TRACE")  # None = geen trace
+
+_run_ids = itertools.count(1)
+_trace_lock = threading.Lock()
+_totals_lock = threading.Lock()
+_totals: Dict[str, List[float]] = {}  # naam -> [aantal, totaal s, max s]
+
+
+class RunRecorder:
+    """Timers, tellers en (bij tracing) spans van één rerun."""
+
+    __slots__ = ("run_id", "label", "started", "wall_started", "last_activity",
+                 "timers", "counters", "spans", "stack", "finished")
+
+    def __init__(self, label: str):
+        self.run_id = next(_run_ids)
+        self.label = label
+        self.started = self.last_activity = time.perf_counter()
+        self.wall_started = time.time()
+        self.timers: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.spans: List[tuple] = []  # (naam, stack, start, duur)
+        self.stack: List[str] = [label]
+        self.finished: Optional[Dict] = None
+
+    def summary(self, end: float) -> Dict:
+        timers = {
+            name: {"calls": int(c), "total_ms": total * 1000, "max_ms": peak * 1000}
+            for name, (c, total, peak) in self.timers.items()
+        }
+        return {
+            "run_id": self.run_id,
+            "label": self.label,
+            "wall_ms": (end - self.started) * 1000,
+            "timers": dict(sorted(timers.items(), key=lambda kv: -kv[1]["total_ms"])),
+            "counters": dict(self.counters),
+        }
+
+
+_current: ContextVar[Optional[RunRecorder]] = ContextVar("metrics_run", default=None)
+
+
+def _add(table: Dict[str, List[float]], name: str, elapsed: float) -> None:
+    entry = table.get(name)
+    if entry is None:
+        table[name] = [1, elapsed, elapsed]
+    else:
+        entry[0] += 1
+        entry[1] += elapsed
+        if elapsed > entry[2]:
+            entry[2] = elapsed
+
+
+def _record(name: str, start: float, end: float) -> None:
+    elapsed = end - start
+    with _totals_lock:
+        _add(_totals, name, elapsed)
+    run = _current.get()
+    if run is not None and run.finished is None:
+        _add(run.timers, name, elapsed)
+        run.last_activity = end
+        if TRACE_FILE:
+            run.spans.append((name, ";".join(run.stack), start, elapsed))
+
+
+# --- Meten -----------------------------------------------------------------------------
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """Meet de duur van een blok (telt mee in de huidige rerun en procesbreed)."""
+    run = _current.get()
+    if run is not None:
+        run.stack.append(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        if run is not None:
+            run.stack.pop()
+        _record(name, start, end)
+
+
+def timed(name: str):
+    """Decorator-variant van timer() (zonder contextmanager, voor de hot paths)."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            run = _current.get()
+            if run is not None:
+                run.stack.append(name)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                if run is not None:
+                    run.stack.pop()
+                _record(name, start, end)
+        return wrapper
+    return decorate
+
+
+def count(name: str, n: int = 1) -> None:
+    """Verhoog een teller in de huidige rerun (geen rerun actief = genegeerd)."""
+    run = _current.get()
+    if run is not None and run.finished is None:
+        run.counters[name] = run.counters.get(name, 0) + n
+
+
+def totals() -> Dict[str, Dict]:
+    """Procesbrede timers sinds de start (ook achtergrondthreads)."""
+    with _totals_lock:
+        return {name: {"calls": int(c), "total_ms": total * 1000, "max_ms": peak * 1000}
+                for name, (c, total, peak) in _totals.items()}
+
+
+# --- Reruns ----------------------------------------------------------------------------
+
+def start_run(label: str = "rerun") -> RunRecorder:
+    """Begin een nieuwe meting voor deze thread/context (bijv. aan het begin van app.py)."""
+    run = RunRecorder(label)
+    _current.set(run)
+    return run
+
+
+def finish_run(run: Optional[RunRecorder] = None, interrupted: bool = False) -> Dict:
+    """
+    Sluit een rerun af en schrijf zijn spans naar de trace.
+    interrupted=True: de rerun is afgebroken (bijv. st.rerun()) en wordt pas
+    later afgesloten; de duur loopt dan tot de laatste meting.
+    """
+    run = run or _current.get()
+    if run is None:
+        return {}
+    if run.finished is not None:
+        return run.finished
+    end = run.last_activity if interrupted else time.perf_counter()
+    run.finished = run.summary(end)
+    if TRACE_FILE:
+        _write_trace(run, end)
+    if _current.get() is run:
+        _current.set(None)
+    return run.finished
+
+
+def _write_trace(run: RunRecorder, end: float) -> None:
+    pid, tid = os.getpid(), threading.get_ident()
+
+    def event(name, stack, start, duration):
+        return json.dumps({
+            "name": name, "ph": "X", "pid": pid, "tid": tid,
+            "ts": round((run.wall_started + start - run.started) * 1e6),
+            "dur": round(duration * 1e6),
+            "args": {"run": run.run_id, "stack": stack},
+        }, ensure_ascii=False)
+
+    lines = [event(run.label, "", run.started, end - run.started)]
+    lines.extend(event(*span) for span in run.spans)
+    with _trace_lock:
+        with open(TRACE_FILE, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+# --- Trace omzetten ------------------------------------------------------------------
+
+def read_trace(path: str) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def folded_stacks(events: List[Dict]) -> Dict[str, int]:
+    """Eigen tijd (µs) per stack pad, het invoerformaat van flamegraph.pl."""
+    inclusive: Dict[str, int] = {}
+    for e in events:
+        stack = e["args"]["stack"]
+        path = f"{stack};{e['name']}" if stack else e["name"]
+        inclusive[path] = inclusive.get(path, 0) + e["dur"]
+    own = dict(inclusive)
+    for path, duration in inclusive.items():
+        parent = path.rsplit(";", 1)[0] if ";" in path else None
+        if parent in own:
+            own[parent] -= duration
+    return {path: max(0, value) for path, value in own.items()}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Zet een JSONL trace om voor Perfetto of flamegraph.pl")
+    parser.add_argument("trace", help="pad naar de JSONL trace (JOMCOLLEGE_TRACE)")
+    parser.add_argument("--folded", action="store_true", help="folded stacks in plaats van Chrome JSON")
+    args = parser.parse_args()
+
+    events = read_trace(args.trace)
+    if args.folded:
+        for path, micros in sorted(folded_stacks(events).items()):
+            print(f"{path} {micros}")
+    else:
+        print(json.dumps({"traceEvents": events}))
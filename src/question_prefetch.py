@@ -0,0 +1,167 @@
+"""
+Vooruit genereren van System mode vragen. Zodra er een vraag op het scherm
+staat, maakt een achtergrondthread alvast de volgende voor dezelfde categorie
+en hetzelfde niveau, terwijl de gebruiker nadenkt. 'Volgende vraag' pakt er dan
+een uit de wachtrij (per (categorie, niveau), een paar diep) in plaats van op
+de LLM te wachten. Is er nog niets klaar maar wel onderweg, dan wachten we
+daarop; anders wordt er gewoon direct gegenereerd.
+Eén prefetcher per gebruiker (get_prefetcher); zijn thread stopt vanzelf als
+er een tijd niets te doen is en start weer bij de volgende prefetch().
+"""
+
+import atexit
+import hashlib
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from src.metrics import count, timer
+from src.user_shards import shard_name
+
+PREFETCH_DEPTH = 2  # Zoveel vragen per (categorie, niveau) klaar houden
+ERROR_PREFIX = "⚠️"  # generate_question geeft fouten als tekst terug; die nooit bewaren
+IDLE_SECONDS = 60.0  # Zo lang zonder jobs en de thread stopt
+
+Key = Tuple[str, str, str]  # (categorie, niveau, hash van de context)
+
+
+class QuestionPrefetcher:
+    """Wachtrij van vooraf gegenereerde vragen per (categorie, niveau), gevuld door één thread."""
+
+    def __init__(self, engine, depth: int = PREFETCH_DEPTH, idle: float = IDLE_SECONDS):
+        self.engine = engine
+        self.depth = depth
+        self.idle = idle
+        self._cond = threading.Condition()
+        self._ready: Dict[Key, Deque[str]] = {}
+        self._jobs: Deque[Tuple[Key, str]] = deque()  # (key, context), belangrijkste vooraan
+        self._busy: Optional[Key] = None
+        self._last: Dict[Key, str] = {}  # laatst uitgegeven vraag, niet meteen herhalen
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+
+    @staticmethod
+    def _key(category: str, context: str, level: str) -> Key:
+        digest = hashlib.blake2b(context.encode("utf-8"), digest_size=8).hexdigest()
+        return category, level, digest
+
+    def _queued(self, key: Key) -> int:
+        """Klaar + gepland + onderweg (aanroeper houdt de lock vast)."""
+        return (len(self._ready.get(key, ())) + sum(1 for k, _ in self._jobs if k == key)
+                + (self._busy == key))
+
+    def prefetch(self, category: str, context: str, level: str) -> None:
+        """Zorg dat er vragen voor deze categorie en dit niveau klaarstaan of onderweg zijn."""
+        key = self._key(category, context, level)
+        with self._cond:
+            missing = self.depth - self._queued(key)
+            if missing <= 0 or self._stop:
+                return
+            # Wat nu gevraagd wordt gaat voor (de gebruiker kan van categorie gewisseld zijn)
+            for _ in range(missing):
+                self._jobs.appendleft((key, context))
+            count("prefetch.scheduled", missing)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="question-prefetch", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def next_question(self, category: str, context: str, level: str) -> str:
+        """
+        De volgende vraag: uit de wachtrij als die klaar (of onderweg) is, anders direct
+        gegenereerd. Vult de wachtrij daarna weer aan.
+        """
+        key = self._key(category, context, level)
+        with self._cond:
+            question = self._take(key)
+            if question is None and self._queued(key):
+                # Onderweg: daarop wachten is sneller dan opnieuw beginnen
+                with timer("prefetch.wait"):
+                    while question is None and self._queued(key) and not self._stop:
+                        self._promote(key)
+                        self._cond.wait()
+                        question = self._take(key)
+        if question is None:
+            count("prefetch.miss")
+            question = self.engine.generate_question(context, level)
+        else:
+            count("prefetch.hit")
+        with self._cond:
+            self._last[key] = question
+        self.prefetch(category, context, level)
+        return question
+
+    def _take(self, key: Key) -> Optional[str]:
+        ready = self._ready.get(key)
+        return ready.popleft() if ready else None
+
+    def _promote(self, key: Key) -> None:
+        """Geplande jobs voor `key` naar voren (aanroeper houdt de lock vast)."""
+        mine = [job for job in self._jobs if job[0] == key]
+        if mine and self._jobs[0][0] != key:
+            others = [job for job in self._jobs if job[0] != key]
+            self._jobs.clear()
+            self._jobs.extend(mine + others)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._jobs and not self._stop:
+                    if not self._cond.wait(self.idle) and not self._jobs:
+                        # Niets meer te doen (sessie weg?): thread stoppen, prefetch() start een nieuwe
+                        self._thread = None
+                        return
+                if self._stop:
+                    return
+                key, context = self._jobs.popleft()
+                self._busy = key
+            try:
+                question = self.engine.generate_question(context, key[1])
+            except Exception:
+                question = ERROR_PREFIX
+            with self._cond:
+                self._busy = None
+                ready = self._ready.setdefault(key, deque())
+                if question.startswith(ERROR_PREFIX):
+                    # LLM niet bereikbaar: niet blijven proberen, de volgende vraag meldt de fout zelf
+                    self._jobs = deque(job for job in self._jobs if job[0] != key)
+                    count("prefetch.failed")
+                elif question not in ready and question != self._last.get(key):
+                    ready.append(question)
+                self._cond.notify_all()
+
+    def pending(self, category: str, context: str, level: str) -> Tuple[int, int]:
+        """(klaar, onderweg of gepland) voor deze categorie en dit niveau."""
+        key = self._key(category, context, level)
+        with self._cond:
+            ready = len(self._ready.get(key, ()))
+            return ready, self._queued(key) - ready
+
+    def close(self) -> None:
+        """Stop de thread (een lopende generatie wordt nog afgemaakt); daarna geen prefetches meer."""
+        with self._cond:
+            self._stop = True
+            self._jobs.clear()
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+
+_prefetchers: Dict[Optional[str], QuestionPrefetcher] = {}
+_prefetchers_lock = threading.Lock()
+
+
+def get_prefetcher(user: Optional[str], engine) -> QuestionPrefetcher:
+    """
+    Procesbrede prefetcher van een gebruiker (None = standaard), zodat elke rerun
+    en elke tab dezelfde wachtrij en thread gebruikt. `engine` wordt alleen gebruikt
+    als de prefetcher nog niet bestaat.
+    """
+    key = None if user is None else shard_name(user)
+    with _prefetchers_lock:
+        prefetcher = _prefetchers.get(key)
+        if prefetcher is None:
+            prefetcher = _prefetchers[key] = QuestionPrefetcher(engine)
+            atexit.register(prefetcher.close)
+    return prefetcher
@@ -0,0 +1,78 @@
+"""
+Scheduler: de constanten en formules van het herhaalschema op één plek.
+SM-2 update (ease/interval) en de selectiegewichten voor drills. De learning
+tracker gebruikt DEFAULT_PARAMS; de simulator probeert andere parameters uit.
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from src.due_index import MAX_DUE_DAYS
+
+
+@dataclass(frozen=True)
+class SchedulerParams:
+    """Alle instelbare constanten van SM-2 en de drill weging."""
+
+    # SM-2
+    ease_start: float = 2.5
+    ease_bonus: float = 0.1  # Goed: ease omhoog
+    ease_penalty: float = 0.2  # Fout: ease omlaag
+    ease_floor: float = 1.3
+    reset_interval: int = 1  # Fout: terug naar dit interval (dagen)
+    max_interval: int = MAX_DUE_DAYS
+
+    # Weging: (weight_base + foutpercentage * weight_error) * tijdfactor
+    weight_base: float = 0.3
+    weight_error: float = 0.7
+    overdue_factor: float = 0.5  # Extra gewicht per verstreken interval
+    weight_min: float = 0.1
+    weight_max: float = 3.0
+    weight_new: float = 1.0  # Nog nooit beantwoord
+
+
+DEFAULT_PARAMS = SchedulerParams()
+
+
+def next_review(ease: float, interval: int, correct: bool,
+                params: SchedulerParams = DEFAULT_PARAMS) -> Tuple[float, int]:
+    """SM-2 stap voor één drill. Returns: (nieuwe ease, nieuw interval in dagen)."""
+    if correct:
+        # Verhoog ease en interval (begrensd: anders groeit het exponentieel)
+        ease = max(params.ease_floor, ease + params.ease_bonus)
+        return ease, min(params.max_interval, int(interval * ease))
+    # Reset interval, verlaag ease
+    return max(params.ease_floor, ease - params.ease_penalty), params.reset_interval
+
+
+def next_review_array(ease: np.ndarray, interval: np.ndarray, correct: np.ndarray,
+                      params: SchedulerParams = DEFAULT_PARAMS) -> Tuple[np.ndarray, np.ndarray]:
+    """Gevectoriseerde next_review (parameters mogen ook arrays zijn die meebroadcasten)."""
+    ease = np.maximum(params.ease_floor,
+                      np.where(correct, ease + params.ease_bonus, ease - params.ease_penalty))
+    grown = np.minimum(params.max_interval, np.floor(interval * ease))
+    return ease, np.where(correct, grown, params.reset_interval)
+
+
+def selection_weights(correct: np.ndarray, incorrect: np.ndarray, interval: np.ndarray,
+                      days_ago: np.ndarray, params: SchedulerParams = DEFAULT_PARAMS) -> np.ndarray:
+    """
+    Selectiegewichten: meer fouten + langer geleden = hoger gewicht.
+    days_ago is in hele dagen, NaN als de drill nog nooit gezien is.
+    """
+    total = correct + incorrect
+
+    # Basis: percentage fout
+    error_rate = np.divide(incorrect, total, out=np.zeros(np.broadcast(incorrect, total).shape),
+                           where=total > 0)
+
+    # Als interval verstreken is, verhoog gewicht
+    with np.errstate(invalid="ignore"):
+        overdue = ~np.isnan(days_ago) & (days_ago >= interval)
+    time_factor = np.where(overdue, 1.0 + (days_ago / interval) * params.overdue_factor, 1.0)
+
+    weights = np.clip((params.weight_base + error_rate * params.weight_error) * time_factor,
+                      params.weight_min, params.weight_max)
+    return np.where(total == 0, params.weight_new, weights)
@@ -0,0 +1,302 @@
+"""
+Zoekindex: inverted index over drills (vraag, antwoord, categorie) en de context
+per categorie van alle decks. Tokens worden genormaliseerd (kleine letters,
+accenten weg: 'één' -> 'een', 'ruïne' -> 'ruine'), zodat 'Melkweg' en 'oerknal'
+overal gevonden worden. Ranking met BM25; een deck wordt apart bijgewerkt
+(update_deck/remove_deck) zonder de rest van de index opnieuw te bouwen.
+"""
+
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.metrics import count, timed
+from src.parser import load_deck
+
+# Soorten documenten in de index
+DRILL = "drill"
+CONTEXT = "context"
+
+# BM25 parameters (gangbare waarden)
+K1 = 1.2
+B = 0.75
+# Hoeveel termen een prefix (laatste, onvolledige zoekterm) maximaal mag opleveren
+MAX_PREFIX_TERMS = 50
+
+# Veelvoorkomende Nederlandse woorden: niet indexeren (lange postings, geen betekenis)
+STOPWORDS = frozenset("""
+    de het een en van in is op te dat die voor met zijn aan er niet als om ook bij of
+    door over naar uit tot dan wat wie welke hoe waar wordt worden werd was
+    deze dit ze zij hij je we wij u ik hun haar hem zo nog al maar meer veel kan
+""".split())
+
+_TOKEN = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Kleine letters en zonder accenten ('Ruïne' -> 'ruine', 'ĳs' -> 'ijs')."""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def tokenize(text: str) -> List[str]:
+    """Genormaliseerde tokens zonder stopwoorden."""
+    return [t for t in _TOKEN.findall(fold(text)) if t not in STOPWORDS]
+
+
+class SearchIndex:
+    """
+    Inverted index: term -> {doc: termfrequentie}. Documenten zijn drills
+    (met `file` erbij, zoals in het corpus) of contextblokken per categorie.
+    Voor het scoren wordt per term lazy een NumPy array (docs, tf) gemaakt;
+    een update maakt alleen de arrays van de geraakte termen ongeldig.
+    Niet thread-safe voor schrijven; get_index() regelt dat voor de app.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.docs: Dict[int, Tuple] = {}  # doc -> (soort, bestand, categorie, drill/tekst, lengte)
+        self.by_file: Dict[str, List[int]] = {}
+        self.total_length = 0
+        self._next_doc = 0
+        self._terms: Dict[int, Tuple[str, ...]] = {}  # doc -> unieke termen (voor verwijderen)
+        self._lengths = np.zeros(1024, dtype=np.float64)  # doc -> aantal tokens
+        self._is_drill = np.zeros(1024, dtype=bool)
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}  # term -> (docs, tf)
+        self._vocabulary: Optional[List[str]] = None  # gesorteerd, lazy (prefix zoeken)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    @property
+    def files(self) -> List[str]:
+        return list(self.by_file)
+
+    # --- Bijwerken -------------------------------------------------------------------
+
+    def _add(self, kind: str, file: str, category: str, payload, text: str) -> None:
+        tokens = tokenize(text)
+        doc = self._next_doc
+        self._next_doc += 1
+        if doc >= len(self._lengths):
+            self._lengths = np.resize(self._lengths, 2 * len(self._lengths))
+            self._is_drill = np.resize(self._is_drill, 2 * len(self._is_drill))
+        self._lengths[doc] = len(tokens)
+        self._is_drill[doc] = kind == DRILL
+
+        frequencies = Counter(tokens)
+        for term, tf in frequencies.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                self._vocabulary = None
+            postings[doc] = tf
+            self._arrays.pop(term, None)
+        self.docs[doc] = (kind, file, category, payload, len(tokens))
+        self._terms[doc] = tuple(frequencies)
+        self.by_file.setdefault(file, []).append(doc)
+        self.total_length += len(tokens)
+
+    @timed("search.update_deck")
+    def update_deck(self, name: str, deck: Dict) -> None:
+        """(Her)indexeer één deck (parse_file resultaat) onder bestandsnaam `name`."""
+        self.remove_deck(name)
+        for drill in deck["drills"]:
+            text = f"{drill['question']} {drill['answer']} {drill['category']}"
+            self._add(DRILL, name, drill["category"], {"file": name, **drill}, text)
+        for category, text in deck["context"].items():
+            self._add(CONTEXT, name, category, text, f"{category} {text}")
+        self.by_file.setdefault(name, [])
+        count("search.indexed", len(deck["drills"]) + len(deck["context"]))
+
+    def remove_deck(self, name: str) -> None:
+        for doc in self.by_file.pop(name, ()):
+            self.total_length -= self.docs.pop(doc)[4]
+            for term in self._terms.pop(doc):
+                postings = self.postings[term]
+                del postings[doc]
+                self._arrays.pop(term, None)
+                if not postings:
+                    del self.postings[term]
+                    self._vocabulary = None
+        # Doc nummers worden niet hergebruikt; hernummer als er te veel gaten zijn
+        if self._next_doc > 2 * len(self.docs) + 4096:
+            self._compact()
+
+    def _compact(self) -> None:
+        renumber = {old: new for new, old in enumerate(self.docs)}
+        self.docs = {renumber[old]: doc for old, doc in self.docs.items()}
+        self._terms = {renumber[old]: terms for old, terms in self._terms.items()}
+        self.postings = {term: {renumber[d]: tf for d, tf in postings.items()}
+                         for term, postings in self.postings.items()}
+        self.by_file = {name: [renumber[d] for d in docs] for name, docs in self.by_file.items()}
+        self._next_doc = len(self.docs)
+        size = max(1024, 2 * self._next_doc)
+        self._lengths = np.zeros(size, dtype=np.float64)
+        self._is_drill = np.zeros(size, dtype=bool)
+        for doc, (kind, _, _, _, length) in self.docs.items():
+            self._lengths[doc] = length
+            self._is_drill[doc] = kind == DRILL
+        self._arrays.clear()
+
+    # --- Zoeken ----------------------------------------------------------------------
+
+    def _expand(self, term: str) -> List[str]:
+        """Alle termen die met `term` beginnen (voor de laatste, nog onvolledige zoekterm)."""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        vocabulary = self._vocabulary
+        start = bisect.bisect_left(vocabulary, term)
+        end = bisect.bisect_left(vocabulary, term + "\uffff", start)
+        return vocabulary[start:min(end, start + MAX_PREFIX_TERMS)]
+
+    def _array(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self.postings.get(term)
+            if not postings:
+                return None
+            arrays = self._arrays[term] = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings)),
+            )
+        return arrays
+
+    @timed("search.query")
+    def search(self, query: str, limit: Optional[int] = 20, kind: Optional[str] = None,
+               file: Optional[str] = None, prefix: bool = True) -> List[Dict]:
+        """
+        Zoek met BM25 (elke term telt mee, meer overeenkomende termen = hoger).
+        prefix=True: de laatste zoekterm matcht ook als begin van een woord
+        ('melk' vindt 'melkweg'). Filters: kind (DRILL/CONTEXT) en file.
+
+        Returns:
+            Lijst van {"kind", "file", "category", "score", "drill" of "text"},
+            beste eerst; limit=None geeft alle treffers.
+        """
+        terms = tokenize(query)
+        if not terms or not self.docs:
+            return []
+
+        groups = [[term] for term in terms]
+        if prefix:
+            groups[-1] = self._expand(terms[-1]) or groups[-1]
+
+        n_docs = len(self.docs)
+        scale = B / (self.total_length / n_docs or 1.0)
+        lengths = self._lengths
+        scores = np.zeros(self._next_doc)
+        for group in groups:
+            # Binnen een groep (prefix-uitbreidingen) telt alleen de beste term per document
+            best = scores if len(group) == 1 else np.zeros(self._next_doc)
+            for term in group:
+                arrays = self._array(term)
+                if arrays is None:
+                    continue
+                docs, tf = arrays
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                score = idf * tf * (K1 + 1) / (tf + K1 * (1 - B + scale * lengths[docs]))
+                if best is scores:
+                    scores[docs] += score
+                else:
+                    np.maximum.at(best, docs, score)
+            if best is not scores:
+                scores += best
+
+        matched = np.flatnonzero(scores)
+        if kind is not None:
+            matched = matched[self._is_drill[matched] == (kind == DRILL)]
+        if file is not None:
+            matched = matched[np.isin(matched, self.by_file.get(file, []))]
+        if limit is not None and len(matched) > limit:
+            matched = matched[np.argpartition(-scores[matched], limit - 1)[:limit]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        count("search.hits", int(np.count_nonzero(scores)))
+
+        hits = []
+        for doc in matched.tolist():
+            doc_kind, doc_file, category, payload, _ = self.docs[doc]
+            hit = {"kind": doc_kind, "file": doc_file, "category": category, "score": float(scores[doc])}
+            hit["drill" if doc_kind == DRILL else "text"] = payload
+            hits.append(hit)
+        return hits
+
+    def deck_for(self, query: str, name: Optional[str] = None) -> Dict:
+        """
+        Alle drills over `query` als deck in parse_file vorm ('drill alles over X'),
+        met de context van de categorieën waarin iets gevonden is.
+        """
+        hits = self.search(query, limit=None)
+        drills = [hit["drill"] for hit in hits if hit["kind"] == DRILL]
+        categories = {hit["category"] for hit in hits}
+        blocks: Dict[str, List[str]] = {}
+        for doc_kind, _, category, text, _ in self.docs.values():
+            if doc_kind == CONTEXT and category in categories:
+                blocks.setdefault(category, []).append(text)
+        context = {category: " ".join(parts) for category, parts in blocks.items()}
+        return {"filename": name or f"🔎 {query}", "drills": drills, "context": context}
+
+
+# --- Index over data/ ----------------------------------------------------------------
+
+class LibraryIndex:
+    """SearchIndex over een map met decks; refresh() indexeert alleen gewijzigde bestanden."""
+
+    def __init__(self, data_dir: Path, pattern: str = "*.txt"):
+        self.data_dir = Path(data_dir)
+        self.pattern = pattern
+        self.index = SearchIndex()
+        self.lock = threading.Lock()
+        self._stats: Dict[str, Tuple[int, int]] = {}  # bestandsnaam -> (grootte, mtime_ns)
+
+    @timed("search.refresh")
+    def refresh(self) -> List[str]:
+        """Werk de index bij voor nieuwe, gewijzigde en verwijderde decks; geeft de gewijzigde namen."""
+        changed = []
+        with self.lock:
+            seen = set()
+            for path in sorted(self.data_dir.glob(self.pattern)):
+                seen.add(path.name)
+                st = path.stat()
+                stamp = (st.st_size, st.st_mtime_ns)
+                if self._stats.get(path.name) != stamp:
+                    self.index.update_deck(path.name, load_deck(path))
+                    self._stats[path.name] = stamp
+                    changed.append(path.name)
+            for name in set(self._stats) - seen:
+                self.index.remove_deck(name)
+                del self._stats[name]
+                changed.append(name)
+        return changed
+
+    def search(self, query: str, **kwargs) -> List[Dict]:
+        with self.lock:
+            return self.index.search(query, **kwargs)
+
+    def deck_for(self, query: str, name: Optional[str] = None) -> Dict:
+        with self.lock:
+            return self.index.deck_for(query, name)
+
+
+_indexes: Dict[Path, LibraryIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(data_dir: Path) -> LibraryIndex:
+    """Procesbrede, bijgewerkte zoekindex voor `data_dir` (eerste keer: volledig opbouwen)."""
+    key = Path(data_dir).resolve()
+    with _indexes_lock:
+        library = _indexes.get(key)
+        if library is None:
+            library = _indexes[key] = LibraryIndex(key)
+    library.refresh()
+    return library
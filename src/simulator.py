@@ -0,0 +1,340 @@
+"""
+Simulator: speel de drill selectie + SM-2 offline af voor kandidaat-parameters.
+Gesimuleerde leerlingen vergeten volgens een exponentiële vergeetcurve; alle
+leerlingen en parametersets worden tegelijk (gevectoriseerd) doorgerekend.
+Met de echte antwoordhistorie wordt eerst het leerlingmodel gefit (replay),
+zodat je parameters kiest die de meeste kennis per studieminuut opleveren.
+
+Gebruik: python -m src.simulator
+"""
+
+from dataclasses import dataclass, fields, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from src.due_index import SECONDS_PER_DAY, iso_seconds
+from src.scheduler import DEFAULT_PARAMS, SchedulerParams, next_review_array, selection_weights
+
+MAX_REPLAY_REVIEWS = 200  # Per drill; langere historie voegt weinig toe aan de fit
+SESSION_GAP = 300  # Seconden: grotere pauze = nieuwe sessie
+# Sneller dan dit kan niemand een vraag lezen en beantwoorden: kortere gefitte tijden
+# komen uit dubbele/gelijktijdige events en zouden per_day onbruikbaar groot maken
+MIN_SECONDS_PER_REVIEW = 2.0
+MAX_REVIEWS_PER_DAY = 1000
+
+
+@dataclass(frozen=True)
+class LearnerModel:
+    """
+    Geheugenmodel: recall = exp(-dagen sinds laatste review / stabiliteit).
+    Goed antwoord: stabiliteit groeit, meer naarmate de recall lager was.
+    Fout antwoord: stabiliteit zakt naar `lapse` keer de oude waarde.
+    """
+
+    initial_stability: float = 1.0  # Dagen, na de eerste keer zien
+    growth: float = 2.5  # Maximale groeifactor na een goed antwoord
+    lapse: float = 0.5
+    prior_recall: float = 0.1  # Kans dat een nieuwe drill al gekend wordt
+    difficulty_sd: float = 0.5  # Lognormale spreiding van de stabiliteit per drill
+    seconds_per_review: float = 10.0
+
+
+def _recall(t, last, stability, prior):
+    """Recall kans op moment t (dagen); nooit geziene drills: prior."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = np.exp(-(t - last) / stability)
+    return np.where(np.isnan(last), prior, p)
+
+
+def _learn(stability, last, correct, p, s0, model: LearnerModel):
+    """Nieuwe stabiliteit na een review (het antwoord wordt altijd getoond)."""
+    grown = stability * (1.0 + (model.growth - 1.0) * (1.0 - p))
+    lapsed = np.maximum(s0, stability * model.lapse)
+    return np.where(np.isnan(last), s0, np.where(correct, grown, lapsed))
+
+
+def _stack(params_list: List[SchedulerParams], repeat: int) -> SchedulerParams:
+    """Eén SchedulerParams met kolom-arrays (rij per leerling) in plaats van scalars."""
+    return SchedulerParams(**{
+        f.name: np.repeat(np.array([getattr(p, f.name) for p in params_list], dtype=float),
+                          repeat)[:, None]
+        for f in fields(SchedulerParams)
+    })
+
+
+class _FenwickRows:
+    """
+    Fenwick tree per rij: gewicht wijzigen en gewogen trekken in O(log n),
+    voor alle rijen (leerlingen) tegelijk. Werkt op platte indexen (sneller
+    dan 2D fancy indexing).
+    """
+
+    def __init__(self, weights: np.ndarray):
+        rows, n = weights.shape
+        self.n = n
+        self.weights = weights.ravel().copy()
+        prefix = np.zeros((rows, n + 1))
+        np.cumsum(weights, axis=1, out=prefix[:, 1:])
+        i = np.arange(1, n + 1)
+        # Kolom n + 1 is een afvalbak voor updates voorbij het einde
+        tree = np.zeros((rows, n + 2))
+        tree[:, 1:n + 1] = prefix[:, i] - prefix[:, i - (i & -i)]
+        self.tree = tree.ravel()
+        self.total = prefix[:, -1].copy()
+        self._base = np.arange(rows) * (n + 2)
+        self._top = 1 << (n.bit_length() - 1)
+        self._levels = n.bit_length() + 1
+
+    def search(self, r: np.ndarray) -> np.ndarray:
+        """Kleinste index met prefix som >= r (zoals bisect_left op de cumsum)."""
+        pos = np.zeros(len(r), dtype=np.int64)
+        r = r.copy()
+        bit = self._top
+        while bit:
+            nxt = pos + bit
+            value = self.tree.take(self._base + np.minimum(nxt, self.n + 1))
+            go = (nxt <= self.n) & (value < r)
+            r -= value * go
+            pos += bit * go
+            bit >>= 1
+        return np.minimum(pos, self.n - 1)
+
+    def set(self, flat: np.ndarray, index: np.ndarray, weight: np.ndarray) -> None:
+        """Zet het gewicht van drill `index` per rij (`flat` = platte index in de states)."""
+        delta = weight - self.weights.take(flat)
+        self.weights[flat] = weight
+        self.total += delta
+        i = index + 1
+        for _ in range(self._levels):
+            # Eén index per rij, dus gewone fancy indexing is veilig (geen duplicaten)
+            self.tree[self._base + i] += delta
+            i = np.minimum(i + (i & -i), self.n + 1)
+
+
+def simulate(params_list: List[SchedulerParams], learner: LearnerModel = LearnerModel(),
+             n_learners: int = 100, n_drills: int = 200, days: int = 30,
+             minutes_per_day: float = 10.0, seed: int = 0) -> List[Dict]:
+    """
+    Simuleer `days` dagen oefenen met de weging + SM-2 uit de app (één sessie
+    per dag; 'dagen geleden' telt in kalenderdagen). Elke parameterset krijgt
+    dezelfde leerlingen (zelfde drill moeilijkheden).
+
+    Returns per parameterset: retention (gemiddelde recall aan het eind),
+    accuracy (tijdens het oefenen), minutes, reviews en recall_per_minute
+    (verwacht aantal gekende drills per studieminuut).
+    """
+    rng = np.random.default_rng(seed)
+    n_sets = len(params_list)
+    rows = n_sets * n_learners
+    params = _stack(params_list, n_learners)
+
+    s0 = learner.initial_stability * rng.lognormal(0.0, learner.difficulty_sd, (n_learners, n_drills))
+    s0 = np.tile(s0, (n_sets, 1))
+    correct = np.zeros((rows, n_drills))
+    incorrect = np.zeros((rows, n_drills))
+    ease = np.full((rows, n_drills), params.ease_start)
+    interval = np.ones((rows, n_drills))
+    last = np.full((rows, n_drills), np.nan)
+    stability = np.ones((rows, n_drills))
+
+    seconds_per_review = max(learner.seconds_per_review, MIN_SECONDS_PER_REVIEW)
+    per_day = min(MAX_REVIEWS_PER_DAY, max(1, int(minutes_per_day * 60 / seconds_per_review)))
+    step = seconds_per_review / SECONDS_PER_DAY
+    answered_correct = np.zeros(rows)
+
+    # Per review werken we op platte views: één drill per rij
+    flat_params = SchedulerParams(**{f.name: getattr(params, f.name)[:, 0]
+                                     for f in fields(SchedulerParams)})
+    states = [a.ravel() for a in (correct, incorrect, ease, interval, last, stability, s0)]
+    f_correct, f_incorrect, f_ease, f_interval, f_last, f_stability, f_s0 = states
+    offsets = np.arange(rows) * n_drills
+    never = np.zeros(rows)
+
+    for day in range(days):
+        # Gewichten veranderen binnen een dag alleen voor de net geoefende drill:
+        # één keer volledig berekenen, daarna per review alleen die ene bijwerken
+        days_ago = day - np.floor(last)
+        tree = _FenwickRows(selection_weights(correct, incorrect, interval, days_ago, params))
+
+        for k in range(per_day):
+            t = day + k * step
+            # Gewogen keuze per rij, zelfde verdeling als select_weighted_drill
+            pick = tree.search(rng.random(rows) * tree.total)
+            flat = offsets + pick
+
+            d_last = f_last.take(flat)
+            d_stability = f_stability.take(flat)
+            p = _recall(t, d_last, d_stability, learner.prior_recall)
+            ok = rng.random(rows) < p
+            answered_correct += ok
+
+            d_correct = f_correct.take(flat) + ok
+            d_incorrect = f_incorrect.take(flat) + ~ok
+            new_ease, new_interval = next_review_array(f_ease.take(flat), f_interval.take(flat),
+                                                       ok, flat_params)
+            f_correct[flat] = d_correct
+            f_incorrect[flat] = d_incorrect
+            f_ease[flat] = new_ease
+            f_interval[flat] = new_interval
+            f_stability[flat] = _learn(d_stability, d_last, ok, p, f_s0.take(flat), learner)
+            f_last[flat] = t
+
+            # Net gezien: days_ago = 0, dus nooit 'overdue'
+            tree.set(flat, pick, selection_weights(d_correct, d_incorrect, new_interval,
+                                                   never, flat_params))
+
+    retention = _recall(float(days), last, stability, learner.prior_recall).mean(axis=1)
+    reviews = days * per_day
+    minutes = reviews * seconds_per_review / 60
+
+    results = []
+    for i, p in enumerate(params_list):
+        block = slice(i * n_learners, (i + 1) * n_learners)
+        kept = float(retention[block].mean())
+        results.append({
+            "params": p,
+            "retention": kept,
+            "accuracy": float(answered_correct[block].mean() / reviews),
+            "minutes": minutes,
+            "reviews": reviews,
+            "recall_per_minute": kept * n_drills / minutes,
+        })
+    return results
+
+
+# --- Replay van de echte historie -----------------------------------------------
+
+def with_drill_id(events: Iterable[Dict]) -> List[Dict]:
+    """
+    Alleen events met een drill_id. Events die uit user_data.json gemigreerd zijn
+    hebben alleen bestand en categorie; die zijn niet per drill te volgen en worden
+    bij de replay overgeslagen.
+    """
+    return [event for event in events if event.get("drill_id")]
+
+
+def _history_arrays(events: Iterable[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Events (met drill_id) -> (tijd in dagen, correct, drill index), gesorteerd op drill en tijd."""
+    ids: Dict[str, int] = {}
+    times, outcomes, drills = [], [], []
+    for event in events:
+        times.append(iso_seconds(event["date"]) / SECONDS_PER_DAY)
+        outcomes.append(bool(event["correct"]))
+        drills.append(ids.setdefault(event["drill_id"], len(ids)))
+    times, outcomes, drills = np.array(times), np.array(outcomes, dtype=bool), np.array(drills)
+    order = np.lexsort((times, drills))
+    return times[order], outcomes[order], drills[order]
+
+
+def _padded(times, outcomes, drills) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per drill één rij reviews (tijd, correct, geldig), opgevuld tot de langste historie."""
+    starts = np.flatnonzero(np.r_[True, drills[1:] != drills[:-1]])
+    position = np.arange(len(drills)) - np.repeat(starts, np.diff(np.r_[starts, len(drills)]))
+    keep = position < MAX_REPLAY_REVIEWS
+    row = np.searchsorted(starts, np.arange(len(drills)), side="right") - 1
+
+    shape = (len(starts), int(position[keep].max()) + 1)
+    t = np.zeros(shape)
+    ok = np.zeros(shape, dtype=bool)
+    valid = np.zeros(shape, dtype=bool)
+    t[row[keep], position[keep]] = times[keep]
+    ok[row[keep], position[keep]] = outcomes[keep]
+    valid[row[keep], position[keep]] = True
+    return t, ok, valid
+
+
+def fit_learner(events: Iterable[Dict],
+                stabilities=(0.25, 0.5, 1.0, 2.0, 4.0, 8.0),
+                growths=(1.5, 2.0, 2.5, 3.0, 4.0, 6.0),
+                lapses=(0.2, 0.35, 0.5, 0.7)) -> Optional[LearnerModel]:
+    """
+    Fit het leerlingmodel op de antwoordhistorie (maximum likelihood over een grid).
+    Alle grid punten en drills worden tegelijk doorgerekend. None zonder historie
+    (events zonder drill_id tellen niet mee).
+    """
+    times, outcomes, drills = _history_arrays(with_drill_id(events))
+    if len(times) == 0:
+        return None
+    t, ok, valid = _padded(times, outcomes, drills)
+
+    # Eerste antwoord op een drill: gesloten vorm (fractie goed)
+    prior = float(np.clip(ok[:, 0].mean(), 0.01, 0.99))
+
+    grid = np.array(np.meshgrid(stabilities, growths, lapses, indexing="ij")).reshape(3, -1)
+    s0, growth, lapse = (g[:, None] for g in grid)  # (G, 1) tegen (G, drills)
+    n_grid, n_drills = len(grid[0]), t.shape[0]
+
+    stability = np.broadcast_to(s0, (n_grid, n_drills)).copy()
+    loglik = np.zeros(n_grid)
+    for k in range(1, t.shape[1]):
+        p = np.clip(np.exp(-(t[:, k] - t[:, k - 1]) / stability), 1e-4, 1 - 1e-4)
+        counted = valid[:, k]
+        loglik += np.where(counted, np.where(ok[:, k], np.log(p), np.log1p(-p)), 0.0).sum(axis=1)
+        grown = stability * (1.0 + (growth - 1.0) * (1.0 - p))
+        lapsed = np.maximum(s0, stability * lapse)
+        stability = np.where(counted, np.where(ok[:, k], grown, lapsed), stability)
+
+    best = int(np.argmax(loglik))
+    gaps = np.diff(np.sort(times)) * SECONDS_PER_DAY
+    gaps = gaps[(gaps > 0) & (gaps < SESSION_GAP)]
+    seconds_per_review = float(np.median(gaps)) if len(gaps) else LearnerModel.seconds_per_review
+    if seconds_per_review < MIN_SECONDS_PER_REVIEW:
+        seconds_per_review = LearnerModel.seconds_per_review  # Gedegenereerde fit: standaard
+    return LearnerModel(
+        initial_stability=float(grid[0][best]),
+        growth=float(grid[1][best]),
+        lapse=float(grid[2][best]),
+        prior_recall=prior,
+        seconds_per_review=seconds_per_review,
+    )
+
+
+def replay(events: Iterable[Dict], params_list: List[SchedulerParams],
+           **kwargs) -> Tuple[Optional[LearnerModel], List[Dict]]:
+    """Fit het leerlingmodel op de historie en simuleer daarmee elke parameterset."""
+    events = with_drill_id(events)
+    learner = fit_learner(events) or LearnerModel()
+    if events and "n_drills" not in kwargs:
+        kwargs["n_drills"] = len({e["drill_id"] for e in events})
+    return learner, simulate(params_list, learner, **kwargs)
+
+
+def param_grid(base: SchedulerParams = DEFAULT_PARAMS, **values) -> List[SchedulerParams]:
+    """Alle combinaties van de gegeven waarden, bijv. param_grid(ease_bonus=[0.05, 0.1])."""
+    grid = [base]
+    for name, options in values.items():
+        grid = [replace(p, **{name: v}) for p in grid for v in options]
+    return grid
+
+
+if __name__ == "__main__":
+    import time
+
+    from src.event_log import AnswerLog
+    from src.learning_tracker import LOG_DIR
+
+    all_events = list(AnswerLog(LOG_DIR).iter_events()) if LOG_DIR.exists() else []
+    events = with_drill_id(all_events)
+    candidates = param_grid(
+        ease_bonus=[0.05, 0.1, 0.2],
+        overdue_factor=[0.25, 0.5, 1.0],
+        weight_error=[0.5, 0.7, 1.0],
+    )
+
+    start = time.perf_counter()
+    learner, results = replay(events, candidates, n_learners=200, days=30)
+    elapsed = time.perf_counter() - start
+    total_reviews = sum(r["reviews"] for r in results) * 200
+
+    print(f"Historie: {len(events)} antwoorden" + ("" if events else " (synthetische leerlingen)"))
+    if len(all_events) > len(events):
+        print(f"  {len(all_events) - len(events)} gemigreerde antwoorden zonder drill_id overgeslagen")
+    print(f"Leerlingmodel: {learner}")
+    print(f"{total_reviews} reviews in {elapsed:.1f}s ({total_reviews / elapsed:,.0f}/s)\n")
+    print(f"{'ease+':>6} {'overdue':>8} {'w_err':>6} {'retentie':>9} {'recall/min':>11}")
+    for r in sorted(results, key=lambda r: -r["recall_per_minute"]):
+        p = r["params"]
+        marker = "  <- huidig" if p == DEFAULT_PARAMS else ""
+        print(f"{p.ease_bonus:>6} {p.overdue_factor:>8} {p.weight_error:>6} "
+              f"{r['retention']:>9.3f} {r['recall_per_minute']:>11.2f}{marker}")
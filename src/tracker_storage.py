@@ -0,0 +1,365 @@
+"""
+Tracker Storage: SQLite opslag voor de learning tracker.
+Elke wijziging raakt alleen de betrokken rijen, in plaats van het hele
+user_data.json bestand opnieuw te schrijven.
+"""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Iterator
+
+from src.drill_state import DrillState, DrillTable
+
+SCHEMA = """
+-- Per-drill SM-2 state; key = content hash (of oude file::vraag key),
+-- timestamps als seconden sinds (naive) epoch
+CREATE TABLE IF NOT EXISTS drill_state (
+    key         TEXT PRIMARY KEY,
+    file        TEXT,
+    category    TEXT,
+    label       TEXT,
+    correct     INTEGER NOT NULL DEFAULT 0,
+    incorrect   INTEGER NOT NULL DEFAULT 0,
+    ease_factor REAL NOT NULL DEFAULT 2.5,
+    interval    INTEGER NOT NULL DEFAULT 1,
+    last_seen   REAL,
+    due         REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS drill_state_file_due ON drill_state(file, due);
+
+CREATE TABLE IF NOT EXISTS categories (
+    category  TEXT PRIMARY KEY,
+    correct   INTEGER NOT NULL DEFAULT 0,
+    incorrect INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id    INTEGER PRIMARY KEY AUTOINCREMENT,
+    date  TEXT,
+    file  TEXT,
+    score INTEGER,
+    total INTEGER
+);
+
+-- Alleen nog voor migratie; nieuwe antwoorden gaan naar het AnswerLog (event_log.py)
+CREATE TABLE IF NOT EXISTS answers_log (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    date     TEXT,
+    correct  INTEGER,
+    file     TEXT,
+    category TEXT
+);
+CREATE INDEX IF NOT EXISTS answers_log_date ON answers_log(date);
+
+-- Geaggregeerde antwoorden per dag; kind = 'day', 'file' of 'category'
+CREATE TABLE IF NOT EXISTS rollups (
+    day       TEXT NOT NULL,
+    kind      TEXT NOT NULL,
+    key       TEXT NOT NULL DEFAULT '',
+    correct   INTEGER NOT NULL DEFAULT 0,
+    total     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, kind, key)
+);
+
+CREATE TABLE IF NOT EXISTS achievements (
+    achievement_id TEXT PRIMARY KEY,
+    unlocked_at    TEXT,
+    seen           INTEGER NOT NULL DEFAULT 0
+);
+
+-- Globale stats als key/value; value is JSON (int, str of null)
+CREATE TABLE IF NOT EXISTS stats (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Kolommen van drill_state, in de volgorde van DrillState.__slots__
+DRILL_FIELDS = DrillState.__slots__
+
+# Zelfde limiet als de oude JSON opslag
+MAX_SESSIONS = 1000
+
+# Rollup kind -> veld in de dag-bucket
+ROLLUP_KINDS = {"file": "files", "category": "categories"}
+
+
+class TrackerDB:
+    """Dunne laag over sqlite3 met de tabellen van de learning tracker."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        # Streamlit draait reruns in verschillende threads
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._depth = 0
+        self._upgrade_schema()
+
+    def _upgrade_schema(self) -> None:
+        """Zet de oude drills tabel (isoformat timestamps) eenmalig om naar drill_state."""
+        legacy = self.conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'drills'"
+        ).fetchone()
+        if legacy is None:
+            return
+        with self.transaction():
+            for row in self.conn.execute("SELECT * FROM drills").fetchall():
+                drill = {k: row[k] for k in row.keys()}
+                self.put_drill(row["drill_id"], DrillState.from_dict(row["drill_id"], drill))
+            self.conn.execute("DROP TABLE drills")
+
+    @contextmanager
+    def transaction(self) -> Iterator["TrackerDB"]:
+        """Groepeer meerdere rij-updates in één transactie (nesting toegestaan)."""
+        if self._depth:
+            self._depth += 1
+            try:
+                yield self
+            finally:
+                self._depth -= 1
+            return
+
+        self._depth = 1
+        try:
+            with self.conn:
+                yield self
+        finally:
+            self._depth = 0
+
+    def close(self) -> None:
+        self.conn.close()
+
+    # --- Meta -----------------------------------------------------------------
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    # --- Drills ---------------------------------------------------------------
+
+    def load_drills(self) -> DrillTable:
+        table = DrillTable()
+        for row in self.conn.execute("SELECT * FROM drill_state"):
+            table.add(row["key"], DrillState(*(row[k] for k in DRILL_FIELDS)))
+        return table
+
+    def put_drill(self, key: str, state: DrillState) -> None:
+        with self.transaction():
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO drill_state (key, {', '.join(DRILL_FIELDS)})"
+                f" VALUES (?{', ?' * len(DRILL_FIELDS)})",
+                (key, *(getattr(state, k) for k in DRILL_FIELDS)),
+            )
+
+    def delete_drill(self, key: str) -> None:
+        with self.transaction():
+            self.conn.execute("DELETE FROM drill_state WHERE key = ?", (key,))
+
+    # --- Categories -----------------------------------------------------------
+
+    def get_categories(self) -> Dict[str, Dict]:
+        rows = self.conn.execute("SELECT * FROM categories")
+        return {r["category"]: {"correct": r["correct"], "incorrect": r["incorrect"]} for r in rows}
+
+    def put_category(self, category: str, values: Dict) -> None:
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO categories (category, correct, incorrect) VALUES (?, ?, ?)",
+                (category, values.get("correct", 0), values.get("incorrect", 0)),
+            )
+
+    # --- Logs -----------------------------------------------------------------
+
+    def take_legacy_answers(self, write: Callable[[List[Dict]], None]) -> int:
+        """
+        Verplaats de oude answers_log rijen naar het event log: `write` moet ze
+        duurzaam wegschrijven (append + fsync), pas daarna worden ze in dezelfde
+        transactie verwijderd. Faalt `write`, dan blijven de rijen staan; bij een
+        crash daartussen worden ze bij de volgende start hooguit opnieuw geschreven.
+        Returns: aantal verplaatste antwoorden.
+        """
+        with self.transaction():
+            answers = [
+                _answer_from_row(r)
+                for r in self.conn.execute("SELECT * FROM answers_log ORDER BY id")
+            ]
+            if answers:
+                write(answers)
+                self.conn.execute("DELETE FROM answers_log")
+        return len(answers)
+
+    def add_session(self, entry: Dict) -> None:
+        with self.transaction():
+            cur = self.conn.execute(
+                "INSERT INTO sessions (date, file, score, total) VALUES (?, ?, ?, ?)",
+                (entry["date"], entry["file"], entry["score"], entry["total"]),
+            )
+            self.conn.execute(
+                "DELETE FROM sessions WHERE id <= ?", (cur.lastrowid - MAX_SESSIONS,)
+            )
+
+    # --- Rollups ----------------------------------------------------------------
+
+    def get_rollups(self) -> Dict[str, Dict]:
+        """Alle dag-buckets: day -> {correct, total, files: {...}, categories: {...}}."""
+        rollups: Dict[str, Dict] = {}
+        for r in self.conn.execute("SELECT * FROM rollups"):
+            bucket = rollups.setdefault(r["day"], _empty_bucket())
+            counts = {"correct": r["correct"], "total": r["total"]}
+            if r["kind"] == "day":
+                bucket.update(counts)
+            else:
+                bucket[ROLLUP_KINDS[r["kind"]]][r["key"]] = counts
+        return rollups
+
+    def put_rollup_day(self, day: str, bucket: Dict) -> None:
+        """Schrijf alle rollup rijen van één dag."""
+        rows = [(day, "day", "", bucket["correct"], bucket["total"])]
+        for kind, field in ROLLUP_KINDS.items():
+            rows += [(day, kind, key, v["correct"], v["total"]) for key, v in bucket[field].items()]
+        with self.transaction():
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rollups (day, kind, key, correct, total) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def replace_rollups(self, rollups: Dict[str, Dict]) -> None:
+        with self.transaction():
+            self.conn.execute("DELETE FROM rollups")
+            for day, bucket in rollups.items():
+                self.put_rollup_day(day, bucket)
+
+    # --- Achievements & stats -------------------------------------------------
+
+    def get_achievements(self) -> Dict[str, Dict]:
+        rows = self.conn.execute("SELECT * FROM achievements")
+        return {
+            r["achievement_id"]: {"unlocked_at": r["unlocked_at"], "seen": bool(r["seen"])}
+            for r in rows
+        }
+
+    def put_achievement(self, achievement_id: str, info: Dict) -> None:
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO achievements (achievement_id, unlocked_at, seen)"
+                " VALUES (?, ?, ?)",
+                (achievement_id, info.get("unlocked_at"), int(bool(info.get("seen")))),
+            )
+
+    def get_stats(self) -> Dict:
+        rows = self.conn.execute("SELECT key, value FROM stats")
+        return {r["key"]: json.loads(r["value"]) for r in rows}
+
+    def put_stats(self, stats: Dict) -> None:
+        with self.transaction():
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO stats (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v)) for k, v in stats.items()],
+            )
+
+    # --- Volledige dump (compatibiliteit met load_data/save_data) -------------
+
+    def load_all(self) -> Dict:
+        """
+        Bouw de user_data structuur op uit de tabellen.
+        "drills" is hier een DrillTable; DrillTable.to_dicts() geeft de oude dict vorm.
+        """
+        drills = self.load_drills()
+        sessions = [
+            {"date": r["date"], "file": r["file"], "score": r["score"], "total": r["total"]}
+            for r in self.conn.execute("SELECT * FROM sessions ORDER BY id")
+        ]
+        return {
+            "drills": drills,
+            "sessions": sessions,
+            "categories": self.get_categories(),
+            "rollups": self.get_rollups(),
+            "achievements": self.get_achievements(),
+            "stats": self.get_stats(),
+        }
+
+    def replace_all(self, data: Dict) -> None:
+        """
+        Vervang alle tabellen door de inhoud van een user_data dict.
+        "drills" is een dict in de (oude) dict vorm per drill.
+        Een eventuele answers_log lijst komt in de legacy tabel en wordt bij het
+        openen van de store naar het event log verplaatst.
+        """
+        with self.transaction():
+            for table in ("drill_state", "categories", "sessions", "answers_log", "achievements", "stats"):
+                self.conn.execute(f"DELETE FROM {table}")
+            for drill_id, drill in data.get("drills", {}).items():
+                self.put_drill(drill_id, DrillState.from_dict(drill_id, drill))
+            self.conn.executemany(
+                "INSERT INTO categories (category, correct, incorrect) VALUES (?, ?, ?)",
+                [(c, v.get("correct", 0), v.get("incorrect", 0))
+                 for c, v in data.get("categories", {}).items()],
+            )
+            self.conn.executemany(
+                "INSERT INTO sessions (date, file, score, total) VALUES (?, ?, ?, ?)",
+                [(s.get("date"), s.get("file"), s.get("score"), s.get("total"))
+                 for s in data.get("sessions", [])[-MAX_SESSIONS:]],
+            )
+            self.conn.executemany(
+                "INSERT INTO answers_log (date, correct, file, category) VALUES (?, ?, ?, ?)",
+                [(a.get("date"), int(bool(a.get("correct"))), a.get("file"), a.get("category"))
+                 for a in data.get("answers_log", [])],
+            )
+            for aid, info in data.get("achievements", {}).items():
+                self.put_achievement(aid, info)
+            self.put_stats(data.get("stats", {}))
+            if "rollups" in data:
+                self.replace_rollups(data["rollups"])
+
+    def migrate_json(self, json_path: Path) -> bool:
+        """
+        Eenmalige migratie van een bestaand user_data.json bestand.
+        Het JSON bestand wordt hernoemd naar *.json.migrated zodat het bewaard blijft.
+        Returns: True als er gemigreerd is.
+        """
+        json_path = Path(json_path)
+        if self.get_meta("json_migrated") or not json_path.exists():
+            return False
+
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            data = None
+
+        with self.transaction():
+            if data:
+                self.replace_all(data)
+            self.set_meta("json_migrated", str(json_path))
+
+        json_path.rename(json_path.with_suffix(json_path.suffix + ".migrated"))
+        return True
+
+
+def _empty_bucket() -> Dict:
+    return {"correct": 0, "total": 0, "files": {}, "categories": {}}
+
+
+def _answer_from_row(row: sqlite3.Row) -> Dict:
+    return {
+        "date": row["date"],
+        "correct": bool(row["correct"]),
+        "file": row["file"],
+        "category": row["category"],
+    }
@@ -0,0 +1,217 @@
+"""
+Tracker Store: procesbrede in-memory kopie van de leerdata.
+Leespaden raken de schijf niet meer; wijzigingen worden als 'dirty'
+gemarkeerd en in de achtergrond (write-behind) naar SQLite geschreven.
+Antwoorden gaan direct naar het append-only AnswerLog.
+"""
+
+import atexit
+import copy
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Dict, Optional, Set
+
+from src.drill_state import DrillTable
+from src.due_index import DueIndex
+from src.event_log import AnswerLog
+from src.metrics import timed
+from src.tracker_storage import TrackerDB, MAX_SESSIONS
+
+if TYPE_CHECKING:
+    from src.user_shards import ShardLock
+
+KEYED_TABLES = ("drills", "categories", "achievements", "rollups")
+
+
+class TrackerStore:
+    """
+    Houdt alle trackerdata in het geheugen en flusht wijzigingen periodiek.
+
+    Gebruik `lock` rond elke read-modify-write en meld gewijzigde rijen met
+    `touch()` of `append()`. `flush()` schrijft alleen de dirty rijen weg.
+    `data["drills"]` is een DrillTable; indexen werken met de geïnternde int IDs.
+    `due` (DueIndex), `file_drills` (bestand -> drill IDs) en `file_totals`
+    (bestand -> lopende correct/incorrect tellers) worden bij laden opgebouwd
+    en daarna incrementeel bijgehouden.
+    """
+
+    def __init__(self, db: TrackerDB, log: AnswerLog, empty: Dict, flush_interval: float = 5.0,
+                 file_lock: Optional["ShardLock"] = None):
+        self.db = db
+        self.log = log
+        self.file_lock = file_lock  # Vrijgegeven bij close()
+        self.flush_interval = flush_interval
+        self.lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.data = self._from_plain(empty, db.load_all())
+        self._build_indexes()
+        self._reset_dirty()
+
+        if flush_interval > 0:
+            self._thread = threading.Thread(
+                target=self._flush_loop, name="tracker-flush", daemon=True
+            )
+            self._thread.start()
+        atexit.register(self.close)
+
+    # --- Indexen ----------------------------------------------------------------
+
+    def _build_indexes(self) -> None:
+        drills = self.data["drills"]
+        self.due = DueIndex.build(drills)
+        self.file_drills: Dict[str, Set[int]] = {}
+        self.file_totals: Dict[str, Dict[str, int]] = {}
+        for idx, _, state in drills.items():
+            self.file_drills.setdefault(state.file, set()).add(idx)
+            totals = self.file_totals.setdefault(state.file, {"correct": 0, "incorrect": 0})
+            totals["correct"] += state.correct
+            totals["incorrect"] += state.incorrect
+
+    def index_result(self, idx: int, file: str, correct: bool) -> None:
+        """Werk de per-bestand index en tellers bij na een antwoord."""
+        with self.lock:
+            self.file_drills.setdefault(file, set()).add(idx)
+            totals = self.file_totals.setdefault(file, {"correct": 0, "incorrect": 0})
+            totals["correct" if correct else "incorrect"] += 1
+
+    # --- Dirty tracking -------------------------------------------------------
+
+    def _reset_dirty(self) -> None:
+        self._dirty = {table: set() for table in KEYED_TABLES}
+        self._dirty_stats = False
+        self._deleted_drills: Set[str] = set()
+        self._pending = {"sessions": []}
+        self._replace = False
+
+    @property
+    def dirty(self) -> bool:
+        with self.lock:
+            return (
+                self._replace or self._dirty_stats or self._deleted_drills
+                or any(self._dirty.values()) or any(self._pending.values())
+            )
+
+    def touch(self, table: str, key=None) -> None:
+        """Markeer een rij (of de stats) als gewijzigd; drills op int ID."""
+        with self.lock:
+            if table == "stats":
+                self._dirty_stats = True
+            else:
+                self._dirty[table].add(key)
+
+    def rekey_drill(self, idx: int, new_key: str) -> None:
+        """Geef een drill een nieuwe key; de oude rij wordt bij de flush verwijderd."""
+        with self.lock:
+            old_key = self.data["drills"].rekey(idx, new_key)
+            self._deleted_drills.add(old_key)
+            self._deleted_drills.discard(new_key)
+            self._dirty["drills"].add(idx)
+
+    def remove_drill(self, idx: int) -> None:
+        """Verwijder een drill uit de data en de indexen; de rij wordt bij de flush verwijderd."""
+        with self.lock:
+            key = self.data["drills"].remove(idx)
+            self._deleted_drills.add(key)
+            self._dirty["drills"].discard(idx)
+            self.due.remove(idx)
+            for members in self.file_drills.values():
+                members.discard(idx)
+
+    def append(self, table: str, entry: Dict) -> None:
+        """Voeg een entry toe aan een lijst-tabel (sessions)."""
+        with self.lock:
+            self.data[table].append(entry)
+            self._pending[table].append(entry)
+
+    def log_answer(self, event: Dict) -> None:
+        """Schrijf een antwoord-event direct naar het append-only log."""
+        self.log.append(event)
+
+    def replace(self, plain: Dict, empty: Dict) -> None:
+        """Vervang alle data (save_data compatibiliteit)."""
+        with self.lock:
+            self.data = self._from_plain(empty, copy.deepcopy(plain))
+            self._build_indexes()
+            self._reset_dirty()
+            self._replace = True
+
+    def snapshot(self) -> Dict:
+        """Diepe kopie als gewone dict met lijsten (load_data compatibiliteit)."""
+        with self.lock:
+            plain = {k: (list(v) if isinstance(v, deque) else v)
+                     for k, v in self.data.items() if k != "drills"}
+            plain = copy.deepcopy(plain)
+            plain["drills"] = self.data["drills"].to_dicts()
+            return plain
+
+    # --- Flushing -------------------------------------------------------------
+
+    @timed("tracker_store.flush")
+    def flush(self) -> None:
+        """Schrijf alle dirty rijen in één transactie naar de database."""
+        with self._flush_lock:
+            with self.lock:
+                if not self.dirty:
+                    return
+                replace = self._replace
+                drills = self.data["drills"]
+                rows = {
+                    table: {key: copy.deepcopy(self.data[table][key])
+                            for key in keys if key in self.data[table]}
+                    for table, keys in self._dirty.items() if table != "drills"
+                }
+                rows["drills"] = {drills.key_of(idx): drills.state(idx).copy()
+                                  for idx in self._dirty["drills"]}
+                deleted = self._deleted_drills
+                stats = dict(self.data["stats"]) if self._dirty_stats else None
+                pending = self._pending
+                full = self.snapshot() if replace else None
+                self._reset_dirty()
+
+            with self.db.transaction():
+                if full is not None:
+                    self.db.replace_all(full)
+                    return
+                for key in deleted:
+                    self.db.delete_drill(key)
+                for key, state in rows["drills"].items():
+                    self.db.put_drill(key, state)
+                for category, values in rows["categories"].items():
+                    self.db.put_category(category, values)
+                for aid, info in rows["achievements"].items():
+                    self.db.put_achievement(aid, info)
+                for day, bucket in rows["rollups"].items():
+                    self.db.put_rollup_day(day, bucket)
+                if stats is not None:
+                    self.db.put_stats(stats)
+                for entry in pending["sessions"]:
+                    self.db.add_session(entry)
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        """Stop de achtergrondthread en flush de laatste wijzigingen."""
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()
+        self.log.close()
+        if self.file_lock is not None:
+            self.file_lock.release()
+
+    @staticmethod
+    def _from_plain(empty: Dict, plain: Dict) -> Dict:
+        data = copy.deepcopy(empty)
+        stats = plain.pop("stats", None) or {}
+        plain.pop("answers_log", None)  # Staat in het AnswerLog
+        data.update({k: v for k, v in plain.items() if v})
+        data["stats"].update(stats)
+        if not isinstance(data["drills"], DrillTable):
+            data["drills"] = DrillTable.from_dicts(data["drills"])
+        data["sessions"] = deque(data.get("sessions", []), maxlen=MAX_SESSIONS)
+        return data
@@ -0,0 +1,159 @@
+"""
+User Shards: per gebruiker een eigen TrackerStore (eigen SQLite + answer log).
+Eén Streamlit server bedient zo meerdere leerlingen tegelijk zonder dat ze
+elkaars data overschrijven. Eén gedeelde writer-thread flusht alle shards;
+een OS file lock per shard voorkomt dat twee processen dezelfde shard openen.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+SAFE_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class ShardBusyError(RuntimeError):
+    """De shard is al geopend door een ander proces."""
+
+
+def shard_name(user: str) -> str:
+    """Bestandsveilige mapnaam voor een gebruiker (andere namen worden gehasht)."""
+    if SAFE_NAME.match(user):
+        return user.lower()
+    return "u-" + hashlib.blake2b(user.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ShardLock:
+    """
+    Exclusieve file lock voor de levensduur van een shard.
+    De in-memory store is de enige schrijver; een tweede proces op dezelfde
+    shard zou met verouderde data de wijzigingen van de eerste overschrijven.
+    """
+
+    def __init__(self, path: Path, timeout: float = 10.0):
+        self.path = Path(path)
+        self.timeout = timeout
+        self._handle = None
+
+    def acquire(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        handle = self.path.open("a+b")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                _lock(handle)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    handle.close()
+                    raise ShardBusyError(f"{self.path} is in gebruik door een ander proces")
+                time.sleep(0.1)
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()).encode("ascii"))
+        handle.flush()
+        self._handle = handle
+
+    def release(self) -> None:
+        if self._handle is None:
+            return
+        try:
+            _unlock(self._handle)
+        finally:
+            self._handle.close()
+            self._handle = None
+
+
+def _lock(handle) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(handle) -> None:
+    if fcntl is not None:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+    else:
+        handle.seek(0)
+        msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ShardRegistry:
+    """
+    Lazy geopende stores per gebruiker met één gedeelde flush-thread.
+
+    `open_store(user)` maakt de store (zonder eigen flush-thread) en wordt per
+    gebruiker precies één keer aangeroepen. Gebruikers met dezelfde shard
+    ('Alice' en 'alice') delen de store: de shard mag maar één keer open zijn.
+    """
+
+    def __init__(self, open_store: Callable, flush_interval: float = 5.0):
+        self._open_store = open_store
+        self.flush_interval = flush_interval
+        self._stores: Dict[Optional[str], object] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _key(user: Optional[str]) -> Optional[str]:
+        return None if user is None else shard_name(user)
+
+    def get(self, user: Optional[str]):
+        key = self._key(user)
+        store = self._stores.get(key)
+        if store is None:
+            with self._lock:
+                store = self._stores.get(key)
+                if store is None:
+                    store = self._open_store(user)
+                    self._stores[key] = store
+                    self._start_writer()
+        return store
+
+    def stores(self) -> List:
+        with self._lock:
+            return list(self._stores.values())
+
+    def _start_writer(self) -> None:
+        if self._thread is None and self.flush_interval > 0:
+            self._thread = threading.Thread(
+                target=self._flush_loop, name="tracker-writer", daemon=True
+            )
+            self._thread.start()
+
+    def flush(self) -> None:
+        for store in self.stores():
+            store.flush()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self, user: Optional[str]) -> None:
+        """Flush en sluit één shard (bijv. na uitloggen)."""
+        with self._lock:
+            store = self._stores.pop(self._key(user), None)
+        if store is not None:
+            store.close()
+
+    def close_all(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        with self._lock:
+            stores, self._stores = list(self._stores.values()), {}
+        for store in stores:
+            store.close()
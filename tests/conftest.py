@@ -0,0 +1,33 @@
+import pytest
+
+import src.drill_links as drill_links
+import src.learning_tracker as lt
+import src.parser as parser
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    """Learning tracker (en drill links) met alle opslag in een tijdelijke map."""
+    monkeypatch.setattr(lt, "DATA_FILE", tmp_path / "user_data.json")
+    monkeypatch.setattr(lt, "DB_FILE", tmp_path / "user_data.sqlite")
+    monkeypatch.setattr(lt, "LOG_DIR", tmp_path / "logs")
+    monkeypatch.setattr(lt, "USERS_DIR", tmp_path / "users")
+    monkeypatch.setattr(lt, "FLUSH_INTERVAL", 0)
+    monkeypatch.setattr(lt, "_registry", None)
+    monkeypatch.setattr(drill_links, "LINKS_FILE", tmp_path / "drill_links.sqlite")
+    monkeypatch.setattr(drill_links, "_links", None)
+    lt.set_user(None)
+    yield lt
+    if lt._registry is not None:
+        lt._registry.close_all()
+    if drill_links._links is not None:
+        drill_links._links.close()
+    lt.set_user(None)
+
+
+@pytest.fixture
+def parse_cache(tmp_path, monkeypatch):
+    """Lege parse cache in een tijdelijke map."""
+    monkeypatch.setattr(parser, "_cache", parser.ParseCache(tmp_path / "parse_cache.sqlite"))
+    yield parser._cache
+    parser._cache.close()
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+from src.achievements import ACHIEVEMENTS, RULES, AchievementEngine, Condition, Threshold
+
+RULE_SET = [
+    Threshold("eerste", "total_correct", 1),
+    Threshold("tien", "total_correct", 10),
+    Threshold("reeks", "current_streak", 3),
+    Condition("nacht", ("hour",), lambda c: c["hour"] < 5),
+    Condition("comeback", ("current_streak", "session_incorrect"),
+              lambda c: c["current_streak"] >= 2 and c["session_incorrect"] >= 2),
+]
+
+
+def _counters(**values):
+    return {"total_correct": 0, "current_streak": 0, "session_incorrect": 0, **values}
+
+
+def test_every_rule_has_metadata():
+    assert {rule.achievement_id for rule in RULES} <= set(ACHIEVEMENTS)
+
+
+def test_thresholds_unlock_once_in_rule_order():
+    engine = AchievementEngine(RULE_SET)
+    assert engine.evaluate(_counters(total_correct=0), ["total_correct"]) == []
+    assert engine.evaluate(_counters(total_correct=12), ["total_correct"]) == ["eerste", "tien"]
+    assert engine.evaluate(_counters(total_correct=13), ["total_correct"]) == []
+    assert "tien" not in engine.pending
+
+
+def test_only_changed_counters_are_checked():
+    engine = AchievementEngine(RULE_SET)
+    assert engine.evaluate(_counters(current_streak=5), ["total_correct"]) == []
+    assert engine.evaluate(_counters(current_streak=5), ["current_streak"]) == ["reeks"]
+
+
+def test_conditions():
+    engine = AchievementEngine(RULE_SET)
+    assert engine.evaluate({**_counters(), "hour": 14}, ["hour"]) == []
+    assert engine.evaluate({**_counters(), "hour": 3}, ["hour"]) == ["nacht"]
+    counters = _counters(current_streak=2, session_incorrect=2)
+    assert engine.evaluate(counters, ["current_streak"]) == ["comeback"]
+
+
+def test_unlocked_rules_are_skipped():
+    engine = AchievementEngine(RULE_SET, unlocked={"eerste", "nacht"})
+    assert engine.pending == {"tien", "reeks", "comeback"}
+    assert engine.evaluate({**_counters(total_correct=1), "hour": 1}, ["total_correct", "hour"]) == []
+
+
+def test_catch_up_unlocks_rules_whose_threshold_is_already_met():
+    engine = AchievementEngine(RULE_SET, unlocked={"eerste"})
+    # Geen 'hour' in de opgeslagen stats: tijdregels wachten op een echt antwoord
+    assert engine.catch_up(_counters(total_correct=50, current_streak=1)) == ["tien"]
+    assert engine.catch_up(_counters(total_correct=50, current_streak=1)) == []
+    assert "nacht" in engine.pending
+
+
+def test_achievements_persist_and_new_rules_catch_up(tracker):
+    morning = datetime(2024, 3, 1, 10, 0)
+    assert tracker.record_event("a.md", "Vraag?", "Zon", True, ts=morning) == ["first_blood"]
+    assert tracker.record_event("a.md", "Vraag?", "Zon", True, ts=morning) == []
+    tracker._registry.close_all()
+    tracker._registry = None
+
+    store = tracker.get_store()
+    assert "first_blood" in tracker.get_achievements()
+    assert "first_blood" not in store.achievement_engine.pending
+    assert tracker.get_stats()["total_correct"] == 2
+
+    # Stats van vóór een nieuwe regel (bijv. centurion): bij het laden meteen behaald
+    with store.lock:
+        store.data["stats"]["total_correct"] = 150
+        assert tracker._attach_achievements(store) == ["centurion"]
+    assert tracker.get_achievements()["centurion"]["seen"] is False
@@ -0,0 +1,75 @@
+import pytest
+
+from src.answer_match import check_answer, compile_answer, edit_distance, parse_number
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("9,5", (9.5, 0.05)),
+    ("13.8", (13.8, 0.05)),
+    ("300.000", (300000.0, 0.5)),
+    ("1.234,5", (1234.5, 0.05)),
+    ("-273", (-273.0, 0.5)),
+    ("1947", (1947.0, 0.5)),
+])
+def test_parse_number(raw, expected):
+    value, tolerance = parse_number(raw)
+    assert value == pytest.approx(expected[0])
+    assert tolerance == pytest.approx(expected[1])
+
+
+@pytest.mark.parametrize("given, answer", [
+    ("Parijs", "Parijs"),
+    ("parijs", "Parijs"),
+    ("Paris", "Parijs/Paris"),
+    ("de Melkweg", "Melkweg"),
+    ("Proxima Centaury", "Proxima Centauri"),  # typefout
+    ("Jozef Stalin", "Jozef Stalin (Sovjet-Unie)"),
+    ("13.8", "13,8"),
+    ("13,8 miljard", "13,8"),
+    ("9,5", "9,5 biljoen"),
+    ("300,000", "300.000"),
+    ("300000", "300.000"),
+    ("blauw, rood en groen", "rood, groen, blauw"),
+    ("Ca", "Ca; calcium"),
+    ("", ""),
+])
+def test_correct(given, answer):
+    assert check_answer(given, answer).correct
+
+
+@pytest.mark.parametrize("given, answer", [
+    ("1948", "1947"),
+    ("13,9", "13,8"),
+    ("Londen", "Parijs"),
+    ("Mars", "Maan"),  # korte woorden moeten exact
+    ("9,5 kilo biljoen", "9,5"),
+    ("", "Parijs"),
+    ("Parijs", ""),
+    ("rood, groen", "rood, groen, blauw"),
+])
+def test_wrong(given, answer):
+    assert not check_answer(given, answer).correct
+
+
+def test_verdict_names_the_matching_form():
+    verdict = check_answer("Paris", "Parijs/Paris")
+    assert verdict.score == 100
+    assert verdict.expected == "Paris"
+    typo = check_answer("Proxima Centaury", "Proxima Centauri")
+    assert 0 < typo.score < 100
+
+
+def test_empty_answer_has_no_forms():
+    assert compile_answer("").forms == []
+    assert compile_answer("  ").forms == []
+
+
+@pytest.mark.parametrize("a, b, limit, expected", [
+    ("kitten", "sitting", 3, 3),
+    ("kitten", "sitting", 2, None),
+    ("abc", "abc", 0, 0),
+    ("", "abc", 3, 3),
+    ("centauri", "centaury", 1, 1),
+])
+def test_edit_distance(a, b, limit, expected):
+    assert edit_distance(a, b, limit) == expected
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import src.compiled_deck as compiled_deck
+from src.compiled_deck import open_compiled
+from src.parser import parse_text
+
+DECK = """## Zon
+Uitleg over de zon.
+- Hoeveel miljoen km staat de aarde van de zon?:150
+- Welke kleur heeft de zon?:Geel
+## Maan
+- Hoeveel dagen duurt een maancyclus?:29,5
+"""
+
+
+@pytest.fixture
+def source(tmp_path, parse_cache, monkeypatch):
+    monkeypatch.setattr(compiled_deck, "_open", {})
+    path = tmp_path / "sterren.txt"
+    path.write_text(DECK, encoding="utf-8")
+    return path
+
+
+def test_compiled_deck_matches_the_parser(source, tmp_path):
+    deck = open_compiled(source, tmp_path / "compiled")
+    expected = parse_text(source.name, DECK)
+    assert list(deck.drills) == expected["drills"]
+    assert dict(deck.context) == expected["context"]
+    assert [d["answer"] for d in deck.drills.for_category("Maan")] == ["29,5"]
+    assert open_compiled(source, tmp_path / "compiled") is deck
+
+
+def _touch(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_stale_deck_is_recompiled_and_stays_readable_for_its_holders(source, tmp_path):
+    session_a = open_compiled(source, tmp_path / "compiled").as_deck()
+    session_b = open_compiled(source, tmp_path / "compiled").as_deck()
+    assert session_a["drills"] is session_b["drills"]
+
+    _touch(source)  # Alleen mtime: geen diff van de watcher, sessie A laadt niet opnieuw
+    reopened = open_compiled(source, tmp_path / "compiled")
+    assert reopened.as_deck()["drills"] is not session_a["drills"]
+    assert session_a["drills"][0]["answer"] == "150"
+    assert session_b["context"]["Zon"] == "Uitleg over de zon."
+
+    source.write_text(DECK.replace(":Geel", ":Wit"), encoding="utf-8")
+    _touch(source)
+    new = open_compiled(source, tmp_path / "compiled")
+    assert new.drills[1]["answer"] == "Wit"
+    assert session_a["drills"][1]["answer"] == "Geel"
@@ -0,0 +1,58 @@
+import os
+
+from src.deck_watcher import DeckWatcher, SectionedDeck, split_sections
+
+DECK = """## Zon
+Uitleg over de zon.
+- Hoeveel miljoen km staat de aarde van de zon?:150
+- Welke kleur heeft de zon?:Geel
+
+## Maan
+- Hoeveel dagen duurt een maancyclus?:29,5
+"""
+
+
+def _write(path, text):
+    path.write_text(text, encoding="utf-8")
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))  # andere mtime ook binnen 1 tick
+
+
+def test_split_sections():
+    assert split_sections(DECK) == [DECK[:DECK.index("## Maan")], DECK[DECK.index("## Maan"):]]
+
+
+def test_update_reparses_only_changed_sections():
+    deck = SectionedDeck("sterren.txt")
+    deck.update(DECK)
+    diff = deck.update(DECK.replace(":29,5", ":29,53"))
+    assert diff.sections_parsed == 1
+    assert [(old["answer"], new["answer"]) for old, new in diff.changed] == [("29,5", "29,53")]
+    assert not diff.added and not diff.removed
+    assert all(isinstance(section[0], bytes) for section in deck.sections)  # geen sectietekst bewaard
+
+
+def test_first_scan_uses_the_parse_cache_and_later_changes_diff_against_it(tmp_path, parse_cache):
+    path = tmp_path / "sterren.txt"
+    _write(path, DECK)
+    parse_cache.load(path)
+
+    watcher = DeckWatcher(tmp_path)
+    assert watcher.poll() == []
+    sectioned = watcher.decks["sterren.txt"]
+    assert sectioned.result is parse_cache.lookup(path)
+    assert [section[0] for section in sectioned.sections] == [None]  # nog niets in secties geparsed
+
+    _write(path, DECK.replace("Welke kleur heeft de zon?:Geel", "Welke kleur heeft onze zon?:Geel")
+           + "- Hoe heet de maan van de aarde?:Maan\n")
+    diff, = watcher.poll()
+    assert [(old["question"], new["question"]) for old, new in diff.renamed] == [
+        ("Welke kleur heeft de zon?", "Welke kleur heeft onze zon?")]
+    assert [d["question"] for d in diff.added] == ["Hoe heet de maan van de aarde?"]
+    assert not diff.changed and not diff.removed
+    assert len(watcher.deck("sterren.txt")["drills"]) == 4
+
+    _write(path, DECK)
+    diff, = watcher.poll()
+    assert diff.sections_parsed == 2
+    assert [d["question"] for d in diff.removed] == ["Hoe heet de maan van de aarde?"]
@@ -0,0 +1,42 @@
+import random
+
+from src.distractors import DistractorIndex, classify
+
+
+def _drill(answer, category="Sterren", file="deck.md"):
+    return {"file": file, "category": category, "question": f"Vraag {answer}?", "answer": answer}
+
+
+def test_classify():
+    assert classify("1947")[0].kind == "year"
+    kind, value = classify("13,8 miljard")
+    assert (kind.kind, kind.unit, value) == ("number", "miljard", 13.8)
+    assert classify("rood, groen en blauw")[0].kind == "list"
+    assert classify("Parijs")[0].proper
+    assert classify("")[0].kind == "text"
+    assert classify("   ")[1] is None
+
+
+def test_pick_skips_empty_answers_and_the_correct_one():
+    drills = [_drill(a) for a in ("Parijs", "Berlijn", "", "Madrid", "Rome", "  ")]
+    index = DistractorIndex(drills)
+    options = index.pick(drills[0], rng=random.Random(1))
+    assert len(options) == 3
+    assert "Parijs" not in options
+    assert all(option.strip() for option in options)
+    # Drill zonder antwoord geeft geen fout
+    assert all(option.strip() for option in index.pick(drills[2], rng=random.Random(1)))
+
+
+def test_pick_numbers_same_unit_then_invented():
+    drills = [_drill("13,8 miljard"), _drill("4,6 miljard"), _drill("300 km")]
+    options = DistractorIndex(drills).pick(drills[0], rng=random.Random(2))
+    assert len(options) == 3
+    assert "4,6 miljard" in options
+    assert all(option.endswith("miljard") for option in options)
+
+
+def test_category_falls_back_to_deck():
+    drills = [_drill("Parijs"), _drill("Berlijn", category="Anders"), _drill("Rome", category="Anders")]
+    options = DistractorIndex(drills).pick(drills[0], k=2, rng=random.Random(3))
+    assert sorted(options) == ["Berlijn", "Rome"]
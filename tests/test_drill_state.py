@@ -0,0 +1,37 @@
+from src.drill_state import DrillState, DrillTable, drill_hash, legacy_drill_id
+
+
+def _state():
+    return DrillState("a.md", "Zon", "vraag")
+
+
+def test_legacy_keys_are_counted_through_add_rekey_and_remove():
+    table = DrillTable()
+    table.add(drill_hash("a.md", "vraag 1"), _state())
+    assert not table.has_legacy_keys()
+    old = table.add(legacy_drill_id("a.md", "vraag 2"), _state())
+    other = table.add(legacy_drill_id("a.md", "vraag 3"), _state())
+    assert table.has_legacy_keys()
+    table.rekey(old, drill_hash("a.md", "vraag 2"))
+    assert table.has_legacy_keys()
+    table.remove(other)
+    assert not table.has_legacy_keys()
+    assert len(table) == 2
+
+
+def test_from_dicts_counts_legacy_keys():
+    table = DrillTable.from_dicts({legacy_drill_id("a.md", "vraag"): {"correct": 1}})
+    assert table.has_legacy_keys()
+    idx = table.id_of(legacy_drill_id("a.md", "vraag"))
+    assert table.rekey(idx, drill_hash("a.md", "vraag")) == legacy_drill_id("a.md", "vraag")
+    assert not table.has_legacy_keys()
+    assert table.get(drill_hash("a.md", "vraag")).correct == 1
+
+
+def test_removed_slots_are_skipped():
+    table = DrillTable()
+    first = table.add("a", _state())
+    table.add("b", _state())
+    table.remove(first)
+    assert [key for _, key, _ in table.items()] == ["b"]
+    assert "a" not in table and table.id_of("b") == 1
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from src.drill_state import DrillState, DrillTable
+from src.due_index import MAX_DUE_DAYS, SECONDS_PER_DAY, DueIndex, from_seconds, to_seconds
+
+
+def _table(*dues):
+    table = DrillTable()
+    for i, (file, due) in enumerate(dues):
+        table.add(f"drill{i}", DrillState(file, "cat", f"vraag {i}", due=due))
+    return table
+
+
+def test_build_and_queries():
+    index = DueIndex.build(_table(("a.md", 30.0), ("b.md", 10.0), ("a.md", 20.0), ("a.md", None)))
+    assert len(index) == 3
+    assert index.next_due() == (10.0, 1)
+    assert index.next_due("a.md") == (20.0, 2)
+    assert index.count_due(20.0) == 2
+    assert index.count_due(25.0, "a.md") == 1
+    assert index.due_ids(100.0) == [1, 2, 0]
+    assert index.due_ids(100.0, "a.md", limit=1) == [2]
+    assert index.next_due("c.md") is None
+
+
+def test_update_moves_between_files_and_remove():
+    index = DueIndex.build(_table(("a.md", 30.0), ("b.md", 10.0)))
+    index.update(0, "b.md", 5.0)
+    assert index.next_due("a.md") is None
+    assert index.due_ids(100.0, "b.md") == [0, 1]
+    index.remove(1)
+    index.remove(1)  # twee keer verwijderen mag
+    assert index.due_ids(100.0) == [0]
+    assert len(index) == 1
+
+
+def test_old_records_with_huge_intervals_do_not_overflow():
+    last_seen = to_seconds(datetime(2024, 1, 1))
+    state = DrillState.from_dict("a.md::vraag", {"last_seen": "2024-01-01T00:00:00", "interval": 10 ** 9})
+    assert state.due == last_seen + MAX_DUE_DAYS * SECONDS_PER_DAY
+    assert from_seconds(state.due).year == 2123
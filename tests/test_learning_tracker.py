@@ -0,0 +1,173 @@
+import threading
+from datetime import datetime, timedelta
+
+import src.learning_tracker as tracker_module
+from src.dedup import link_duplicates
+from src.drill_state import DrillState, legacy_drill_id
+from src.tracker_storage import TrackerDB
+
+QUESTION = "Hoe ver staat de zon gemiddeld van de aarde af, in miljoen kilometer?"
+
+
+def _reopen(tracker):
+    """Sluit alle shards (flusht) en open de store opnieuw vanaf schijf."""
+    tracker._registry.close_all()
+    tracker._registry = None
+    return tracker.get_store()
+
+
+def _drill(file):
+    return {"file": file, "question": QUESTION, "answer": "150", "category": "Zon"}
+
+
+def test_linking_merges_existing_alias_state(tracker):
+    tracker.record_answer("a.md", QUESTION, "Zon", True)
+    tracker.record_answer("b.md", QUESTION, "Zon", False)
+    tracker.record_answer("b.md", QUESTION, "Zon", True)
+    groups = link_duplicates([_drill("a.md"), _drill("b.md")])
+    assert groups and len(groups[0][0]) == 2
+
+    store = tracker.get_store()
+    drills = store.data["drills"]
+    assert len(drills) == 1
+    (idx, key, state), = drills.items()
+    assert key == tracker.get_drill_id("a.md", QUESTION)
+    assert (state.correct, state.incorrect) == (2, 1)
+    assert idx in store.file_drills["b.md"]
+    assert len(store.due) == 1
+
+
+def test_answers_to_a_linked_drill_count_for_their_own_file(tracker):
+    link_duplicates([_drill("a.md"), _drill("b.md")])
+    tracker.record_answer("a.md", QUESTION, "Zon", True)
+    tracker.record_answer("b.md", QUESTION, "Zon", False)
+
+    assert len(tracker.get_store().data["drills"]) == 1
+    assert tracker.get_file_stats("a.md")["correct"] == 1
+    assert tracker.get_file_stats("b.md")["incorrect"] == 1
+    assert tracker.get_file_stats("b.md")["correct"] == 0
+    assert tracker.get_drill_stats_for_file("b.md")
+    # Laatst geoefend in b.md: daar staat hij nu in de due-index
+    assert tracker.get_store().due.next_due("b.md") is not None
+    assert tracker.get_store().due.next_due("a.md") is None
+
+
+def test_merged_drill_survives_a_flush(tracker):
+    tracker.record_answer("a.md", QUESTION, "Zon", True)
+    tracker.record_answer("b.md", QUESTION, "Zon", True)
+    link_duplicates([_drill("a.md"), _drill("b.md")])
+    tracker.flush()
+    assert list(tracker.get_store().db.load_drills().to_dicts()) == [tracker.get_drill_id("a.md", QUESTION)]
+
+
+class _CompiledDrills(list):
+    """Zoals CompiledDrills: drills met vooraf berekende drill ID's."""
+
+    def drill_ids(self):
+        return [tracker_module.get_drill_id(d["file"], d["question"]) for d in self]
+
+
+def test_compute_weights_migrates_legacy_keys_for_compiled_decks(tracker):
+    store = tracker.get_store()
+    with store.lock:
+        store.data["drills"].add(legacy_drill_id("a.md", QUESTION),
+                                 DrillState("a.md", "Zon", QUESTION[:50], correct=10, incorrect=0))
+    drills = _CompiledDrills([_drill("a.md"), {**_drill("a.md"), "question": "Andere vraag?"}])
+
+    weights = tracker.compute_weights("a.md", drills)
+    assert weights[0] < weights[1]  # goed gekend vs. nooit gezien
+    assert store.data["drills"].id_of(tracker.get_drill_id("a.md", QUESTION)) is not None
+    assert not store.data["drills"].has_legacy_keys()
+
+
+def test_get_stats_waits_for_the_store_lock(tracker):
+    store = tracker.get_store()
+    result = []
+    with store.lock:
+        reader = threading.Thread(target=lambda: result.append(tracker.get_stats()))
+        reader.start()
+        reader.join(0.05)
+        assert reader.is_alive()  # Leest niet terwijl een schrijver bezig is
+        store.data["stats"]["total_correct"] = 7
+    reader.join()
+    assert result[0]["total_correct"] == 7
+
+
+def test_daily_rollups_per_file_and_category(tracker):
+    today = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    tracker.record_event("a.md", "Vraag 1?", "Zon", True, ts=yesterday)
+    tracker.record_event("a.md", "Vraag 2?", "Maan", False, ts=yesterday)
+    tracker.record_event("b.md", "Vraag 3?", "Zon", True, ts=today)
+    tracker.record_event("a.md", "Vraag 1?", "Zon", True, ts=today - timedelta(days=40))
+
+    days = [yesterday.date().isoformat(), today.date().isoformat()]
+    assert tracker.get_progress_data() == [
+        {"date": days[0], "score": 1, "total": 2, "percentage": 50.0},
+        {"date": days[1], "score": 1, "total": 1, "percentage": 100.0},
+    ]
+    assert [(p["date"], p["total"]) for p in tracker.get_progress_data(file="a.md")] == [(days[0], 2)]
+    assert [(p["date"], p["score"]) for p in tracker.get_progress_data(category="Zon")] == [(days[0], 1), (days[1], 1)]
+    assert tracker.get_progress_data(category="Maan", days=0) == []
+    assert len(tracker.get_progress_data(days=60)) == 3
+
+    # Rollups worden samen met de rest geflusht en weer ingelezen
+    expected = tracker.get_progress_data(days=60)
+    _reopen(tracker)
+    assert tracker.get_progress_data(days=60) == expected
+
+
+def test_rollups_are_rebuilt_from_the_answer_log(tracker):
+    today = datetime.now()
+    tracker.record_event("a.md", "Vraag 1?", "Zon", True, ts=today - timedelta(days=2))
+    tracker.record_event("a.md", "Vraag 2?", "Maan", False, ts=today)
+    expected = tracker.get_progress_data(file="a.md")
+    tracker._registry.close_all()
+    tracker._registry = None
+
+    # Zoals een database van vóór de rollups: alleen het antwoordlog is er
+    db = TrackerDB(tracker.DB_FILE)
+    with db.transaction():
+        db.conn.execute("DELETE FROM rollups")
+        db.conn.execute("DELETE FROM meta WHERE key = 'rollups_built'")
+    db.close()
+
+    assert tracker.get_progress_data(file="a.md") == expected
+    assert [p["total"] for p in tracker.get_progress_data(category="Maan")] == [1]
+
+
+def test_per_file_totals_and_due_index(tracker):
+    now = datetime.now()
+    tracker.record_event("a.md", "Vraag 1?", "Zon", True, ts=now - timedelta(days=20))
+    tracker.record_event("a.md", "Vraag 1?", "Zon", False, ts=now - timedelta(days=10))
+    tracker.record_event("a.md", "Vraag 2?", "Zon", True, ts=now - timedelta(days=10))
+    tracker.record_event("b.md", "Vraag 3?", "Maan", True, ts=now)
+
+    assert tracker.get_file_stats("a.md") == {"correct": 2, "incorrect": 1, "total": 3, "percentage": 66.7}
+    assert tracker.get_file_stats("c.md") == {"correct": 0, "incorrect": 0, "total": 0, "percentage": 0}
+    stats = tracker.get_drill_stats_for_file("a.md")
+    assert set(stats) == {"Vraag 1?", "Vraag 2?"}
+    assert (stats["Vraag 1?"]["total"], stats["Vraag 1?"]["difficulty"]) == (2, "Medium")
+
+    assert tracker.count_due("a.md") == 2
+    assert tracker.count_due("b.md") == 0
+    assert tracker.count_due() == 2
+    assert tracker.get_next_due("a.md")[0] == tracker.get_drill_id("a.md", "Vraag 1?")
+    assert tracker.get_next_due("b.md")[1] > now
+    assert tracker.get_due_drill_ids("a.md", limit=1) == [tracker.get_drill_id("a.md", "Vraag 1?")]
+
+    # De indexen worden bij het laden opnieuw opgebouwd uit de drills
+    _reopen(tracker)
+    assert tracker.get_file_stats("a.md")["total"] == 3
+    assert set(tracker.get_drill_stats_for_file("b.md")) == {"Vraag 3?"}
+    assert tracker.count_due("a.md") == 2
+
+
+def test_removed_drill_leaves_the_file_index(tracker):
+    tracker.record_answer("a.md", "Vraag 1?", "Zon", True)
+    tracker.record_answer("a.md", "Vraag 2?", "Zon", True)
+    store = tracker.get_store()
+    idx = store.data["drills"].id_of(tracker.get_drill_id("a.md", "Vraag 1?"))
+    store.remove_drill(idx)
+    assert set(tracker.get_drill_stats_for_file("a.md")) == {"Vraag 2?"}
+    assert tracker.get_next_due("a.md")[0] == tracker.get_drill_id("a.md", "Vraag 2?")
@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+import src.llm_cache as llm_cache
+from src.llm_cache import GenerationCache, cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Bestuurbare time.time() voor TTL en LRU."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = GenerationCache(tmp_path / "llm_cache.sqlite", max_entries=3, ttl=100)
+    yield cache
+    cache.close()
+
+
+def test_cache_key_depends_on_everything():
+    base = cache_key("model", "prompt", "system", {"temperature": 0.5})
+    assert base == cache_key("model", "prompt", "system", {"temperature": 0.5})
+    assert len({base, cache_key("ander", "prompt", "system", {"temperature": 0.5}),
+                cache_key("model", "prompt", "", {"temperature": 0.5}),
+                cache_key("model", "prompt", "system", {"temperature": 0.7})}) == 4
+
+
+def test_hit_miss_and_stats(cache):
+    assert cache.get("k") is None
+    cache.put("k", "antwoord", latency=2.5)
+    assert cache.get("k") == "antwoord"
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["saved_seconds"]) == (1, 1, 2.5)
+    assert stats["hit_rate"] == 0.5
+    assert stats["entries"] == 1 and stats["bytes"] == len("antwoord")
+
+
+def test_ttl_expiry(cache, clock):
+    cache.put("k", "oud")
+    clock[0] += 101
+    assert cache.get("k") is None
+    cache.put("k", "nieuw")
+    assert cache.get("k") == "nieuw"
+    assert cache.stats()["entries"] == 1
+
+
+def test_variants_rotate(cache, clock):
+    assert cache.get("k", variants=2) is None
+    cache.put("k", "een", variants=2)
+    assert cache.get("k", variants=2) is None  # nog te weinig varianten: opnieuw genereren
+    clock[0] += 1
+    cache.put("k", "twee", variants=2)
+    seen = {cache.get("k", variants=2, rng=random.Random(seed)) for seed in range(20)}
+    assert seen == {"een", "twee"}
+    clock[0] += 1
+    cache.put("k", "drie", variants=2)  # vervangt de oudste
+    seen = {cache.get("k", variants=2, rng=random.Random(seed)) for seed in range(20)}
+    assert seen == {"twee", "drie"}
+
+
+def test_lru_eviction_uses_lookups_that_are_not_saved_yet(cache, clock):
+    for name in ("a", "b", "c"):
+        clock[0] += 1
+        cache.put(name, name)
+    clock[0] += 1
+    assert cache.get("a") == "a"  # a is nu recent gebruikt, b het minst recent
+    clock[0] += 1
+    cache.put("d", "d")
+    assert cache.get("b") is None
+    assert [cache.get(name) for name in ("a", "c", "d")] == ["a", "c", "d"]
+
+
+def test_lookups_do_not_write_until_saved(tmp_path, clock, monkeypatch):
+    path = tmp_path / "llm_cache.sqlite"
+    cache = GenerationCache(path)
+    cache.put("k", "antwoord", latency=1.0)
+    statements = []
+    cache.conn.set_trace_callback(statements.append)
+    for _ in range(5):
+        cache.get("k")
+    cache.get("onbekend")
+    assert not [s for s in statements if s.lstrip().upper().startswith(("UPDATE", "INSERT", "DELETE"))]
+    cache.conn.set_trace_callback(None)
+    cache.close()
+    cache.close()  # twee keer sluiten (ook via atexit) mag
+
+    reopened = GenerationCache(path)
+    stats = reopened.stats()
+    assert (stats["hits"], stats["misses"], stats["saved_seconds"]) == (5, 1, 5.0)
+    reopened.close()
+
+
+def test_stats_are_saved_periodically(tmp_path, clock, monkeypatch):
+    cache = GenerationCache(tmp_path / "llm_cache.sqlite")
+    monkeypatch.setattr(llm_cache, "STATS_SAVE_SECONDS", 0.0)
+    cache.get("k")
+    row = cache.conn.execute("SELECT value FROM stats WHERE name = 'misses'").fetchone()
+    assert row == (1.0,)
+    cache.close()
@@ -0,0 +1,154 @@
+import os
+import time
+
+import pytest
+
+import src.parser as parser
+from src.parser import CONTEXT, DRILL, ParseCache, iter_parse, parse_file, parse_text
+
+DECK = """## Zon
+Uitleg over de zon.
+- Welke kleur heeft de zon?:Geel
+## Maan
+- Hoeveel dagen duurt een maancyclus?:29,5
+"""
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Telt hoe vaak de cache echt parset."""
+    calls = []
+    parse_text = parser.parse_text
+
+    def counting(filename, text):
+        calls.append(filename)
+        return parse_text(filename, text)
+
+    monkeypatch.setattr(parser, "parse_text", counting)
+    return calls
+
+
+def _collect(events):
+    """Bouw een parse_file resultaat op uit iter_parse events."""
+    drills, blocks = [], {}
+    for event in events:
+        if event[0] == DRILL:
+            drills.append(event[1])
+        else:
+            blocks.setdefault(event[1], []).append(event[2])
+    return drills, {category: " ".join(parts) for category, parts in blocks.items()}
+
+
+def _write(path, text, mtime_ns=None):
+    """Schrijf `text`; standaard met een mtime ruim voor nu (niet 'racy')."""
+    path.write_text(text, encoding="utf-8")
+    if mtime_ns is None:
+        mtime_ns = time.time_ns() - 60 * 10 ** 9
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return mtime_ns
+
+
+def test_unchanged_file_is_served_without_reading_it(tmp_path, parse_cache, parses):
+    path = tmp_path / "sterren.txt"
+    mtime_ns = _write(path, DECK)
+    assert parse_cache.load(path) == parse_file(path)
+    assert parses == ["sterren.txt"]
+
+    # Zelfde grootte en mtime: ook een nieuwe cache (herstart) leest het bestand niet
+    _write(path, DECK.replace("Geel", "Rood"), mtime_ns)
+    reopened = ParseCache(parse_cache.path)
+    assert reopened.lookup(path)["drills"][0]["answer"] == "Geel"
+    reopened.close()
+    assert parses == ["sterren.txt"]
+
+
+def test_size_change_reparses(tmp_path, parse_cache, parses):
+    path = tmp_path / "sterren.txt"
+    mtime_ns = _write(path, DECK)
+    parse_cache.load(path)
+    _write(path, DECK.replace("Geel", "Geelwit"), mtime_ns)
+    assert parse_cache.lookup(path) is None
+    assert parse_cache.load(path)["drills"][0]["answer"] == "Geelwit"
+    assert len(parses) == 2
+
+
+def test_touched_file_with_the_same_content_reuses_the_cached_result(tmp_path, parse_cache, parses):
+    path = tmp_path / "sterren.txt"
+    mtime_ns = _write(path, DECK)
+    first = parse_cache.load(path)
+    _write(path, DECK, mtime_ns + 10 ** 9)
+    assert parse_cache.lookup(path) is None
+    assert parse_cache.load(path) == first
+    assert len(parses) == 1
+    assert parse_cache.lookup(path) == first  # nieuwe mtime is opgeslagen
+
+
+def test_mtime_and_digest_change_reparses(tmp_path, parse_cache, parses):
+    path = tmp_path / "sterren.txt"
+    mtime_ns = _write(path, DECK)
+    parse_cache.load(path)
+    _write(path, DECK.replace("Geel", "Rood"), mtime_ns + 10 ** 9)
+    assert parse_cache.load(path)["drills"][0]["answer"] == "Rood"
+    assert len(parses) == 2
+
+
+def test_racy_file_is_checked_on_content_after_a_restart(tmp_path, parse_cache, parses):
+    # Gecached binnen RACY_SECONDS na de mtime: een wijziging met dezelfde grootte
+    # en mtime mag niet onopgemerkt blijven
+    path = tmp_path / "sterren.txt"
+    mtime_ns = _write(path, DECK, time.time_ns())
+    parse_cache.load(path)
+    _write(path, DECK.replace("Geel", "Rood"), mtime_ns)
+
+    reopened = ParseCache(parse_cache.path)
+    assert reopened.lookup(path) is None
+    assert reopened.load(path)["drills"][0]["answer"] == "Rood"
+    reopened.close()
+    assert len(parses) == 2
+
+
+def test_new_parser_version_ignores_old_entries(tmp_path, parse_cache, parses, monkeypatch):
+    path = tmp_path / "sterren.txt"
+    _write(path, DECK)
+    parse_cache.load(path)
+    monkeypatch.setattr(parser, "PARSER_VERSION", parser.PARSER_VERSION + 1)
+    reopened = ParseCache(parse_cache.path)
+    assert reopened.lookup(path) is None
+    reopened.load(path)
+    reopened.close()
+    assert len(parses) == 2
+
+
+def test_prune_drops_deleted_files(tmp_path, parse_cache):
+    kept, gone = tmp_path / "a.txt", tmp_path / "b.txt"
+    _write(kept, DECK)
+    _write(gone, DECK)
+    parse_cache.load(kept)
+    parse_cache.load(gone)
+    gone.unlink()
+    assert parse_cache.prune() == 1
+    assert parse_cache.lookup(kept) is not None
+
+
+def test_iter_parse_matches_parse_file(tmp_path):
+    path = tmp_path / "sterren.txt"
+    path.write_bytes((DECK + "# commentaar\n---\n## Zon\nMeer over de zon.\n- Zon - Ster\n").encode("utf-8"))
+    events = list(iter_parse(path))
+    # Context komt aan het einde van de sectie, na de drills ervan
+    assert events[:2] == [
+        (DRILL, {"category": "Zon", "question": "Welke kleur heeft de zon?", "answer": "Geel"}),
+        (CONTEXT, "Zon", "Uitleg over de zon."),
+    ]
+    drills, context = _collect(events)
+    expected = parse_file(path)
+    assert drills == expected["drills"]
+    assert context == expected["context"] == {"Zon": "Uitleg over de zon. Meer over de zon."}
+    assert expected == parse_text(path.name, path.read_text(encoding="utf-8"))
+
+
+def test_iter_parse_handles_crlf_like_parse_file(tmp_path):
+    path = tmp_path / "sterren.txt"
+    path.write_bytes(DECK.replace("\n", "\r\n").encode("utf-8"))
+    drills, context = _collect(iter_parse(path))
+    assert {"filename": path.name, "drills": drills, "context": context} == parse_file(path)
+    assert drills[1]["answer"] == "29,5"
@@ -0,0 +1,60 @@
+import itertools
+import threading
+import time
+
+from src.question_prefetch import QuestionPrefetcher, get_prefetcher
+
+
+class FakeEngine:
+    def __init__(self):
+        self.calls = 0
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def generate_question(self, context, level):
+        with self._lock:
+            self.calls += 1
+            return f"{level} vraag {next(self._counter)}"
+
+
+def _wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_prefetched_questions_are_served_from_the_queue():
+    engine = FakeEngine()
+    prefetcher = QuestionPrefetcher(engine)
+    prefetcher.prefetch("Zon", "context", "structure")
+    _wait_for(lambda: prefetcher.pending("Zon", "context", "structure") == (2, 0))
+    question = prefetcher.next_question("Zon", "context", "structure")
+    assert question.startswith("structure vraag")
+    assert engine.calls >= 2
+    prefetcher.close()
+    assert not prefetcher._thread.is_alive()
+
+
+def test_idle_thread_stops_and_restarts():
+    prefetcher = QuestionPrefetcher(FakeEngine(), idle=0.05)
+    prefetcher.prefetch("Zon", "context", "structure")
+    _wait_for(lambda: prefetcher._thread is None)
+    prefetcher.prefetch("Zon", "context", "mechanism")
+    _wait_for(lambda: prefetcher.pending("Zon", "context", "mechanism")[0] == 2)
+    prefetcher.close()
+
+
+def test_closed_prefetcher_generates_directly():
+    engine = FakeEngine()
+    prefetcher = QuestionPrefetcher(engine)
+    prefetcher.close()
+    assert prefetcher.next_question("Zon", "context", "structure") == "structure vraag 1"
+    assert prefetcher._thread is None
+    assert prefetcher.pending("Zon", "context", "structure") == (0, 0)
+
+
+def test_one_prefetcher_per_user():
+    first = get_prefetcher("Alice", FakeEngine())
+    assert get_prefetcher("alice", FakeEngine()) is first
+    assert get_prefetcher(None, FakeEngine()) is not first
@@ -0,0 +1,37 @@
+import numpy as np
+
+from src.due_index import MAX_DUE_DAYS
+from src.scheduler import DEFAULT_PARAMS, next_review, next_review_array, selection_weights
+
+
+def test_next_review_correct_and_wrong():
+    assert next_review(2.5, 1, True) == (2.6, 2)
+    ease, interval = next_review(2.5, 10, False)
+    assert interval == DEFAULT_PARAMS.reset_interval
+    assert ease == 2.3
+    assert next_review(1.3, 10, False)[0] == DEFAULT_PARAMS.ease_floor
+
+
+def test_interval_is_capped():
+    ease, interval = 2.5, 1
+    for _ in range(100):
+        ease, interval = next_review(ease, interval, True)
+    assert interval == MAX_DUE_DAYS
+
+
+def test_array_version_matches_scalar():
+    ease = np.array([2.5, 2.5, 1.3, 3.0])
+    interval = np.array([1, 10, 5, MAX_DUE_DAYS])
+    correct = np.array([True, False, False, True])
+    new_ease, new_interval = next_review_array(ease, interval, correct)
+    for i in range(len(ease)):
+        assert (new_ease[i], new_interval[i]) == next_review(ease[i], int(interval[i]), bool(correct[i]))
+
+
+def test_selection_weights():
+    weights = selection_weights(np.array([0, 10, 0, 10]), np.array([0, 0, 10, 0]),
+                                np.array([1, 1, 1, 2]), np.array([np.nan, 0, 0, 10]))
+    assert weights[0] == DEFAULT_PARAMS.weight_new
+    assert weights[1] < weights[2]  # fouten wegen zwaarder
+    assert weights[3] > weights[1]  # verstreken interval weegt zwaarder
+    assert weights.max() <= DEFAULT_PARAMS.weight_max
@@ -0,0 +1,94 @@
+from src.search_index import CONTEXT, DRILL, LibraryIndex, SearchIndex, fold, tokenize
+
+STERREN = {
+    "filename": "sterren.txt",
+    "drills": [
+        {"category": "Heelal", "question": "Hoe heet ons sterrenstelsel?", "answer": "De Melkweg"},
+        {"category": "Heelal", "question": "Hoe begon het heelal?", "answer": "Met de oerknal"},
+        {"category": "Zon", "question": "Welke kleur heeft de zon?", "answer": "Geel"},
+    ],
+    "context": {"Heelal": "De Melkweg is een spiraalstelsel; de oerknal was 13,8 miljard jaar geleden."},
+}
+
+
+def _titles(hits):
+    return [hit["drill"]["question"] if hit["kind"] == DRILL else hit["text"] for hit in hits]
+
+
+def test_fold_and_tokenize():
+    assert fold("Ruïne") == "ruine"
+    assert fold("ĳs") == "ijs"
+    assert fold("Melkweg") == "melkweg"
+    assert tokenize("De Ruïne van Één Melkweg!") == ["ruine", "melkweg"]
+    assert tokenize("het is een") == []
+
+
+def test_search_folds_the_query_and_filters_on_kind_and_file():
+    index = SearchIndex()
+    index.update_deck("sterren.txt", STERREN)
+    assert _titles(index.search("MELKWEG", kind=DRILL)) == ["Hoe heet ons sterrenstelsel?"]
+    assert [hit["kind"] for hit in index.search("melkweg", kind=CONTEXT)] == [CONTEXT]
+    assert index.search("melkweg", file="andere.txt") == []
+    assert index.search("de het") == []
+
+
+def test_only_the_last_term_is_expanded_as_prefix():
+    index = SearchIndex()
+    index.update_deck("sterren.txt", STERREN)
+    assert _titles(index.search("melk", kind=DRILL)) == ["Hoe heet ons sterrenstelsel?"]
+    assert index.search("melk", prefix=False) == []
+    # 'melk' is hier niet de laatste term en moet dus volledig matchen
+    assert _titles(index.search("melk oerknal", kind=DRILL)) == ["Hoe begon het heelal?"]
+
+
+def test_bm25_ranks_more_matching_terms_and_shorter_documents_first():
+    deck = {
+        "filename": "rangorde.txt",
+        "drills": [
+            {"category": "A", "question": "zon", "answer": "maan sterren planeten kometen"},
+            {"category": "A", "question": "zon", "answer": "maan"},
+            {"category": "A", "question": "zon", "answer": "licht"},
+        ],
+        "context": {},
+    }
+    index = SearchIndex()
+    index.update_deck("rangorde.txt", deck)
+    hits = index.search("zon maan", prefix=False)
+    assert [hit["drill"]["answer"] for hit in hits] == ["maan", "maan sterren planeten kometen", "licht"]
+    assert hits[0]["score"] > hits[1]["score"] > hits[2]["score"] > 0
+    assert len(index.search("zon maan", limit=1)) == 1
+
+
+def test_update_and_remove_deck_only_touch_that_deck():
+    index = SearchIndex()
+    index.update_deck("sterren.txt", STERREN)
+    index.update_deck("zon.txt", {"filename": "zon.txt", "context": {},
+                                  "drills": [{"category": "Zon", "question": "Zon?", "answer": "Ster"}]})
+    index.update_deck("sterren.txt", {"filename": "sterren.txt", "context": {},
+                                      "drills": [{"category": "Maan", "question": "Maan?", "answer": "Satelliet"}]})
+    assert index.search("melkweg") == []
+    assert _titles(index.search("satelliet")) == ["Maan?"]
+    assert _titles(index.search("ster", prefix=False)) == ["Zon?"]
+    index.remove_deck("sterren.txt")
+    assert index.search("satelliet") == []
+    assert index.files == ["zon.txt"]
+    assert len(index) == 1
+
+
+def test_library_refresh_reindexes_only_changed_decks(tmp_path, parse_cache):
+    (tmp_path / "sterren.txt").write_text("## Heelal\n- Ons stelsel?:Melkweg\n", encoding="utf-8")
+    (tmp_path / "zon.txt").write_text("## Zon\n- Kleur?:Geel\n", encoding="utf-8")
+    library = LibraryIndex(tmp_path)
+    assert library.refresh() == ["sterren.txt", "zon.txt"]
+    assert library.refresh() == []
+
+    (tmp_path / "sterren.txt").write_text("## Heelal\n- Begin?:Oerknal\n", encoding="utf-8")
+    assert library.refresh() == ["sterren.txt"]
+    assert library.search("melkweg") == []
+    assert [hit["drill"]["answer"] for hit in library.search("oerknal")] == ["Oerknal"]
+
+    (tmp_path / "zon.txt").unlink()
+    assert library.refresh() == ["zon.txt"]
+    assert library.search("geel") == []
+    assert library.deck_for("oerknal")["drills"] == [
+        {"file": "sterren.txt", "category": "Heelal", "question": "Begin?", "answer": "Oerknal"}]
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+
+from src.scheduler import DEFAULT_PARAMS
+from src.simulator import (MAX_REVIEWS_PER_DAY, MIN_SECONDS_PER_REVIEW, LearnerModel,
+                           fit_learner, replay, simulate, with_drill_id)
+
+
+def _events(n, gap_seconds, drill_id=True):
+    start = datetime(2024, 1, 1, 12)
+    events = []
+    for i in range(n):
+        event = {"date": (start + timedelta(seconds=i * gap_seconds)).isoformat(),
+                 "correct": i % 3 != 0, "file": "astr.txt", "category": "Planeten"}
+        if drill_id:
+            event["drill_id"] = f"drill{i % 5}"
+        events.append(event)
+    return events
+
+
+def test_migrated_events_without_drill_id_are_skipped():
+    legacy = _events(20, 30, drill_id=False)
+    assert with_drill_id(legacy) == []
+    assert fit_learner(legacy) is None
+    learner, results = replay(legacy + _events(20, 30), [DEFAULT_PARAMS], n_learners=2, days=2)
+    assert learner is not None and len(results) == 1
+
+
+def test_degenerate_review_time_falls_back_to_default():
+    learner = fit_learner(_events(50, 0.001))
+    assert learner.seconds_per_review == LearnerModel.seconds_per_review
+
+
+def test_simulate_caps_reviews_per_day():
+    learner = LearnerModel(seconds_per_review=7.8e-05)
+    (result,) = simulate([DEFAULT_PARAMS], learner, n_learners=2, n_drills=10, days=1)
+    assert result["reviews"] <= MAX_REVIEWS_PER_DAY
+    assert result["minutes"] >= result["reviews"] * MIN_SECONDS_PER_REVIEW / 60
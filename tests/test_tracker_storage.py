@@ -0,0 +1,78 @@
+import json
+
+import pytest
+
+from src.drill_state import legacy_drill_id
+from src.tracker_storage import TrackerDB
+
+QUESTION = "Hoeveel planeten heeft ons zonnestelsel?"
+
+LEGACY = {
+    "drills": {
+        legacy_drill_id("astr.txt", QUESTION): {
+            "correct": 3, "incorrect": 1, "last_seen": "2024-03-01T10:00:00",
+            "ease_factor": 2.6, "interval": 6, "category": "Zon", "file": "astr.txt",
+        },
+    },
+    "sessions": [{"date": "2024-03-01T10:05:00", "file": "astr.txt", "score": 3, "total": 4}],
+    "categories": {"Zon": {"correct": 3, "incorrect": 1}},
+    "answers_log": [
+        {"date": "2024-03-01T10:00:00", "correct": True, "file": "astr.txt", "category": "Zon"},
+        {"date": "2024-03-01T10:01:00", "correct": False, "file": "astr.txt", "category": "Zon"},
+    ],
+    "achievements": {},
+    "stats": {"total_correct": 3, "total_incorrect": 1},
+}
+
+
+@pytest.fixture
+def legacy_json(tmp_path):
+    path = tmp_path / "user_data.json"
+    path.write_text(json.dumps(LEGACY), encoding="utf-8")
+    return path
+
+
+def test_migrate_json_once(tmp_path, legacy_json):
+    db = TrackerDB(tmp_path / "user_data.sqlite")
+    assert db.migrate_json(legacy_json)
+    assert not legacy_json.exists()
+    assert legacy_json.with_suffix(".json.migrated").exists()
+    assert not db.migrate_json(legacy_json)
+
+    data = db.load_all()
+    state = data["drills"].get(legacy_drill_id("astr.txt", QUESTION))
+    assert (state.correct, state.incorrect, state.interval) == (3, 1, 6)
+    assert state.due is not None
+    assert data["categories"] == {"Zon": {"correct": 3, "incorrect": 1}}
+    assert data["stats"]["total_correct"] == 3
+    db.close()
+
+
+def test_legacy_answers_stay_until_written(tmp_path, legacy_json):
+    db = TrackerDB(tmp_path / "user_data.sqlite")
+    db.migrate_json(legacy_json)
+
+    def broken(answers):
+        raise OSError("schijf vol")
+
+    with pytest.raises(OSError):
+        db.take_legacy_answers(broken)
+    written = []
+    assert db.take_legacy_answers(written.extend) == 2
+    assert [a["correct"] for a in written] == [True, False]
+    assert db.take_legacy_answers(written.extend) == 0
+    assert len(written) == 2
+    db.close()
+
+
+def test_store_moves_legacy_answers_to_the_event_log(tracker, legacy_json, monkeypatch):
+    monkeypatch.setattr(tracker, "DATA_FILE", legacy_json)
+    store = tracker.get_store()
+    events = list(store.log.iter_events())
+    assert [e["date"] for e in events] == ["2024-03-01T10:00:00", "2024-03-01T10:01:00"]
+    assert store.data["rollups"]["2024-03-01"]["total"] == 2
+    # De oude key wordt bij het eerste gebruik naar de hash gemigreerd
+    tracker.record_answer("astr.txt", QUESTION, "Zon", True)
+    drills = store.data["drills"]
+    assert len(drills) == 1
+    assert drills.get(tracker.get_drill_id("astr.txt", QUESTION)).correct == 4
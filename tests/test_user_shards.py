@@ -0,0 +1,8 @@
+from src.user_shards import shard_name
+
+
+def test_users_with_the_same_shard_share_one_store(tracker):
+    assert shard_name("Alice") == shard_name("alice")
+    # Zou anders dezelfde shard twee keer locken (ShardBusyError na 10 s)
+    assert tracker.get_store("Alice") is tracker.get_store("alice")
+    assert tracker.get_store("Bob") is not tracker.get_store("alice")